@@ -2,84 +2,321 @@
 Main analyzer that combines rule-based and LLM analysis.
 """
 
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from .llm_analyzer import GeminiAnalyzer
-from .rule_detector import RuleBasedDetector, AntiPatternDetector
+from .rule_detector import RuleBasedDetector, AntiPatternDetector, ProjectRuleDetector
 from .knowledge_base import KnowledgeBase
+from .cache import AnalysisCache, default_cache_dir
+from .project_index import ProjectIndex
+from .source import SourceUnit, as_source_unit
+from .discovery import iter_files
+from .dedup import IssueIndex, merge_issues
+from .issues import DetectedIssue
+from .issue_store import IssueStore
+from .progress import ProgressTracker
+from .timeouts import Deadline, STREAM_STALL_TIMEOUT
+from .reader import FileLimits, read_source
+from .notebook import NotebookCell, NotebookUnit, cell_summary, cells_from_summary, locate_issues
+from .pipeline import Pipeline, StagedFile
+from .journal import RunJournal
+from .sharding import relative_key, select_files, shard_of
+from .distributed import Coordinator
+
+EXECUTORS = ('thread', 'process')
 
 
 class DeepOptimizer:
     """Main analyzer that orchestrates rule-based and LLM analysis."""
     
-    def __init__(self, api_key: Optional[str] = None, use_llm: bool = True):
+    def __init__(self, api_key: Optional[str] = None, use_llm: bool = True,
+                 use_cache: bool = True, cache_dir: Optional[Union[str, Path]] = None,
+                 select: Optional[List[str]] = None, ignore: Optional[List[str]] = None,
+                 profile: str = 'full', llm_timeout: Optional[float] = None,
+                 llm_concurrency: Optional[int] = None, max_workers: int = 4,
+                 executor: str = 'thread', timeout: Optional[float] = None,
+                 file_timeout: Optional[float] = None, file_limits: Optional[FileLimits] = None,
+                 llm_stall_timeout: Optional[float] = STREAM_STALL_TIMEOUT, triage: bool = False,
+                 adaptive_concurrency: bool = True, llm_hedge_percentile: Optional[float] = None,
+                 llm_hedge_budget: float = 0.05):
         """
         Initialize DeepOptimizer.
         
         Args:
             api_key: Gemini API key (uses GEMINI_API_KEY env var if not provided)
             use_llm: Whether to use LLM analysis in addition to rules
+            use_cache: Whether to reuse cached LLM results for unchanged code
+            cache_dir: Cache directory (uses DEEPOPTIMIZER_CACHE_DIR or
+                ~/.cache/deepoptimizer if not provided)
+            select: Rule IDs, ID prefixes or names to run (default: all rules)
+            ignore: Rule IDs, ID prefixes or names to skip
+            profile: 'full' runs every rule, 'fast' only cheap ones
+            llm_timeout: Seconds to wait for a single Gemini request (None for no limit)
+            llm_concurrency: Maximum Gemini requests in flight at once per model
+                (None: no limit beyond the worker count, or 16 when adaptive)
+            max_workers: Default number of parallel workers for analyze_project
+            executor: 'thread' (default) or 'process'; processes sidestep the GIL
+                for CPU-bound rule checks on large projects
+            timeout: Default run deadline for analyze_project (seconds)
+            file_timeout: Default per-file deadline for analyze_project (seconds)
+            file_limits: Size thresholds and generated-file policy that route
+                files to rules-only analysis or skip them (default: FileLimits())
+            llm_stall_timeout: Seconds without streamed Gemini output, once it
+                has started, before the request is abandoned and retried (None
+                for no limit)
+            triage: Screen code with a fast model first and send only flagged
+                code to the deep model (off by default: code the fast model
+                clears is never seen by the deep model)
+            adaptive_concurrency: Adapt the number of Gemini requests in flight
+                to 429/503 responses and latency, up to llm_concurrency
+            llm_hedge_percentile: Duplicate a Gemini request that has produced no
+                output after this percentile of observed latency, using the
+                first to answer (None: no hedging)
+            llm_hedge_budget: Maximum duplicate Gemini requests as a fraction of
+                all requests in the run
+            
+        Raises:
+            ValueError: If a rule code, profile or executor is unknown
         """
-        self.rule_detector = RuleBasedDetector()
-        self.antipattern_detector = AntiPatternDetector()
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}' (expected one of: {', '.join(EXECUTORS)})")
+        self.max_workers = max_workers
+        self.executor = executor
+        self.timeout = timeout
+        self.file_timeout = file_timeout
+        self.file_limits = file_limits or FileLimits()
+        
+        # Process workers rebuild an equivalent analyzer from these
+        self._worker_options = {
+            'api_key': api_key, 'use_llm': use_llm, 'use_cache': use_cache,
+            'cache_dir': cache_dir, 'select': select, 'ignore': ignore, 'profile': profile,
+            'llm_timeout': llm_timeout, 'llm_concurrency': llm_concurrency,
+            'file_limits': self.file_limits, 'llm_stall_timeout': llm_stall_timeout,
+            'triage': triage, 'adaptive_concurrency': adaptive_concurrency,
+            'llm_hedge_percentile': llm_hedge_percentile, 'llm_hedge_budget': llm_hedge_budget
+        }
+        
+        self.rule_options = {'select': select, 'ignore': ignore, 'profile': profile}
+        self.rule_detector = RuleBasedDetector(**self.rule_options)
+        self.antipattern_detector = AntiPatternDetector(**self.rule_options)
         self.knowledge_base = KnowledgeBase()
         
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.use_cache = use_cache
+        
         self.llm_analyzer = None
         if use_llm:
             try:
-                self.llm_analyzer = GeminiAnalyzer(api_key)
+                cache = AnalysisCache(self.cache_dir) if use_cache else None
+                self.llm_analyzer = GeminiAnalyzer(api_key, cache=cache, timeout=llm_timeout,
+                                               max_concurrency=llm_concurrency,
+                                               stall_timeout=llm_stall_timeout, triage=triage,
+                                               adaptive_concurrency=adaptive_concurrency,
+                                               hedge_percentile=llm_hedge_percentile,
+                                               hedge_budget=llm_hedge_budget)
             except ValueError:
                 # LLM analysis disabled - continue with rule-based only
                 pass
     
-    def analyze_file(self, file_path: Union[str, Path], include_llm: bool = True) -> Dict[str, Any]:
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], api_key: Optional[str] = None) -> 'DeepOptimizer':
+        """
+        Create an analyzer from a layered configuration (see config.load_config).
+        
+        Args:
+            config: Effective configuration
+            api_key: Gemini API key (overrides the config's api_key)
+        """
+        analysis = config['analysis']
+        performance = config['performance']
+        return cls(
+            api_key=api_key or config.get('api_key'),
+            use_llm=analysis['use_llm'],
+            use_cache=config['cache']['enabled'],
+            cache_dir=config['cache']['dir'],
+            select=analysis['select'],
+            ignore=analysis['ignore'],
+            profile=analysis['profile'],
+            llm_timeout=performance['llm_timeout'],
+            llm_concurrency=performance['llm_concurrency'],
+            max_workers=performance['max_workers'],
+            executor=performance['executor'],
+            timeout=performance['timeout'],
+            file_timeout=performance['file_timeout'],
+            file_limits=FileLimits(**config['limits']),
+            llm_stall_timeout=performance['llm_stall_timeout'],
+            triage=analysis['triage'],
+            adaptive_concurrency=performance['adaptive_concurrency'],
+            llm_hedge_percentile=performance['llm_hedge_percentile'],
+            llm_hedge_budget=performance['llm_hedge_budget']
+        )
+    
+    def analyze_file(self, file_path: Union[str, Path], include_llm: bool = True,
+                     project_context: Dict[str, Any] = None,
+                     progress: Optional[ProgressTracker] = None,
+                     deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
-        Analyze a single Python file.
+        Analyze a single Python file or Jupyter notebook.
+        
+        Notebook issues carry the index of their code cell ('cell') and line
+        numbers relative to that cell; the result lists the cells under 'cells'.
         
         Args:
-            file_path: Path to the Python file
+            file_path: Path to the Python file or notebook
             include_llm: Whether to include LLM analysis
-            
+            project_context: Additional context (framework, referenced symbols, etc.)
+            progress: Optional tracker notified as the file moves through the stages
+            deadline: When it expires, LLM analysis stops and rule results are kept
+        
         Returns:
             Dictionary with analysis results
         """
+        staged = self.stage_file(file_path, include_llm and self.llm_analyzer is not None, progress)
+        if staged.llm:
+            self.analyze_staged(staged, project_context, progress, deadline)
+        return self.finish_file(staged)
+    
+    def stage_file(self, file_path: Union[str, Path], include_llm: bool = True,
+                   progress: Optional[ProgressTracker] = None) -> StagedFile:
+        """
+        Read a file and run the rule-based checks (the CPU stage).
+        
+        Args:
+            file_path: Path to the Python file or notebook
+            include_llm: Whether the file should go on to LLM analysis
+            progress: Optional tracker notified as the file moves through the stages
+        
+        Returns:
+            StagedFile holding the rule results; its 'llm' flag says whether
+            analyze_staged still has to run
+        """
         file_path = Path(file_path)
         
         if not file_path.exists():
-            return {
+            return StagedFile(str(file_path), {
                 'file': str(file_path),
                 'error': f'File not found: {file_path}',
                 'issues': []
-            }
+            })
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
+            source = read_source(file_path, self.file_limits)
         except Exception as e:
-            return {
+            return StagedFile(str(file_path), {
                 'file': str(file_path),
                 'error': f'Error reading file: {e}',
                 'issues': []
-            }
+            })
+        
+        # Huge, generated and minified files take the cheap path or none at all
+        if source.mode == 'skip':
+            return StagedFile(str(file_path), {
+                'file': str(file_path),
+                'skipped': source.reason,
+                'issues': []
+            })
         
-        return self.analyze_code(code, str(file_path), include_llm=include_llm)
+        unit = self._source_unit(source.code, str(file_path), source.cells)
+        result, rule_issues = self._check_rules(unit, str(file_path), progress)
+        llm = include_llm and source.mode == 'full'
+        return StagedFile(
+            str(file_path), result, rule_issues, llm=llm,
+            llm_skipped=source.reason if include_llm and source.mode == 'rules' else None,
+            code=source.code if llm else None, cells=source.cells, unit=unit if llm else None
+        )
     
-    def analyze_code(self, code: str, file_path: Optional[str] = None, 
-                     include_llm: bool = True, project_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def analyze_staged(self, staged: StagedFile, project_context: Dict[str, Any] = None,
+                       progress: Optional[ProgressTracker] = None,
+                       deadline: Optional[Deadline] = None) -> StagedFile:
+        """
+        Run LLM analysis on a file that went through stage_file (the I/O stage).
+        
+        A file whose source was spilled is read again first.
+        
+        Returns:
+            The staged file, with the LLM issues merged into its result
+        """
+        staged.llm = False
+        unit = staged.unit
+        if unit is None:
+            code, cells = staged.code, staged.cells
+            if code is None:
+                try:
+                    source = read_source(staged.path, self.file_limits)
+                except Exception:
+                    return staged
+                if source.mode != 'full':
+                    return staged
+                code, cells = source.code, source.cells
+            unit = self._source_unit(code, staged.path, cells)
+        staged.unit = staged.code = None
+        
+        self._check_llm(unit, staged.path, staged.result, staged.rule_issues,
+                        project_context, progress, deadline)
+        return staged
+    
+    def finish_file(self, staged: StagedFile) -> Dict[str, Any]:
+        """Summarize a staged file's issues and map notebook issues to cells."""
+        result = staged.result
+        if staged.rule_issues is None:
+            return result
+        
+        result['summary'] = self._generate_summary(result['issues'])
+        if staged.llm_skipped:
+            result['llm_skipped'] = staged.llm_skipped
+        if staged.cells is not None:
+            locate_issues(staged.cells, result['issues'])
+            result['cells'] = cell_summary(staged.cells, result['issues'])
+        return result
+    
+    def analyze_code(self, code: Union[str, SourceUnit], file_path: Optional[str] = None,
+                     include_llm: bool = True, project_context: Dict[str, Any] = None,
+                     progress: Optional[ProgressTracker] = None,
+                     deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Analyze Python code for ML-specific issues.
         
+        The code is parsed once into a SourceUnit that every stage shares.
+        
         Args:
-            code: Python code to analyze
+            code: Python code to analyze (raw source or a SourceUnit)
             file_path: Optional file path for context
             include_llm: Whether to include LLM analysis
             project_context: Additional context (framework, hardware, etc.)
-            
+            progress: Optional tracker notified as the code moves through the stages
+            deadline: When it expires, LLM analysis stops and rule results are kept
+        
         Returns:
             Dictionary with analysis results
         """
+        unit = as_source_unit(code, file_path)
+        result, rule_issues = self._check_rules(unit, file_path, progress)
+        
+        # Run LLM analysis if enabled and available
+        if include_llm and self.llm_analyzer:
+            self._check_llm(unit, file_path, result, rule_issues, project_context, progress, deadline)
+        
+        # Generate summary
+        result['summary'] = self._generate_summary(result['issues'])
+        
+        return result
+    
+    def _source_unit(self, code: str, file_path: str,
+                     cells: Optional[List[NotebookCell]] = None) -> SourceUnit:
+        if cells is not None:
+            return NotebookUnit(code, file_path, cells)
+        return SourceUnit(code, file_path)
+    
+    def _check_rules(self, unit: SourceUnit, file_path: Optional[str],
+                     progress: Optional[ProgressTracker] = None):
+        """Run the rule-based detectors. Returns (result, rule issues)."""
+        if progress is not None:
+            unit.tree  # Parse now so the event reflects it
+            progress.emit('parsed', file_path)
+        
         result = {
             'file': file_path or 'code_snippet',
             'issues': [],
@@ -88,90 +325,172 @@ class DeepOptimizer:
         }
         
         # Run rule-based detection (fast)
+        all_rule_issues = []
         try:
-            rule_issues = self.rule_detector.detect_all(code, file_path)
-            antipattern_issues = self.antipattern_detector.detect_architecture_issues(code)
+            rule_issues = self.rule_detector.detect_all(unit, file_path)
+            antipattern_issues = self.antipattern_detector.detect_architecture_issues(unit)
             
             all_rule_issues = rule_issues + antipattern_issues
             result['issues'].extend(all_rule_issues)
             result['analysis_methods'].append('rule-based')
         except Exception as e:
-            result['issues'].append({
-                'severity': 'error',
-                'category': 'analysis_error',
-                'title': 'Rule-based analysis failed',
-                'description': str(e)
-            })
+            result['issues'].append(DetectedIssue(
+                severity='error',
+                category='analysis_error',
+                title='Rule-based analysis failed',
+                description=str(e)
+            ))
         
-        # Run LLM analysis if enabled and available
-        if include_llm and self.llm_analyzer:
-            try:
-                # Build context with detected issues for LLM
-                enhanced_context = {
-                    **(project_context or {}),
-                    'rule_based_issues': all_rule_issues
-                }
-                
-                llm_issues = self.llm_analyzer.analyze(code, file_path, enhanced_context)
+        if progress is not None:
+            progress.emit('rule_checked', file_path)
+        
+        return result, all_rule_issues
+    
+    def _check_llm(self, unit: SourceUnit, file_path: Optional[str], result: Dict[str, Any],
+                   rule_issues: List[Any], project_context: Dict[str, Any] = None,
+                   progress: Optional[ProgressTracker] = None,
+                   deadline: Optional[Deadline] = None):
+        """Run LLM analysis and merge its issues into the result."""
+        try:
+            # Build context with detected issues for LLM
+            enhanced_context = {
+                **(project_context or {}),
+                'rule_based_issues': rule_issues
+            }
+            
+            on_issue = None
+            if progress is not None:
+                progress.emit('llm_pending', file_path)
                 
-                # Merge issues, avoiding duplicates
-                merged_issues = self._merge_issues(result['issues'], llm_issues)
-                result['issues'] = merged_issues
-                result['analysis_methods'].append('llm-enhanced')
-            except Exception as e:
-                result['issues'].append({
-                    'severity': 'warning',
-                    'category': 'analysis_error',
-                    'title': 'LLM analysis failed',
-                    'description': str(e),
-                    'suggestion': 'Results shown are from rule-based analysis only'
-                })
+                def on_issue(issue):
+                    progress.emit('llm_issue', file_path, severity=issue.get('severity'),
+                                  title=issue.get('title'))
+            try:
+                llm_issues = self.llm_analyzer.analyze(unit, file_path, enhanced_context, deadline, on_issue)
+            finally:
+                if progress is not None:
+                    progress.emit('llm_done', file_path)
+            
+            # Merge issues, avoiding duplicates
+            merged_issues = self._merge_issues(result['issues'], llm_issues)
+            result['issues'] = merged_issues
+            result['analysis_methods'].append('llm-enhanced')
+        except Exception as e:
+            result['issues'].append(DetectedIssue(
+                severity='warning',
+                category='analysis_error',
+                title='LLM analysis failed',
+                description=str(e),
+                suggestion='Results shown are from rule-based analysis only'
+            ))
+    
+    def index_project(self, project_path: Union[str, Path], files: Iterable[Path]) -> ProjectIndex:
+        """
+        Index a project's symbols for cross-file rules and LLM prompt context.
         
-        # Generate summary
-        result['summary'] = self._generate_summary(result['issues'])
+        Files too large for the LLM stay out of the index (indexing them costs
+        more than the rules).
         
-        return result
+        Args:
+            project_path: Project root
+            files: The project's files (as discovered for the run)
+        """
+        return ProjectIndex(
+            project_path, cache_dir=self.cache_dir if self.use_cache else None,
+            max_file_bytes=self.file_limits.max_llm_bytes
+        ).build(files)
     
-    def analyze_project(self, project_path: Union[str, Path], 
+    def analyze_project(self, project_path: Union[str, Path],
                        include_patterns: List[str] = None,
                        exclude_patterns: List[str] = None,
                        include_llm: bool = True,
-                       max_workers: int = 4) -> Dict[str, Any]:
+                       max_workers: Optional[int] = None,
+                       respect_gitignore: bool = True,
+                       progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       timeout: Optional[float] = None,
+                       file_timeout: Optional[float] = None,
+                       journal: Optional[RunJournal] = None,
+                       shard: Optional[Tuple[int, int]] = None,
+                       shard_timings: Optional[Dict[str, float]] = None,
+                       coordinator: Optional[Coordinator] = None) -> Dict[str, Any]:
         """
         Analyze an entire project.
         
+        Files are analyzed as they are discovered, in a pipeline of stages
+        with separate worker pools: reading, parsing and rules run on
+        ``max_workers`` CPU workers (threads or processes, see ``executor``),
+        and LLM analysis on its own pool of I/O threads sized to the Gemini
+        concurrency limit, so slow LLM calls don't hold up rule checks of the
+        rest of the tree (see pipeline.Pipeline).
+        
         Args:
             project_path: Root directory of the project
-            include_patterns: Glob patterns for files to include (default: ['**/*.py'])
+            include_patterns: Glob patterns for files to include (default: ['**/*.py', '**/*.ipynb'])
             exclude_patterns: Glob patterns for files to exclude
             include_llm: Whether to include LLM analysis
-            max_workers: Maximum parallel workers for analysis
-            
+            max_workers: Workers for the CPU stage (default: self.max_workers)
+            respect_gitignore: Whether to skip files ignored by .gitignore
+            progress_callback: Called with progress events (per-file 'queued',
+                'parsed', 'rule_checked', 'llm_pending', 'llm_issue' per
+                streamed finding, 'llm_done', 'done' or 'timed_out';
+                'discovered' once discovery has finished and 'indexed' once the
+                project index is ready (in either order), then 'timeout' if
+                the run deadline passed, then 'finished'), each
+                carrying counts, files/s, tokens/s and ETA (see
+                progress.ProgressTracker). With the process executor,
+                'parsed' and 'rule_checked' are not reported.
+            timeout: Seconds for the whole run; files not finished by then are
+                cancelled and listed in 'unfinished_files' (default: self.timeout)
+            file_timeout: Seconds per file and stage, counted from when the
+                stage starts; LLM analysis stops at the deadline and the rule
+                results are kept (default: self.file_timeout)
+            journal: Run journal each finished file's result is appended to;
+                files it already holds (and that are unchanged since) are
+                taken from it instead of being analyzed again
+            shard: (index, count) to analyze only the files of shard index
+                (from 1) out of count; all files are still indexed, so
+                project-level rules see the whole tree (see sharding)
+            shard_timings: Seconds per file from an earlier run, by path
+                relative to the project, to balance shards by expected time
+                instead of by path hash (discovery then finishes first)
+            coordinator: Started coordinator that hands files to remote
+                workers (rules and LLM) instead of analyzing them here; the
+                index, project-level rules and report stay local
+        
         Returns:
-            Dictionary with project-wide analysis results
+            Dictionary with project-wide analysis results. 'timed_out' is True
+            when some files did not finish in time; they are listed in
+            'unfinished_files' and the other results are still complete.
+            With LLM analysis, 'llm_files_without_index' counts the files
+            whose LLM analysis started before the project index was ready
+            (their prompts lack cross-file symbol context), 'llm_concurrency'
+            holds the Gemini concurrency limiter state per model,
+            'llm_triage' how many files the triage model screened and cleared
+            (not sent to the deep model) when triage is on, and 'llm_hedging'
+            the duplicate requests sent and won when hedging is on. With a journal, 'run_id' names the
+            run and 'resumed_files' counts the results taken from it. With a
+            shard, 'shard' holds its index, count and number of files;
+            merge_project_results() combines the shards' reports. With a
+            coordinator, 'distributed' holds its task, retry and worker counts.
         """
         project_path = Path(project_path)
+        started = time.perf_counter()
+        max_workers = max_workers or self.max_workers
+        timeout = timeout if timeout is not None else self.timeout
+        file_timeout = file_timeout if file_timeout is not None else self.file_timeout
+        run_deadline = Deadline(timeout)
         
         if not project_path.exists():
             return {'error': f'Project path not found: {project_path}'}
         
-        # Default patterns
-        if include_patterns is None:
-            include_patterns = ['**/*.py']
+        # With a coordinator, the workers make the LLM calls
+        use_llm = include_llm and self.llm_analyzer is not None and coordinator is None
+        progress = None
+        if progress_callback is not None:
+            token_counter = (lambda: self.llm_analyzer.usage.total) if self.llm_analyzer else None
+            llm_limit = self.llm_concurrency_limit if use_llm else None
+            progress = ProgressTracker(progress_callback, token_counter, llm_limit)
         
-        if exclude_patterns is None:
-            exclude_patterns = ['**/venv/**', '**/env/**', '**/__pycache__/**', 
-                              '**/node_modules/**', '**/.git/**']
-        
-        # Find all files
-        files_to_analyze = []
-        for pattern in include_patterns:
-            for file_path in project_path.glob(pattern):
-                # Check exclusions
-                if not any(file_path.match(excl) for excl in exclude_patterns):
-                    files_to_analyze.append(file_path)
-        
-        # Analyze files in parallel
         results = {
             'project_path': str(project_path),
             'files_analyzed': 0,
@@ -179,124 +498,349 @@ class DeepOptimizer:
             'issues_by_severity': {'error': 0, 'warning': 0, 'info': 0},
             'issues_by_file': {},
             'top_issues': [],
-            'analysis_methods': []
+            'analysis_methods': [],
+            'file_timings': {},
+            'timed_out': False,
+            'unfinished_files': [],
+            'skipped_files': {},
+            'rules_only_files': {}
         }
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_file = {
-                executor.submit(self.analyze_file, file_path, include_llm): file_path
-                for file_path in files_to_analyze
-            }
-            
-            # Process results as they complete
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
+        store = IssueStore()
+        
+        # Index the project alongside the pipeline: feeds cross-file rules and
+        # compact prompt context
+        index_holder: Dict[str, Any] = {}
+        
+        def build_index() -> ProjectIndex:
+            # Its own discovery walk, so the index doesn't wait for the rules to reach the last file
+            files = paths if isinstance(paths, list) else iter_files(
+                project_path, include_patterns, exclude_patterns, respect_gitignore)
+            project_index = self.index_project(project_path, files)
+            index_holder['index'] = project_index
+            index_holder['rules'] = ProjectRuleDetector(project_index, **self.rule_options)
+            if progress is not None:
+                progress.emit('indexed')
+            return project_index
+        
+        # Each stage's deadline starts when a worker picks the file up, not when it is queued
+        file_deadlines: Dict[str, Deadline] = {}
+        
+        def start_file(file_path: Union[str, Path]) -> Deadline:
+            deadline = Deadline(file_timeout, parent=run_deadline)
+            file_deadlines[str(file_path)] = deadline
+            return deadline
+        
+        def finish(file_path: Path, outcome: Any) -> Tuple[Dict[str, Any], float]:
+            if isinstance(outcome, StagedFile):
+                outcome = self.finish_file(outcome), outcome.seconds
+            if journal is not None:
+                # Journaled before project-level rules, which are applied again on resume
                 try:
-                    file_result = future.result()
+                    journal.record(file_path, *outcome)
+                except (OSError, ValueError, TypeError):
+                    # The result stands; only a resumed run would redo this file
+                    pass
+            return outcome
+        
+        def collect(file_path: Path, outcome: Any, index_ready: bool):
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                file_result, seconds = outcome
+                results['file_timings'][str(file_path)] = round(seconds, 4)
+                
+                # Apply project-level rules using facts from other files
+                project_rules = index_holder.get('rules') if index_ready else None
+                if project_rules is None:
+                    pass
+                elif 'cells' in file_result:
+                    # Notebook issues are already cell-relative; only map the project-level ones
+                    project_issues = project_rules.detect_all(str(file_path))
+                    if project_issues:
+                        cells = cells_from_summary(file_result['cells'])
+                        locate_issues(cells, project_issues)
+                        file_result['issues'] = file_result['issues'] + project_issues
+                        file_result['summary'] = self._generate_summary(file_result['issues'])
+                        file_result['cells'] = cell_summary(cells, file_result['issues'])
+                elif 'issues' in file_result:
+                    file_issues = project_rules.filter_issues(str(file_path), file_result['issues'])
+                    file_issues.extend(project_rules.detect_all(str(file_path)))
+                    if len(file_issues) != len(file_result['issues']) or file_issues != file_result['issues']:
+                        file_result['issues'] = file_issues
+                        file_result['summary'] = self._generate_summary(file_issues)
+                
+                if file_result.get('skipped'):
+                    results['skipped_files'][str(file_path)] = file_result['skipped']
+                elif file_result.get('llm_skipped'):
+                    results['rules_only_files'][str(file_path)] = file_result['llm_skipped']
+                
+                if file_result.get('issues'):
+                    results['files_analyzed'] += 1
+                    results['issues_by_file'][str(file_path)] = file_result
+                    store.add(str(file_path), file_result['issues'])
                     
-                    if file_result.get('issues'):
-                        results['files_analyzed'] += 1
-                        results['issues_by_file'][str(file_path)] = file_result
-                        results['total_issues'] += len(file_result['issues'])
-                        
-                        # Update severity counts
-                        for issue in file_result['issues']:
-                            severity = issue.get('severity', 'info')
-                            results['issues_by_severity'][severity] += 1
-                        
-                        # Update analysis methods
-                        for method in file_result.get('analysis_methods', []):
-                            if method not in results['analysis_methods']:
-                                results['analysis_methods'].append(method)
-                                
-                except Exception as e:
-                    results['issues_by_file'][str(file_path)] = {
-                        'error': f'Analysis failed: {e}',
-                        'issues': []
-                    }
-        
-        # Generate project-wide insights
-        results['top_issues'] = self._get_top_issues(results['issues_by_file'])
-        results['optimization_opportunities'] = self._identify_optimization_opportunities(results)
+                    # Update analysis methods
+                    for method in file_result.get('analysis_methods', []):
+                        if method not in results['analysis_methods']:
+                            results['analysis_methods'].append(method)
+            
+            except Exception as e:
+                results['issues_by_file'][str(file_path)] = {
+                    'error': f'Analysis failed: {e}',
+                    'issues': []
+                }
+            
+            if progress is not None:
+                progress.emit('done', str(file_path))
+        
+        if coordinator is not None:
+            cpu_executor = None
+            cpu_stage = coordinator.submit
+        elif self.executor == 'process':
+            # Workers can't share the tracker, and only run rules: LLM calls
+            # stay in this process, under one concurrency limiter and cache
+            cpu_executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                               initargs=({**self._worker_options, 'use_llm': False},))
+            
+            def cpu_stage(file_path: Path):
+                return cpu_executor.submit(_stage_in_worker, file_path, use_llm)
+        else:
+            cpu_executor = ThreadPoolExecutor(max_workers=max_workers)
+            
+            def cpu_stage(file_path: Path):
+                return cpu_executor.submit(self._stage_file_timed, file_path, use_llm, progress, start_file)
+        
+        llm_workers = self._llm_workers(max_workers) if use_llm else 0
+        llm_executor = ThreadPoolExecutor(max_workers=llm_workers) if use_llm else None
+        index_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Files whose LLM stage started before the index was ready (no symbol context)
+        without_index: List[str] = []
+        
+        def analyze_staged(staged: StagedFile):
+            project_index = index_holder.get('index')
+            if project_index is None:
+                without_index.append(staged.path)
+            context = {'symbol_context': project_index.format_context(staged.path)} if project_index else None
+            return self._analyze_staged_timed(staged, context, progress, start_file)
+        
+        def llm_stage(staged: StagedFile):
+            return llm_executor.submit(analyze_staged, staged)
+        
+        # Discovery is lazy: excluded and ignored directories are never descended
+        # into, and files enter the pipeline as they are found
+        paths = iter_files(project_path, include_patterns, exclude_patterns, respect_gitignore)
+        selected = None
+        if shard is not None and shard_timings is not None:
+            # Balancing needs every file's timing or size up front
+            paths = list(paths)
+            selected = select_files(paths, project_path, shard, shard_timings).__contains__
+        elif shard is not None:
+            def selected(file_path: Path) -> bool:
+                return shard_of(relative_key(file_path, project_path), shard[1]) == shard[0]
+        
+        pipeline = Pipeline(
+            cpu_stage, llm_stage if use_llm else None,
+            lambda: index_executor.submit(build_index), collect,
+            cpu_workers=max_workers, llm_workers=llm_workers,
+            run_deadline=run_deadline, file_deadlines=file_deadlines, file_timeout=file_timeout,
+            emit=progress.emit if progress is not None else None,
+            finished=finish,
+            completed=journal.completed_result if journal is not None else None,
+            selected=selected,
+            cpu_window=coordinator.max_queued if coordinator is not None else None
+        )
+        
+        unfinished = []
+        clean = False
+        try:
+            unfinished = pipeline.run(paths)
+            clean = not unfinished
+        finally:
+            executors = [cpu_executor, index_executor, llm_executor]
+            for executor in filter(None, executors):
+                if clean:
+                    executor.shutdown(wait=True)
+                else:
+                    # Timed out or interrupted: don't wait for abandoned workers,
+                    # they stop at their next deadline check
+                    run_deadline.cancel()
+                    executor.shutdown(wait=False, cancel_futures=True)
+        
+        results['timed_out'] = bool(unfinished)
+        results['unfinished_files'] = sorted(str(file_path) for file_path in unfinished)
+        
+        self._summarize_project(results, store)
+        results['duration'] = round(time.perf_counter() - started, 3)
+        if shard is not None:
+            results['shard'] = {'index': shard[0], 'count': shard[1], 'files': pipeline.queued,
+                                'balanced': shard_timings is not None}
+        if coordinator is not None:
+            results['distributed'] = coordinator.stats()
+        if journal is not None:
+            results['run_id'] = journal.run_id
+            results['resumed_files'] = journal.resumed
+        if use_llm:
+            results['llm_files_without_index'] = len(without_index)
+            results['llm_concurrency'] = self.llm_analyzer.concurrency_stats()
+            if self.llm_analyzer.triage_model:
+                results['llm_triage'] = self.llm_analyzer.triage_stats()
+            if self.llm_analyzer.hedger is not None:
+                results['llm_hedging'] = self.llm_analyzer.hedger.stats()
+        if progress is not None:
+            progress.emit('finished', total_issues=results['total_issues'])
         
         return results
     
-    def _merge_issues(self, rule_issues: List[Dict], llm_issues: List[Dict]) -> List[Dict]:
-        """Merge rule-based and LLM issues, avoiding duplicates."""
-        merged = list(rule_issues)
-        
-        for llm_issue in llm_issues:
-            # Check if similar issue already exists
-            is_duplicate = False
-            for rule_issue in rule_issues:
-                if self._issues_similar(rule_issue, llm_issue):
-                    # Enhance rule issue with LLM insights if available
-                    if llm_issue.get('references') and not rule_issue.get('references'):
-                        rule_issue['references'] = llm_issue['references']
-                    is_duplicate = True
-                    break
+    def merge_project_results(self, reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine project reports, e.g. of the shards of one run, into one.
+        
+        Files are keyed by their path relative to each report's project root,
+        so shards checked out at different locations merge cleanly. Totals,
+        severity counts, top issues and optimization opportunities are
+        recomputed over all issues; 'duration' is that of the slowest report.
+        
+        Args:
+            reports: Project results as written by 'analyze --output json'
             
-            if not is_duplicate:
-                merged.append(llm_issue)
+        Returns:
+            Merged project results; 'shards' lists the shard indexes merged and
+            missing when the reports came from 'analyze --shard'
+            
+        Raises:
+            ValueError: If a report is not a project report, or the reports are
+                from different shard counts or repeat a shard
+        """
+        if not reports:
+            raise ValueError("No reports to merge")
+        for report in reports:
+            if not isinstance(report, dict) or not isinstance(report.get('issues_by_file'), dict):
+                raise ValueError("Only project reports (of a directory) can be merged")
+        
+        root = Path(reports[0]['project_path'])
+        results = {
+            'project_path': str(root),
+            'files_analyzed': 0,
+            'total_issues': 0,
+            'issues_by_severity': {'error': 0, 'warning': 0, 'info': 0},
+            'issues_by_file': {},
+            'top_issues': [],
+            'analysis_methods': [],
+            'file_timings': {},
+            'timed_out': False,
+            'unfinished_files': [],
+            'skipped_files': {},
+            'rules_only_files': {},
+            'duration': 0.0
+        }
+        shard_counts = set()
+        shard_indexes: List[int] = []
+        unfinished = set()
+        file_results = {}
         
-        # Sort by severity and confidence
-        severity_order = {'error': 0, 'warning': 1, 'info': 2}
-        merged.sort(key=lambda x: (
-            severity_order.get(x.get('severity', 'info'), 3),
-            -x.get('confidence', 0)
-        ))
+        for report in reports:
+            base = report.get('project_path', '')
+            
+            def rebase(file_path: str) -> str:
+                return str(root / relative_key(file_path, base))
+            
+            shard = report.get('shard')
+            if shard:
+                if shard['index'] in shard_indexes:
+                    raise ValueError(f"Shard {shard['index']}/{shard['count']} appears in more than one report")
+                shard_counts.add(shard['count'])
+                shard_indexes.append(shard['index'])
+            
+            for key in ('file_timings', 'skipped_files', 'rules_only_files'):
+                for file_path, value in report.get(key, {}).items():
+                    results[key][rebase(file_path)] = value
+            for file_path, file_result in report['issues_by_file'].items():
+                file_results[rebase(file_path)] = file_result
+            unfinished.update(rebase(file_path) for file_path in report.get('unfinished_files', []))
+            for method in report.get('analysis_methods', []):
+                if method not in results['analysis_methods']:
+                    results['analysis_methods'].append(method)
+            results['timed_out'] = results['timed_out'] or bool(report.get('timed_out'))
+            results['duration'] = max(results['duration'], report.get('duration') or 0.0)
+        
+        if len(shard_counts) > 1:
+            raise ValueError(f"Reports come from different shard counts: {sorted(shard_counts)}")
+        if shard_counts:
+            count = shard_counts.pop()
+            results['shards'] = {
+                'count': count,
+                'merged': sorted(shard_indexes),
+                'missing': [index for index in range(1, count + 1) if index not in shard_indexes]
+            }
         
-        return merged
+        # Rebuild issue records and the columnar store in a stable file order
+        store = IssueStore()
+        for file_path in sorted(file_results):
+            file_result = dict(file_results[file_path])
+            file_result['issues'] = [DetectedIssue.from_dict(issue) for issue in file_result.get('issues', [])]
+            # Name the file under the merged root, like its key (shards may run in other checkouts)
+            for entry in [file_result, *file_result['issues']]:
+                for field in ('file', 'file_path'):
+                    if entry.get(field):
+                        entry[field] = file_path
+            results['issues_by_file'][file_path] = file_result
+            if file_result['issues']:
+                results['files_analyzed'] += 1
+                store.add(file_path, file_result['issues'])
+        results['unfinished_files'] = sorted(unfinished)
+        
+        self._summarize_project(results, store)
+        return results
+    
+    def llm_concurrency_limit(self) -> Optional[int]:
+        """Current concurrency limit of the deep model (None if unlimited)."""
+        limiter = self.llm_analyzer.limiter()
+        return limiter.limit if limiter is not None else None
+    
+    def _llm_workers(self, max_workers: int) -> int:
+        """Threads for the LLM stage: enough for the Gemini concurrency limit to use."""
+        limiter = self.llm_analyzer.limiter()
+        return limiter.maximum if limiter is not None else max_workers
+    
+    def _stage_file_timed(self, file_path: Path, include_llm: bool,
+                          progress: Optional[ProgressTracker] = None,
+                          start_deadline: Optional[Callable[[Path], Deadline]] = None) -> StagedFile:
+        """Run the CPU stage of a file and add its time to the staged file."""
+        start = time.perf_counter()
+        if start_deadline is not None:
+            start_deadline(file_path)
+        staged = self.stage_file(file_path, include_llm, progress)
+        staged.seconds += time.perf_counter() - start
+        return staged
+    
+    def _analyze_staged_timed(self, staged: StagedFile, project_context: Dict[str, Any] = None,
+                              progress: Optional[ProgressTracker] = None,
+                              start_deadline: Optional[Callable[[str], Deadline]] = None):
+        """Run the LLM stage of a file. Returns (result, seconds spent on the file)."""
+        start = time.perf_counter()
+        deadline = start_deadline(staged.path) if start_deadline is not None else None
+        self.analyze_staged(staged, project_context, progress, deadline)
+        staged.seconds += time.perf_counter() - start
+        return self.finish_file(staged), staged.seconds
+
+    def _merge_issues(self, rule_issues: List[Dict], llm_issues: List[Dict]) -> List[Dict]:
+        """Merge rule-based and LLM issues, avoiding duplicates (linear time)."""
+        return merge_issues(rule_issues, llm_issues)
     
     def _issues_similar(self, issue1: Dict, issue2: Dict) -> bool:
         """Check if two issues are similar enough to be considered duplicates."""
-        # Same title is a strong indicator
-        if issue1.get('title', '').lower() == issue2.get('title', '').lower():
-            return True
-        
-        # Check for similar key terms
-        title1 = issue1.get('title', '').lower()
-        title2 = issue2.get('title', '').lower()
-        desc1 = issue1.get('description', '').lower()
-        desc2 = issue2.get('description', '').lower()
-        
-        # Common duplicate patterns
-        duplicate_patterns = [
-            ('model.eval()', 'eval()'),
-            ('torch.no_grad()', 'no_grad'),
-            ('batch_size', 'batch size'),
-            ('memory leak', 'loss.item()'),
-            ('mse', 'classification')
-        ]
-        
-        for pattern1, pattern2 in duplicate_patterns:
-            if (pattern1 in title1 or pattern1 in desc1) and (pattern2 in title2 or pattern2 in desc2):
-                return True
-            if (pattern2 in title1 or pattern2 in desc1) and (pattern1 in title2 or pattern1 in desc2):
-                return True
-        
-        return False
+        return IssueIndex([issue1]).find_duplicate(issue2) is not None
     
     def _generate_summary(self, issues: List[Dict]) -> Dict[str, Any]:
         """Generate summary statistics for issues."""
-        summary = {
-            'total': len(issues),
-            'by_severity': {'error': 0, 'warning': 0, 'info': 0},
-            'by_category': {},
+        store = IssueStore.from_issues(issues)
+        return {
+            'total': len(store),
+            'by_severity': store.count_by_severity(),
+            'by_category': store.count_by_category(),
             'estimated_impact': self._estimate_impact(issues)
         }
-        
-        for issue in issues:
-            # Count by severity
-            severity = issue.get('severity', 'info')
-            summary['by_severity'][severity] += 1
-            
-            # Count by category
-            category = issue.get('category', 'general')
-            summary['by_category'][category] = summary['by_category'].get(category, 0) + 1
-        
-        return summary
     
     def _estimate_impact(self, issues: List[Dict]) -> Dict[str, str]:
         """Estimate potential performance impact of fixing issues."""
@@ -306,9 +850,8 @@ class DeepOptimizer:
             'accuracy': 'minimal'
         }
         
-        # Check for high-impact issues
-        for issue in issues:
-            title_lower = issue.get('title', '').lower()
+        # Check for high-impact issues (each distinct title once)
+        for title_lower in {issue.get('title', '').lower() for issue in issues}:
             
             # Speed impact
             if any(term in title_lower for term in ['batch size', 'mixed precision', 'gpu', 'dataloader']):
@@ -324,46 +867,27 @@ class DeepOptimizer:
         
         return impact
     
-    def _get_top_issues(self, issues_by_file: Dict) -> List[Dict]:
-        """Get the most common issues across all files."""
-        issue_counts = {}
-        
-        for file_result in issues_by_file.values():
-            if isinstance(file_result, dict) and 'issues' in file_result:
-                for issue in file_result['issues']:
-                    title = issue.get('title', '')
-                    if title:
-                        if title not in issue_counts:
-                            issue_counts[title] = {
-                                'count': 0,
-                                'severity': issue.get('severity', 'info'),
-                                'example': issue
-                            }
-                        issue_counts[title]['count'] += 1
-        
-        # Sort by count and severity
-        severity_order = {'error': 0, 'warning': 1, 'info': 2}
-        top_issues = sorted(
-            issue_counts.values(),
-            key=lambda x: (-x['count'], severity_order.get(x['severity'], 3))
-        )
-        
-        return top_issues[:10]
+    def _summarize_project(self, results: Dict, store: IssueStore):
+        """Generate project-wide insights from the columnar store."""
+        results['total_issues'] = len(store)
+        results['issues_by_severity'] = store.count_by_severity()
+        results['issues_by_rule'] = store.count_by_rule()
+        results['top_issues'] = self._get_top_issues(store)
+        results['optimization_opportunities'] = self._identify_optimization_opportunities(results, store)
+    
+    def _get_top_issues(self, store: IssueStore) -> List[Dict]:
+        """Get the most common issues across all files (grouped by rule ID, else title)."""
+        return store.top_issues(limit=10)
     
-    def _identify_optimization_opportunities(self, results: Dict) -> List[Dict]:
+    def _identify_optimization_opportunities(self, results: Dict, store: IssueStore) -> List[Dict]:
         """Identify project-wide optimization opportunities."""
         opportunities = []
         
         # Check for common patterns
         total_files = results['files_analyzed']
-        issues_by_file = results['issues_by_file']
         
         # Missing mixed precision
-        mixed_precision_count = sum(
-            1 for file_result in issues_by_file.values()
-            if any('mixed precision' in issue.get('title', '').lower() 
-                  for issue in file_result.get('issues', []))
-        )
+        mixed_precision_count = store.files_with_title('mixed precision')
         
         if mixed_precision_count > total_files * 0.3:
             opportunities.append({
@@ -374,11 +898,7 @@ class DeepOptimizer:
             })
         
         # Batch size issues
-        batch_size_issues = sum(
-            1 for file_result in issues_by_file.values()
-            if any('batch size' in issue.get('title', '').lower() 
-                  for issue in file_result.get('issues', []))
-        )
+        batch_size_issues = store.files_with_title('batch size')
         
         if batch_size_issues > 0:
             opportunities.append({
@@ -388,4 +908,22 @@ class DeepOptimizer:
                 'description': 'Small batch sizes are limiting GPU utilization'
             })
         
-        return opportunities
\ No newline at end of file
+        return opportunities
+
+
+# Analyzer of the current process-pool worker (see DeepOptimizer.executor)
+_worker_optimizer: Optional[DeepOptimizer] = None
+
+
+def _init_worker(options: Dict[str, Any]):
+    global _worker_optimizer
+    _worker_optimizer = DeepOptimizer(**options)
+
+
+def _stage_in_worker(file_path: Path, include_llm: bool) -> StagedFile:
+    """Run a file's CPU stage in a process-pool worker (the LLM stage runs in the parent)."""
+    start = time.perf_counter()
+    staged = _worker_optimizer.stage_file(file_path, include_llm)
+    staged.unit = None  # Rebuilt from the code if needed; not worth pickling
+    staged.seconds = time.perf_counter() - start
+    return staged
@@ -0,0 +1,486 @@
+"""
+Message brokers for distributed runs: named FIFO queues plus small keys.
+
+A broker only needs to push JSON messages onto a named queue, pop them with
+a timeout, and get/set/delete keys; the coordinator and workers (see
+distributed.py) build everything else on top. Two brokers are included:
+
+- SQLiteBroker keeps queues in one SQLite file, for runs on one machine
+  (several worker processes) and for tests.
+- RedisBroker speaks the Redis protocol (RESP) over a plain socket, so it
+  works with a Redis server or with the stand-in from serve_broker() /
+  ``deepoptimizer broker`` when there is no Redis to hand.
+
+open_broker() picks one from a URL: ``redis://host:port/db`` or
+``sqlite:///path/to/queue.sqlite3`` (a bare path means SQLite too).
+"""
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+from .issues import json_default
+
+DEFAULT_REDIS_PORT = 6379
+
+# Polling interval bounds of the SQLite broker while a queue is empty (seconds)
+_MIN_POLL = 0.02
+_MAX_POLL = 0.5
+
+
+class BrokerError(RuntimeError):
+    """Raised when the broker can't be reached or rejects a command."""
+
+
+class Broker(ABC):
+    """Named FIFO queues and keys holding JSON values."""
+
+    @abstractmethod
+    def push(self, queue: str, message: Dict[str, Any]):
+        """Append a message to a queue."""
+
+    @abstractmethod
+    def pop(self, queue: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the oldest message of a queue, waiting up to ``timeout`` seconds (None if empty)."""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a value under a key."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """A key's value (None if unset)."""
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        """Remove keys and queues."""
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> 'Broker':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _encode(message: Dict[str, Any]) -> str:
+    return json.dumps(message, default=json_default)
+
+
+class SQLiteBroker(Broker):
+    """Queues in a local SQLite file; safe to share between threads and processes."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        queue TEXT NOT NULL,
+        body TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_queue ON messages(queue, id);
+    CREATE TABLE IF NOT EXISTS keys (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open (and create if needed) a queue database.
+
+        Args:
+            path: SQLite file shared by the coordinator and its workers
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _locked(self):
+        """Serialize use of the connection, reporting SQLite errors as BrokerErrors."""
+        with self._lock:
+            try:
+                yield
+            except sqlite3.Error as e:
+                raise BrokerError(f"Queue database {self.path}: {e}") from None
+
+    def push(self, queue: str, message: Dict[str, Any]):
+        with self._locked():
+            self.conn.execute('INSERT INTO messages (queue, body) VALUES (?, ?)', (queue, _encode(message)))
+
+    def pop(self, queue: str, timeout: float) -> Optional[Dict[str, Any]]:
+        give_up = time.monotonic() + timeout
+        poll = _MIN_POLL
+        while True:
+            body = self._take(queue)
+            if body is not None:
+                return json.loads(body)
+            remaining = give_up - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(poll, remaining))
+            poll = min(poll * 2, _MAX_POLL)
+
+    def _take(self, queue: str) -> Optional[str]:
+        with self._locked():
+            # IMMEDIATE takes the write lock up front, so two workers never take the same row
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute('SELECT id, body FROM messages WHERE queue = ? ORDER BY id LIMIT 1',
+                                        (queue,)).fetchone()
+                if row is not None:
+                    self.conn.execute('DELETE FROM messages WHERE id = ?', (row[0],))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return row[1] if row is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._locked():
+            self.conn.execute('INSERT OR REPLACE INTO keys (key, value) VALUES (?, ?)', (key, _encode(value)))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._locked():
+            row = self.conn.execute('SELECT value FROM keys WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def delete(self, *keys: str):
+        with self._locked():
+            for key in keys:
+                self.conn.execute('DELETE FROM keys WHERE key = ?', (key,))
+                self.conn.execute('DELETE FROM messages WHERE queue = ?', (key,))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class RespConnection:
+    """A minimal blocking Redis protocol (RESP2) client connection."""
+
+    def __init__(self, host: str, port: int, connect_timeout: float = 10.0):
+        try:
+            self.sock = socket.create_connection((host, port), timeout=connect_timeout)
+        except OSError as e:
+            raise BrokerError(f"Cannot connect to broker at {host}:{port}: {e}") from None
+        self.reader = self.sock.makefile('rb')
+
+    def command(self, *args: Union[str, bytes, int, float], timeout: Optional[float] = None) -> Any:
+        """Send a command and return its reply (bytes, int, list or None)."""
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.sendall(encode_command(*args))
+            return read_reply(self.reader)
+        except (OSError, ValueError) as e:
+            raise BrokerError(f"Broker connection failed: {e}") from None
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def encode_command(*args: Union[str, bytes, int, float]) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+def read_reply(reader) -> Any:
+    """
+    Read one RESP reply.
+
+    Raises:
+        BrokerError: For an error reply
+        ValueError: If the connection closed or sent something malformed
+    """
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ValueError("connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload
+    if kind == b'-':
+        raise BrokerError(payload.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ValueError("connection closed")
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ValueError(f"unexpected reply {line[:20]!r}")
+
+
+class RedisBroker(Broker):
+    """Queues as Redis lists (RPUSH/BLPOP) and keys as Redis strings."""
+
+    def __init__(self, host: str = 'localhost', port: int = DEFAULT_REDIS_PORT, db: int = 0):
+        """
+        Connect to a Redis server or the stand-in (see serve_broker).
+
+        Args:
+            host: Server host
+            port: Server port
+            db: Redis database number
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        # BLPOP blocks its connection, so every thread gets its own
+        self._local = threading.local()
+        self._connections: List[RespConnection] = []
+        self._lock = threading.Lock()
+        self._connection()  # Fail early if the server is unreachable
+
+    def _connection(self) -> RespConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = RespConnection(self.host, self.port)
+            if self.db:
+                connection.command('SELECT', self.db)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _command(self, *args: Union[str, bytes, int, float], timeout: Optional[float] = None) -> Any:
+        connection = self._connection()
+        try:
+            return connection.command(*args, timeout=timeout)
+        except BrokerError:
+            # The connection may be broken; this thread's next command opens a new one
+            self._local.connection = None
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            connection.close()
+            raise
+
+    def push(self, queue: str, message: Dict[str, Any]):
+        self._command('RPUSH', queue, _encode(message))
+
+    def pop(self, queue: str, timeout: float) -> Optional[Dict[str, Any]]:
+        # BLPOP takes fractional seconds since Redis 6; 0 would block forever
+        timeout = max(timeout, 0.01)
+        reply = self._command('BLPOP', queue, f'{timeout:.3f}', timeout=timeout + 10)
+        return json.loads(reply[1]) if reply else None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self._command('SET', key, _encode(value))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        reply = self._command('GET', key)
+        return json.loads(reply) if reply is not None else None
+
+    def delete(self, *keys: str):
+        if keys:
+            self._command('DEL', *keys)
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+def open_broker(url: str) -> Broker:
+    """
+    Open the broker a URL names.
+
+    Args:
+        url: ``redis://host[:port][/db]``, ``sqlite:///path`` or a file path
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+        BrokerError: If a Redis server can't be reached
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'redis':
+        db = parsed.path.strip('/')
+        return RedisBroker(parsed.hostname or 'localhost', parsed.port or DEFAULT_REDIS_PORT,
+                           int(db) if db else 0)
+    if parsed.scheme == 'sqlite':
+        return SQLiteBroker(parsed.path)
+    if parsed.scheme in ('', 'file') or len(parsed.scheme) == 1:  # 1 letter: a Windows drive
+        return SQLiteBroker(parsed.path if parsed.scheme == 'file' else url)
+    raise ValueError(f"Unsupported broker URL '{url}' (expected redis://host:port or sqlite:///path)")
+
+
+class _BrokerState:
+    """In-memory lists and strings of the stand-in server."""
+
+    def __init__(self):
+        self.lists: Dict[bytes, Deque[bytes]] = {}
+        self.strings: Dict[bytes, bytes] = {}
+        self.condition = threading.Condition()
+
+    def execute(self, args: List[bytes]) -> Any:
+        name = args[0].upper().decode('ascii', 'replace')
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return BrokerError(f"ERR unknown command '{name}'")
+        try:
+            with self.condition:
+                return handler(*args[1:])
+        except (TypeError, ValueError):
+            return BrokerError(f"ERR wrong arguments for '{name}'")
+
+    def cmd_ping(self, *message):
+        return message[0] if message else b'PONG'
+
+    def cmd_select(self, db):
+        return b'OK'
+
+    def cmd_rpush(self, key, *values):
+        items = self.lists.setdefault(key, deque())
+        items.extend(values)
+        self.condition.notify_all()
+        return len(items)
+
+    def cmd_lpush(self, key, *values):
+        items = self.lists.setdefault(key, deque())
+        items.extendleft(values)
+        self.condition.notify_all()
+        return len(items)
+
+    def cmd_lpop(self, key):
+        items = self.lists.get(key)
+        return items.popleft() if items else None
+
+    def cmd_llen(self, key):
+        return len(self.lists.get(key, ()))
+
+    def cmd_blpop(self, *args):
+        keys, timeout = args[:-1], float(args[-1])
+        if not keys:
+            raise ValueError
+        give_up = time.monotonic() + timeout if timeout > 0 else None
+        while True:
+            for key in keys:
+                items = self.lists.get(key)
+                if items:
+                    return [key, items.popleft()]
+            remaining = give_up - time.monotonic() if give_up is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            self.condition.wait(remaining)
+
+    def cmd_set(self, key, value):
+        self.strings[key] = value
+        return b'OK'
+
+    def cmd_get(self, key):
+        return self.strings.get(key)
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += (self.strings.pop(key, None) is not None) + (self.lists.pop(key, None) is not None)
+        return removed
+
+
+def _encode_reply(reply: Any) -> bytes:
+    if isinstance(reply, BrokerError):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(_encode_reply(item) for item in reply)
+    if reply == b'OK' or reply == b'PONG':
+        return b'+%s\r\n' % reply
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = read_reply(self.rfile)
+            except (OSError, ValueError, BrokerError):
+                return
+            if not isinstance(args, list) or not args:
+                return
+            if args[0].upper() == b'QUIT':
+                self.wfile.write(b'+OK\r\n')
+                return
+            try:
+                self.wfile.write(_encode_reply(self.server.state.execute(args)))
+            except OSError:
+                return
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """
+    Stand-in for a Redis server: the list and string commands the brokers use.
+
+    Supports PING, SELECT, RPUSH, LPUSH, LPOP, LLEN, BLPOP, SET, GET and DEL,
+    in memory only. Meant for a build farm without Redis and for tests, not
+    as a general-purpose Redis replacement.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = 'localhost', port: int = DEFAULT_REDIS_PORT):
+        super().__init__((host, port), _RespHandler)
+        self.state = _BrokerState()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}'
+
+
+def serve_broker(host: str = 'localhost', port: int = DEFAULT_REDIS_PORT,
+                 background: bool = False) -> BrokerServer:
+    """
+    Run the stand-in broker server.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free one)
+        background: Serve from a daemon thread and return at once;
+            otherwise serve until interrupted
+
+    Returns:
+        The server (call shutdown() to stop a background one)
+    """
+    server = BrokerServer(host, port)
+    if background:
+        threading.Thread(target=server.serve_forever, name='deepoptimizer-broker', daemon=True).start()
+    else:
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+    return server
@@ -0,0 +1,287 @@
+"""
+Persistent cache for LLM analysis results keyed by normalized code structure.
+
+Results are stored per top-level definition (per code cell, for notebooks),
+keyed by a fingerprint of its AST (so whitespace, comments and import order don't matter). Line numbers
+are stored as structural anchors and remapped onto the current source on a
+cache hit. Issues without a line (whole-file findings) are stored under a
+key of the whole file, as they depend on all of it.
+"""
+import ast
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from .issues import DetectedIssue
+
+# Bump when the prompt or issue format changes in a way that invalidates old entries
+CACHE_VERSION = 2
+
+MODULE_SEGMENT = '<module>'
+
+
+def default_cache_dir() -> Path:
+    """Get the cache directory (DEEPOPTIMIZER_CACHE_DIR or ~/.cache/deepoptimizer)."""
+    env_dir = os.environ.get('DEEPOPTIMIZER_CACHE_DIR')
+    if env_dir:
+        return Path(env_dir)
+    return Path.home() / '.cache' / 'deepoptimizer'
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _normalize(node: ast.AST) -> str:
+    """Dump a node without positions, so formatting and comments are ignored."""
+    return ast.dump(node, annotate_fields=False, include_attributes=False)
+
+
+@dataclass(eq=False)
+class CodeSegment:
+    """A unit of caching: one top-level definition or notebook cell, or all module-level statements."""
+    name: str
+    kind: str  # 'function', 'class', 'cell' or 'module'
+    statements: List[ast.stmt]
+    fingerprint: str
+    lines: List[Tuple[int, int]] = field(default_factory=list)  # (start, end) per statement
+    extent: Optional[Tuple[int, int]] = None  # Whole line range, when wider than the statements
+
+    def contains(self, line: int) -> bool:
+        """Check if a line falls inside this segment."""
+        return any(start <= line <= end for start, end in self.lines)
+
+
+def _statement_span(node: ast.stmt) -> Tuple[int, int]:
+    start = node.lineno
+    for decorator in getattr(node, 'decorator_list', []):
+        start = min(start, decorator.lineno)
+    return start, getattr(node, 'end_lineno', None) or node.lineno
+
+
+def split_segments(code: str, tree: Optional[ast.Module] = None,
+                   cells: Optional[List[Any]] = None) -> Optional[List[CodeSegment]]:
+    """
+    Split code into cacheable segments.
+
+    Every top-level function and class becomes its own segment; all other
+    top-level statements (imports, constants, scripts) form a single module
+    segment. Imports are fingerprinted order-independently.
+
+    Args:
+        code: Source code
+        tree: Parsed code, if already available
+        cells: Notebook code cells (see notebook.NotebookCell); when given,
+            each cell becomes one segment and the module segment is empty
+
+    Returns:
+        List of segments, or None if the code does not parse
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+
+    if cells is not None:
+        return _split_cells(tree, cells)
+
+    segments = []
+    module_statements = []
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+            segments.append(CodeSegment(
+                name=node.name,
+                kind=kind,
+                statements=[node],
+                fingerprint=_hash(_normalize(node)),
+                lines=[_statement_span(node)]
+            ))
+        else:
+            module_statements.append(node)
+
+    imports = sorted(
+        _normalize(n) for n in module_statements
+        if isinstance(n, (ast.Import, ast.ImportFrom))
+    )
+    others = [
+        _normalize(n) for n in module_statements
+        if not isinstance(n, (ast.Import, ast.ImportFrom))
+    ]
+    segments.append(CodeSegment(
+        name=MODULE_SEGMENT,
+        kind='module',
+        statements=module_statements,
+        fingerprint=_hash('\n'.join(imports + others)),
+        lines=[_statement_span(n) for n in module_statements]
+    ))
+
+    return segments
+
+
+def _split_cells(tree: ast.Module, cells: List[Any]) -> List[CodeSegment]:
+    """One segment per notebook cell, so editing a cell only invalidates that cell."""
+    starts = [cell.start_line for cell in cells]
+    statements: List[List[ast.stmt]] = [[] for _ in cells]
+    for node in tree.body:
+        position = bisect.bisect_right(starts, node.lineno) - 1
+        statements[max(position, 0)].append(node)
+
+    segments = [
+        CodeSegment(
+            name=str(cell.index),
+            kind='cell',
+            statements=nodes,
+            fingerprint=_hash('\n'.join(_normalize(n) for n in nodes)),
+            lines=[_statement_span(n) for n in nodes],
+            extent=(cell.start_line, cell.end_line) if cell.end_line >= cell.start_line else None
+        )
+        for cell, nodes in zip(cells, statements)
+    ]
+    segments.append(CodeSegment(name=MODULE_SEGMENT, kind='module', statements=[], fingerprint=_hash('')))
+    return segments
+
+
+def _anchor_nodes(statement: ast.stmt) -> List[int]:
+    """Line numbers of all positioned nodes in a statement, in walk order."""
+    return [n.lineno for n in ast.walk(statement) if hasattr(n, 'lineno')]
+
+
+def anchor_line(segment: CodeSegment, line: int) -> Optional[List[Any]]:
+    """
+    Convert an absolute line into a structural anchor within a segment.
+
+    The anchor is [statement fingerprint, node index, line offset], which stays
+    valid when the segment is reformatted or moved within the file.
+    """
+    for statement, (start, end) in zip(segment.statements, segment.lines):
+        if not start <= line <= end:
+            continue
+
+        # Closest node starting at or before the line
+        linenos = _anchor_nodes(statement)
+        best_index = None
+        for index, lineno in enumerate(linenos):
+            if lineno <= line and (best_index is None or lineno > linenos[best_index]):
+                best_index = index
+        if best_index is None:
+            best_index = linenos.index(min(linenos))
+
+        return [_hash(_normalize(statement)), best_index, line - linenos[best_index]]
+
+    return None
+
+
+def resolve_anchor(segment: CodeSegment, anchor: List[Any]) -> Optional[int]:
+    """Convert a structural anchor back into an absolute line in a segment."""
+    statement_hash, index, offset = anchor
+
+    for statement in segment.statements:
+        if _hash(_normalize(statement)) == statement_hash:
+            linenos = _anchor_nodes(statement)
+            if index < len(linenos):
+                return linenos[index] + offset
+            return None
+
+    return None
+
+
+def encode_issue(issue: Dict[str, Any], segment: CodeSegment) -> Dict[str, Any]:
+    """Prepare an issue for storage by replacing line numbers with anchors."""
+    stored = {k: v for k, v in issue.items() if k not in ('line_numbers', 'file')}
+    anchors = []
+    for line in issue.get('line_numbers') or []:
+        anchor = anchor_line(segment, line) if isinstance(line, int) else None
+        if anchor is not None:
+            anchors.append(anchor)
+    stored['_anchors'] = anchors
+    return stored
+
+
+def decode_issue(stored: Dict[str, Any], segment: CodeSegment) -> DetectedIssue:
+    """Restore a cached issue, remapping its anchors onto the current source."""
+    issue = DetectedIssue.from_dict({k: v for k, v in stored.items() if k != '_anchors'})
+    lines = []
+    for anchor in stored.get('_anchors', []):
+        line = resolve_anchor(segment, anchor)
+        if line is not None:
+            lines.append(line)
+    issue['line_numbers'] = lines
+    return issue
+
+
+def segment_for_line(segments: List[CodeSegment], line: Optional[int]) -> CodeSegment:
+    """Find the segment owning a line (the module segment if none does)."""
+    if line is not None:
+        for segment in segments:
+            if segment.kind != 'module' and segment.contains(line):
+                return segment
+    return segments[-1]
+
+
+class AnalysisCache:
+    """On-disk store of LLM issues per code segment fingerprint."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, namespace: str = ''):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cache entries (default: default_cache_dir())
+            namespace: Extra key material (model name, prompt options) that
+                invalidates entries when it changes
+        """
+        self.cache_dir = Path(cache_dir or default_cache_dir()) / 'llm'
+        self.namespace = namespace
+
+    def key(self, segment: CodeSegment, context: str = '') -> str:
+        """Build the cache key for a segment."""
+        return _hash(f"{CACHE_VERSION}\0{self.namespace}\0{context}\0{segment.fingerprint}")
+
+    def file_key(self, segments: List[CodeSegment], context: str = '') -> str:
+        """Build the cache key for a file's whole-file issues (every segment is part of it)."""
+        fingerprint = _hash('\n'.join(segment.fingerprint for segment in segments))
+        return _hash(f"{CACHE_VERSION}\0{self.namespace}\0{context}\0<file>\0{fingerprint}")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Get stored issues for a key, or None on a miss."""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, issues: List[Dict[str, Any]]):
+        """Store issues for a key (atomic, safe across threads and processes)."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(issues, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Cache is best-effort; analysis results are still returned
+            pass
+
+    def clear(self) -> int:
+        """Remove all cached entries. Returns number of entries removed."""
+        removed = 0
+        if self.cache_dir.exists():
+            for entry in self.cache_dir.glob('*/*.json'):
+                try:
+                    entry.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
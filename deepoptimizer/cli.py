@@ -1,16 +1,34 @@
 """
 Command-line interface for DeepOptimizer.
 """
+import json
 import os
 import sys
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import click
+from click.core import ParameterSource
 
 from .analyzer import DeepOptimizer
+from .cache import default_cache_dir
 from .formatter import OutputFormatter
 from .knowledge_base import KnowledgeBase
+from .rule_detector import RULES, PROFILES
+from .history import ResultsDB, default_history_path
+from .journal import RunJournal
+from .sharding import parse_shard, load_timings
+from .broker import BrokerError, DEFAULT_REDIS_PORT, open_broker, serve_broker
+from .distributed import Coordinator, DEFAULT_QUEUE, TASK_TIMEOUT, run_worker, worker_name
+from .pipeline import FILE_TIMEOUT_GRACE
+from .progress import ProgressTracker, JsonProgressStream, RichProgressDisplay
+from .timeouts import Deadline
+from .config import load_config, EXECUTORS
+from .discovery import DEFAULT_EXCLUDE_PATTERNS
+from .reader import GENERATED_POLICIES, parse_size
 from .utils import safe_print
 
 
@@ -27,17 +45,69 @@ def cli():
 
 
 @cli.command()
-@click.argument('path', type=click.Path(exists=True))
+@click.argument('path', required=False, type=click.Path(exists=True))
 @click.option('--api-key', envvar='GEMINI_API_KEY', help='Gemini API key (or set GEMINI_API_KEY env var)')
 @click.option('--no-llm', is_flag=True, help='Use only rule-based analysis (no LLM)')
+@click.option('--no-cache', is_flag=True, help='Ignore cached LLM results and re-analyze everything')
+@click.option('--triage/--no-triage', default=None,
+              help='Screen files with GEMINI_TRIAGE_MODEL first and send only flagged code to the deep model '
+                   '[default: off]')
+@click.option('--no-gitignore', is_flag=True, help='Also analyze files ignored by .gitignore')
+@click.option('--select', help='Comma-separated rule IDs or prefixes to run (e.g. DO101,DO2)')
+@click.option('--ignore', help='Comma-separated rule IDs or prefixes to skip')
+@click.option('--profile', type=click.Choice(list(PROFILES)),
+              help='Rule profile (fast runs only cheap rules, e.g. for pre-commit) [default: full]')
 @click.option('--output', '-o', type=click.Choice(['rich', 'simple', 'json', 'markdown']), 
-              default='rich', help='Output format')
+              help='Output format [default: rich]')
 @click.option('--export', '-e', type=click.Path(), help='Export results to file')
 @click.option('--no-code', is_flag=True, help='Hide code snippets in output')
 @click.option('--severity', type=click.Choice(['all', 'error', 'warning', 'info']), 
-              default='all', help='Filter by severity level')
-def analyze(path: str, api_key: Optional[str], no_llm: bool, output: str, 
-           export: Optional[str], no_code: bool, severity: str):
+              help='Filter by severity level [default: all]')
+@click.option('--progress', 'progress_style', type=click.Choice(['auto', 'rich', 'json', 'none']),
+              default='auto', help='Progress on stderr: live display, JSON lines, or none (auto: live on a terminal)')
+@click.option('--record', is_flag=True, help='Record this run in the history database')
+@click.option('--db', type=click.Path(dir_okay=False), help='History database to record to (implies --record)')
+@click.option('--timeout', type=click.FloatRange(min=0, min_open=True),
+              help='Seconds for the whole run; unfinished files are listed and skipped')
+@click.option('--file-timeout', type=click.FloatRange(min=0, min_open=True),
+              help='Seconds per file and stage; LLM analysis stops and rule results are kept')
+@click.option('--llm-timeout', type=click.FloatRange(min=0, min_open=True),
+              help='Seconds to wait for a single Gemini request before retrying')
+@click.option('--workers', '-j', type=click.IntRange(min=1), help='Workers for reading and rules; LLM calls have their own pool [default: 4]')
+@click.option('--executor', type=click.Choice(EXECUTORS),
+              help='Run workers as threads or processes [default: thread]')
+@click.option('--llm-concurrency', type=click.IntRange(min=1),
+              help='Maximum Gemini requests in flight at once per model [default: 16, adaptive]')
+@click.option('--no-adaptive-concurrency', is_flag=True,
+              help='Keep Gemini concurrency fixed at --llm-concurrency instead of adapting to 429s and latency')
+@click.option('--llm-hedge', type=click.FloatRange(min=0, max=100, min_open=True, max_open=True),
+              help='Duplicate Gemini requests still silent after this latency percentile (e.g. 95); first answer wins')
+@click.option('--llm-hedge-budget', type=click.FloatRange(min=0, min_open=True),
+              help='Maximum duplicate Gemini requests as a fraction of all requests [default: 0.05]')
+@click.option('--max-file-size', help='Skip files larger than this (e.g. 8MB) [default: 8MB]')
+@click.option('--max-llm-size', help='Analyze files larger than this with rules only (e.g. 512K) [default: 512K]')
+@click.option('--generated', type=click.Choice(GENERATED_POLICIES),
+              help='Generated, minified or data-heavy files: rules only, skip, or analyze normally [default: rules]')
+@click.option('--shard', 'shard_spec', metavar='K/N',
+              help='Analyze only shard K of N (e.g. 2/8), for splitting a project across machines')
+@click.option('--shard-timings', type=click.Path(exists=True, dir_okay=False),
+              help='JSON report of an earlier run; balance --shard by its per-file timings')
+@click.option('--broker', 'broker_url', metavar='URL',
+              help="Coordinate: hand files to 'deepoptimizer worker' processes via redis://host:port or sqlite:///path")
+@click.option('--queue', default=DEFAULT_QUEUE, show_default=True, help='Queue name shared with the workers')
+@click.option('--resume', 'resume_id', metavar='RUN_ID',
+              help='Resume an interrupted project run with its settings; files it finished are not analyzed again')
+@click.option('--config', 'config_path', type=click.Path(exists=True, dir_okay=False),
+              help='Config file (default: nearest .deepoptimizer)')
+def analyze(path: Optional[str], api_key: Optional[str], no_llm: bool, no_cache: bool, triage: Optional[bool], no_gitignore: bool,
+           select: Optional[str], ignore: Optional[str], profile: Optional[str], output: Optional[str],
+           export: Optional[str], no_code: bool, severity: Optional[str], progress_style: str, record: bool,
+           db: Optional[str], timeout: Optional[float], file_timeout: Optional[float],
+           llm_timeout: Optional[float], workers: Optional[int], executor: Optional[str],
+           llm_concurrency: Optional[int], no_adaptive_concurrency: bool, llm_hedge: Optional[float],
+           llm_hedge_budget: Optional[float], max_file_size: Optional[str], max_llm_size: Optional[str],
+           generated: Optional[str], shard_spec: Optional[str], shard_timings: Optional[str],
+           broker_url: Optional[str], queue: str, resume_id: Optional[str], config_path: Optional[str]):
     """
     Analyze a Python file or project for ML-specific issues.
     
@@ -54,33 +124,195 @@ def analyze(path: str, api_key: Optional[str], no_llm: bool, output: str,
         
         # Quick rule-based analysis only
         deepoptimizer analyze model.py --no-llm
+        
+        # Pre-commit: cheap rules only, skipping one rule
+        deepoptimizer analyze . --no-llm --profile fast --ignore DO114
+        
+        # Nightly run tracked over time (see 'deepoptimizer history')
+        deepoptimizer analyze ./src --record
+        
+        # CI: finish within 10 minutes, at most 2 minutes per file
+        deepoptimizer analyze ./src --timeout 600 --file-timeout 120
+        
+        # Rules only, CPU-bound: one process per core
+        deepoptimizer analyze ./src --no-llm --executor process -j 8
+        
+        # Pick up an interrupted project run where it stopped
+        deepoptimizer analyze --resume 20250106-142233-9f1c2a
+        
+        # CI fan-out: one shard per runner, then 'deepoptimizer merge'
+        deepoptimizer analyze ./src --shard 3/8 -o json --export shard3.json
+        
+        # Work queue: workers on other machines pull files as they free up
+        deepoptimizer analyze ./src --broker redis://farm-broker:6379
+    
+    Settings come from the nearest .deepoptimizer file (see 'deepoptimizer
+    init'), then DEEPOPTIMIZER_* environment variables, then these flags.
+    Project runs are journaled so an interrupted run can be resumed; the run
+    ID is printed when the run starts.
     """
-    path = Path(path)
+    if path is None and resume_id is None:
+        raise click.UsageError("Missing argument 'PATH' (or --resume RUN_ID).")
+    started_at = time.time()
+    
+    # Flags override the environment, which overrides the config file
+    overrides = {
+        'analysis': {
+            'use_llm': False if no_llm else None,
+            'triage': triage,
+            'output_format': output,
+            'severity_filter': severity,
+            'respect_gitignore': False if no_gitignore else None,
+            'profile': profile,
+            'select': _split_codes(select),
+            'ignore': _split_codes(ignore)
+        },
+        'performance': {
+            'max_workers': workers,
+            'executor': executor,
+            'timeout': timeout,
+            'file_timeout': file_timeout,
+            'llm_timeout': llm_timeout,
+            'llm_concurrency': llm_concurrency,
+            'adaptive_concurrency': False if no_adaptive_concurrency else None,
+            'llm_hedge_percentile': llm_hedge,
+            'llm_hedge_budget': llm_hedge_budget
+        },
+        'cache': {'enabled': False if no_cache else None},
+        'limits': {'generated': generated}
+    }
     
     # Initialize analyzer
     try:
-        analyzer = DeepOptimizer(api_key=api_key, use_llm=not no_llm)
-    except ValueError as e:
+        for key, size in (('max_bytes', max_file_size), ('max_llm_bytes', max_llm_size)):
+            if size is not None:
+                overrides['limits'][key] = parse_size(size)
+        config = load_config(config_path, overrides)
+        
+        # A resumed run keeps the settings it was started with; options given now may only repeat them
+        journal = None
+        if resume_id is not None:
+            journal = RunJournal.resume(_runs_dir(config), resume_id)
+            settings = _run_settings(config)
+            settings['shard'] = shard_spec
+            journal.check_settings(settings, _explicit_settings())
+            config = _run_config(config, journal.settings)
+            shard_spec = journal.settings.get('shard')
+        analysis = config['analysis']
+        no_llm = not analysis['use_llm']
+        output = analysis['output_format']
+        severity = analysis['severity_filter']
+        timeout = config['performance']['timeout']
+        file_timeout = config['performance']['file_timeout']
+        analyzer = DeepOptimizer.from_config(config, api_key=api_key)
+        
+        shard = parse_shard(shard_spec) if shard_spec else None
+        timings = load_timings(shard_timings) if shard_timings else None
+        if timings is not None and shard is None:
+            raise ValueError("--shard-timings needs --shard")
+        
+        # Journal project runs; a resumed run goes on with its own project
+        settings = _run_settings(config)
+        settings['shard'] = shard_spec
+        if journal is not None:
+            recorded_path = journal.header['project_path']
+            if path is None:
+                path = recorded_path
+            elif Path(path).resolve() != Path(recorded_path):
+                raise ValueError(f"Run {resume_id} analyzed {recorded_path}, not {path}")
+        elif config['cache']['journal'] and Path(path).is_dir():
+            journal = RunJournal.create(_runs_dir(config), path, settings)
+        
+        coordinator = None
+        if broker_url:
+            if not Path(path).is_dir():
+                raise ValueError("--broker needs a project directory")
+            # A worker gets each of its two stages' file timeout before it is presumed lost
+            task_timeout = 2 * file_timeout + FILE_TIMEOUT_GRACE if file_timeout else TASK_TIMEOUT
+            coordinator = Coordinator(open_broker(broker_url), path, settings, queue=queue,
+                                      task_timeout=task_timeout)
+    except (ValueError, BrokerError) as e:
         click.echo(click.style(f"Error: {e}", fg='red'), err=True)
         if not no_llm:
             click.echo("\nTip: Use --no-llm for rule-based analysis without API key", err=True)
         sys.exit(1)
     
+    path = Path(path)
+    if shard is not None and not path.is_dir():
+        click.echo(click.style("Error: --shard needs a project directory", fg='red'), err=True)
+        sys.exit(1)
+    if journal is not None:
+        click.echo(f"Run journal: {journal.run_id} "
+                   f"(resume with: deepoptimizer analyze --resume {journal.run_id})", err=True)
+    if coordinator is not None:
+        click.echo(f"Coordinating on queue '{queue}' "
+                   f"(start workers with: deepoptimizer worker --broker {broker_url} --queue {queue})", err=True)
+    
     # Initialize formatter
     formatter = OutputFormatter(style=output, no_color=False)
     
+    # Progress goes to stderr so stdout stays clean for --output json
+    if progress_style == 'auto':
+        progress_style = 'rich' if sys.stderr.isatty() else 'none'
+    if progress_style == 'rich':
+        reporter = RichProgressDisplay()
+    elif progress_style == 'json':
+        reporter = JsonProgressStream()
+    else:
+        reporter = None
+    
     # Analyze based on path type
-    with click.progressbar(length=100, label='Analyzing', show_eta=False) as bar:
-        bar.update(10)
-        
+    try:
+        if coordinator is not None:
+            coordinator.start()
         if path.is_file():
             # Single file analysis
-            results = analyzer.analyze_file(path, include_llm=not no_llm)
-            bar.update(90)
+            tracker = None
+            if reporter is not None:
+                token_counter = (lambda: analyzer.llm_analyzer.usage.total) if analyzer.llm_analyzer else None
+                llm_limit = analyzer.llm_concurrency_limit if analyzer.llm_analyzer and not no_llm else None
+                tracker = ProgressTracker(reporter, token_counter, llm_limit)
+                tracker.emit('discovered', total=1)
+                tracker.emit('queued', str(path))
+            limits = [t for t in (timeout, file_timeout) if t is not None]
+            deadline = Deadline(min(limits)) if limits else None
+            results = analyzer.analyze_file(path, include_llm=not no_llm, progress=tracker,
+                                            deadline=deadline)
+            if tracker is not None:
+                tracker.emit('done', str(path))
+                tracker.emit('finished', total_issues=len(results.get('issues', [])))
         else:
             # Project analysis
-            results = analyzer.analyze_project(path, include_llm=not no_llm)
-            bar.update(90)
+            # Configured excludes add to the built-in ones (venv, .git, ...)
+            results = analyzer.analyze_project(path,
+                                               include_patterns=analysis['include_patterns'],
+                                               exclude_patterns=DEFAULT_EXCLUDE_PATTERNS + analysis['exclude_patterns'],
+                                               include_llm=not no_llm,
+                                               respect_gitignore=analysis['respect_gitignore'],
+                                               progress_callback=reporter,
+                                               journal=journal,
+                                               shard=shard,
+                                               shard_timings=timings,
+                                               coordinator=coordinator)
+    finally:
+        if reporter is not None:
+            reporter.close()
+        if coordinator is not None:
+            coordinator.close()
+            coordinator.broker.close()
+        if journal is not None:
+            journal.close()
+    
+    if results.get('timed_out'):
+        click.echo(click.style(
+            f"Warning: run timed out, {len(results['unfinished_files'])} file(s) not analyzed",
+            fg='yellow'), err=True)
+    
+    # Record before filtering so history always holds the full run
+    if record or db:
+        with ResultsDB(db) as history_db:
+            run_id = history_db.record_run(results, path, started_at, time.time() - started_at)
+        click.echo(f"Recorded run {run_id} in {history_db.path}", err=True)
     
     # Filter by severity if requested
     if severity != 'all' and 'issues' in results:
@@ -119,8 +351,164 @@ def analyze(path: str, api_key: Optional[str], no_llm: bool, output: str,
     else:
         error_count = results.get('issues_by_severity', {}).get('error', 0)
     
-    if error_count > 0:
-        sys.exit(1)  # Non-zero exit for CI/CD integration
+    exit_code = 1 if error_count > 0 else 0  # Non-zero exit for CI/CD integration
+    if results.get('timed_out'):
+        # Abandoned workers may still be running; exiting normally would wait for them
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+    if exit_code:
+        sys.exit(exit_code)
+
+
+@cli.command()
+@click.argument('reports', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', type=click.Choice(['rich', 'simple', 'json', 'markdown']),
+              default='rich', help='Output format')
+@click.option('--export', '-e', type=click.Path(), help='Export merged results to file')
+@click.option('--record', is_flag=True, help='Record the merged run in the history database')
+@click.option('--db', type=click.Path(dir_okay=False), help='History database to record to (implies --record)')
+def merge(reports: tuple, output: str, export: Optional[str], record: bool, db: Optional[str]):
+    """
+    Combine JSON reports of a sharded run into one project report.
+    
+    Totals, severity counts, top issues and optimization opportunities are
+    recomputed over all shards. Exits non-zero if the merged report has errors.
+    
+    Examples:
+    
+        # Each CI runner: deepoptimizer analyze . --shard K/8 -o json -e shardK.json
+        deepoptimizer merge shard*.json
+        
+        # Merged JSON, also usable as --shard-timings for the next run
+        deepoptimizer merge shard*.json -o json -e report.json
+    """
+    started_at = time.time()
+    try:
+        loaded = []
+        for report_path in reports:
+            with open(report_path, 'r', encoding='utf-8') as f:
+                loaded.append(json.load(f))
+        results = DeepOptimizer(use_llm=False).merge_project_results(loaded)
+    except (OSError, ValueError) as e:
+        click.echo(click.style(f"Error: {e}", fg='red'), err=True)
+        sys.exit(1)
+    
+    missing = results.get('shards', {}).get('missing')
+    if missing:
+        click.echo(click.style(
+            f"Warning: shard(s) {', '.join(map(str, missing))} of {results['shards']['count']} missing",
+            fg='yellow'), err=True)
+    
+    if record or db:
+        with ResultsDB(db) as history_db:
+            run_id = history_db.record_run(results, results['project_path'], started_at, results['duration'])
+        click.echo(f"Recorded run {run_id} in {history_db.path}", err=True)
+    
+    formatted = OutputFormatter(style=output, no_color=False).format_project_results(results)
+    if export:
+        export_path = Path(export)
+        export_path.write_text(formatted)
+        click.echo(f"\n[SUCCESS] Results exported to {export_path}")
+    else:
+        click.echo(safe_print(formatted))
+    
+    if results['issues_by_severity'].get('error', 0):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--broker', 'broker_url', envvar='DEEPOPTIMIZER_BROKER', required=True, metavar='URL',
+              help='Broker of the coordinator: redis://host:port or sqlite:///path (or set DEEPOPTIMIZER_BROKER)')
+@click.option('--queue', default=DEFAULT_QUEUE, show_default=True, help='Queue name shared with the coordinator')
+@click.option('--root', type=click.Path(exists=True, file_okay=False),
+              help="This machine's checkout of the project [default: the coordinator's project path]")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Files to analyze at once')
+@click.option('--idle-exit', type=click.FloatRange(min=0, min_open=True),
+              help='Exit after this many seconds without a task (e.g. for autoscaled build agents)')
+@click.option('--api-key', envvar='GEMINI_API_KEY', help='Gemini API key (or set GEMINI_API_KEY env var)')
+@click.option('--config', 'config_path', type=click.Path(exists=True, dir_okay=False),
+              help='Config file (default: nearest .deepoptimizer)')
+def worker(broker_url: str, queue: str, root: Optional[str], jobs: int, idle_exit: Optional[float],
+           api_key: Optional[str], config_path: Optional[str]):
+    """
+    Analyze files for coordinators ('analyze --broker') until stopped.
+    
+    Rule selection, limits and whether to use the LLM come from the
+    coordinator's run; the API key, cache and timeouts from this machine's
+    config. Serves every run on the queue, one after another. For LLM runs
+    each worker thread indexes its checkout once per run, for the prompts'
+    cross-file symbol context.
+    
+    Examples:
+    
+        # Stand-in broker on one host, coordinator and workers anywhere
+        deepoptimizer broker --host 0.0.0.0
+        deepoptimizer worker --broker redis://farm-broker:6379 -j 4
+        
+        # Several workers on one machine, no server needed
+        deepoptimizer worker --broker sqlite:///tmp/queue.sqlite3 --idle-exit 60
+    """
+    try:
+        config = load_config(config_path)
+        queue_broker = open_broker(broker_url)
+    except (ValueError, BrokerError) as e:
+        click.echo(click.style(f"Error: {e}", fg='red'), err=True)
+        sys.exit(1)
+    
+    # Each worker thread builds its own analyzer (and index) per run
+    def make_analyzer(settings: dict) -> DeepOptimizer:
+        return DeepOptimizer.from_config(_run_config(config, settings), api_key=api_key)
+    
+    name = worker_name()
+    stop = threading.Event()
+    completed = []
+    
+    def work(index: int):
+        completed.append(run_worker(queue_broker, make_analyzer, queue=queue, root=root,
+                                    idle_timeout=idle_exit, stop=stop,
+                                    name=f'{name}-{index}' if jobs > 1 else name))
+    
+    click.echo(f"Worker {name} serving queue '{queue}' at {broker_url}", err=True)
+    threads = [threading.Thread(target=work, args=(index,), daemon=True) for index in range(jobs)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        click.echo("Stopping after the current task(s)...", err=True)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        queue_broker.close()
+    click.echo(f"Completed {sum(completed)} task(s)", err=True)
+
+
+@cli.command()
+@click.option('--host', default='localhost', show_default=True, help='Interface to listen on')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=DEFAULT_REDIS_PORT, show_default=True,
+              help='Port to listen on')
+def broker(host: str, port: int):
+    """
+    Run a minimal in-memory Redis-protocol broker for 'analyze --broker'.
+    
+    A stand-in for Redis when none is available: it implements only the
+    list and key commands coordinators and workers use, and keeps
+    everything in memory. Workers and coordinators connect with
+    redis://HOST:PORT.
+    """
+    click.echo(f"Broker listening on redis://{host}:{port} (Ctrl-C to stop)", err=True)
+    try:
+        serve_broker(host, port)
+    except OSError as e:
+        click.echo(click.style(f"Error: {e}", fg='red'), err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
 
 
 @cli.command()
@@ -328,24 +716,80 @@ def init():
 # Include LLM analysis by default
 use_llm = true
 
+# Screen files with a fast model (GEMINI_TRIAGE_MODEL, default gemini-2.5-flash) and send
+# only flagged code to the deep model; files it clears never reach the deep model
+# (env: DEEPOPTIMIZER_TRIAGE)
+triage = false
+
 # Output format (rich, simple, json, markdown)
 output_format = rich
 
 # File patterns to include
-include_patterns = ["**/*.py"]
+include_patterns = ["**/*.py", "**/*.ipynb"]
 
-# File patterns to exclude
+# File patterns to exclude (in addition to the built-in venv, .git, build, ... excludes)
 exclude_patterns = ["**/venv/**", "**/__pycache__/**", "**/test_*.py"]
 
 # Severity filter (all, error, warning, info)
 severity_filter = all
 
+# Rule profile (full, fast) and rules to run or skip (comma-separated IDs or prefixes)
+# profile = full
+# select = DO1
+# ignore = DO114
+
 [performance]
-# Maximum workers for parallel analysis
+# Workers for reading and rule checks; LLM calls run on their own pool (env: DEEPOPTIMIZER_MAX_WORKERS)
 max_workers = 4
 
-# Timeout for LLM requests (seconds, None for no timeout)
-# llm_timeout = None
+# Worker type: thread, or process for CPU-bound rules-only runs (env: DEEPOPTIMIZER_EXECUTOR)
+executor = thread
+
+# Deadlines in seconds, none for no limit: whole run, per file, per LLM request
+# (env: DEEPOPTIMIZER_TIMEOUT, DEEPOPTIMIZER_FILE_TIMEOUT, DEEPOPTIMIZER_LLM_TIMEOUT)
+timeout = none
+file_timeout = none
+llm_timeout = none
+
+# Abandon (and retry) a Gemini request whose streamed output stops for this long
+# after it has started (the wait for the first output is bounded by the timeouts above)
+# (env: DEEPOPTIMIZER_LLM_STALL_TIMEOUT)
+llm_stall_timeout = 120
+
+# Gemini requests in flight per model: start low and adapt to 429/503s and latency,
+# up to llm_concurrency (default 16), or stay fixed at llm_concurrency
+# (env: DEEPOPTIMIZER_ADAPTIVE_CONCURRENCY, DEEPOPTIMIZER_LLM_CONCURRENCY)
+adaptive_concurrency = true
+# llm_concurrency = 16
+
+# Duplicate a Gemini request that is still silent after this percentile of observed
+# latency and use the first answer, at most llm_hedge_budget extra requests per request
+# (env: DEEPOPTIMIZER_LLM_HEDGE_PERCENTILE, DEEPOPTIMIZER_LLM_HEDGE_BUDGET)
+llm_hedge_percentile = none
+llm_hedge_budget = 0.05
+
+[cache]
+# Reuse LLM results for unchanged code (env: DEEPOPTIMIZER_CACHE)
+enabled = true
+
+# Journal project runs under <cache dir>/runs so 'analyze --resume RUN_ID' can
+# pick up an interrupted run (env: DEEPOPTIMIZER_JOURNAL)
+journal = true
+
+# Cache directory (env: DEEPOPTIMIZER_CACHE_DIR; default ~/.cache/deepoptimizer)
+# dir = .deepoptimizer-cache
+
+[limits]
+# Files larger than max_bytes are skipped; larger than max_llm_bytes get rules only
+# (env: DEEPOPTIMIZER_MAX_FILE_SIZE, DEEPOPTIMIZER_MAX_LLM_SIZE)
+max_bytes = 8MB
+max_llm_bytes = 512K
+
+# Generated, minified or data-heavy files: rules, skip or analyze (env: DEEPOPTIMIZER_GENERATED)
+generated = rules
+
+# Lines longer than this mark a file as minified
+max_line_length = 2000
 """
     
     config_path.write_text(config_content)
@@ -355,6 +799,118 @@ max_workers = 4
     click.echo("2. Run 'deepoptimizer analyze .' to analyze your project")
 
 
+@cli.command()
+@click.argument('path', required=False, type=click.Path())
+@click.option('--db', type=click.Path(dir_okay=False), help='History database (default: ~/.cache/deepoptimizer/history.sqlite3)')
+@click.option('--run', 'run_id', type=int, help='Run to report on (default: the latest)')
+@click.option('--new', 'show_new', is_flag=True, help='Issues that are new since the previous run')
+@click.option('--regressions', is_flag=True, help='Files whose issue count grew the most')
+@click.option('--slowest', is_flag=True, help='Slowest files to analyze')
+@click.option('--rule', help='Issue count of one rule across runs')
+@click.option('--limit', '-n', default=10, show_default=True, help='Maximum number of rows')
+@click.option('--json', 'as_json', is_flag=True, help='Output JSON')
+def history(path: Optional[str], db: Optional[str], run_id: Optional[int], show_new: bool,
+            regressions: bool, slowest: bool, rule: Optional[str], limit: int, as_json: bool):
+    """
+    Show recorded runs and compare them.
+    
+    Runs are recorded with 'deepoptimizer analyze --record'.
+    
+    Examples:
+    
+        # Recent runs of a project
+        deepoptimizer history ./src
+        
+        # What got worse since the previous run
+        deepoptimizer history ./src --new --regressions
+    """
+    db_path = Path(db) if db else default_history_path()
+    if not db_path.exists():
+        click.echo(f"No history recorded yet at {db_path}. Run 'deepoptimizer analyze --record' first.")
+        return
+    
+    with ResultsDB(db_path) as history_db:
+        if run_id is None and (show_new or regressions or slowest):
+            run_id = history_db.latest_run(path)
+        
+        if rule:
+            report = {'rule_trend': history_db.rule_trend(rule, path, limit)}
+        elif show_new or regressions or slowest:
+            report = {'run': run_id}
+            if show_new:
+                report['new_issues'] = history_db.new_issues(run_id)[:limit] if run_id else []
+            if regressions:
+                report['regressions'] = history_db.top_regressing_files(run_id, limit) if run_id else []
+            if slowest:
+                report['slowest'] = history_db.slowest_files(run_id, limit) if run_id else []
+        else:
+            # One extra run so the oldest shown still gets a delta
+            runs = history_db.runs(path, limit + 1)
+            for run, older in zip(runs, runs[1:] + [None]):
+                run['delta'] = run['total_issues'] - older['total_issues'] if older and older['root'] == run['root'] else None
+            report = {'runs': runs[:limit]}
+    
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    
+    def when(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+    
+    if 'runs' in report:
+        if not report['runs']:
+            click.echo("No runs recorded.")
+        for run in report['runs']:
+            delta = '' if run['delta'] is None else f" ({run['delta']:+d})"
+            duration = f"{run['duration']:.1f}s" if run['duration'] is not None else '-'
+            click.echo(f"#{run['id']:<5} {when(run['started_at'])}  {run['total_issues']:>5} issues{delta:<8} "
+                       f"E{run['errors']} W{run['warnings']} I{run['infos']}  "
+                       f"{run['files_analyzed']} files  {duration}  {run['root']}")
+    
+    if 'rule_trend' in report:
+        click.echo(click.style(f"Rule {rule} per run:", bold=True))
+        for row in report['rule_trend']:
+            click.echo(f"  #{row['id']:<5} {when(row['started_at'])}  {row['issues']}")
+    
+    if 'new_issues' in report:
+        click.echo(click.style(f"New issues in run #{report['run']}:", bold=True))
+        for issue in report['new_issues']:
+            line = f":{issue['line']}" if issue['line'] else ''
+            rule_info = f" [{issue['rule']}]" if issue['rule'] else ''
+            click.echo(f"  {issue['severity'].upper():<8}{issue['path']}{line}  {issue['title']}{rule_info}")
+        if not report['new_issues']:
+            click.echo("  none")
+    
+    if 'regressions' in report:
+        click.echo(click.style(f"Top regressing files in run #{report['run']}:", bold=True))
+        for row in report['regressions']:
+            click.echo(f"  {row['delta']:+d}  {row['path']} ({row['previous']} -> {row['issues']})")
+        if not report['regressions']:
+            click.echo("  none")
+    
+    if 'slowest' in report:
+        click.echo(click.style(f"Slowest files in run #{report['run']}:", bold=True))
+        for row in report['slowest']:
+            click.echo(f"  {row['seconds']:8.3f}s  {row['path']}")
+
+
+@cli.command()
+@click.option('--profile', type=click.Choice(list(PROFILES)), default='full',
+              help='Only list rules run by this profile')
+def rules(profile: str):
+    """
+    List the rule-based checks and their IDs.
+    
+    Use the IDs with 'analyze --select' and 'analyze --ignore'.
+    """
+    for rule in RULES.values():
+        if rule.cost not in PROFILES[profile]:
+            continue
+        color = {'error': 'red', 'warning': 'yellow'}.get(rule.severity, 'blue')
+        click.echo(f"{click.style(rule.id, bold=True)}  {rule.name:<34}"
+                   f"{click.style(rule.severity, fg=color):<18}{rule.cost}")
+
+
 @cli.command()
 def doctor():
     """
@@ -411,6 +967,60 @@ def doctor():
             click.echo(f"  - {issue}")
 
 
+_RUN_ANALYSIS_SETTINGS = ('use_llm', 'include_patterns', 'exclude_patterns', 'respect_gitignore',
+                          'profile', 'select', 'ignore')
+
+# analyze options that decide a run setting, by parameter name
+_RUN_SETTING_OPTIONS = {
+    'no_llm': 'use_llm',
+    'no_gitignore': 'respect_gitignore',
+    'profile': 'profile',
+    'select': 'select',
+    'ignore': 'ignore',
+    'max_file_size': 'limits.max_bytes',
+    'max_llm_size': 'limits.max_llm_bytes',
+    'generated': 'limits.generated',
+    'shard_spec': 'shard'
+}
+
+
+def _run_settings(config: dict) -> dict:
+    """Settings that change which files a run analyzes and what it reports for them."""
+    analysis = config['analysis']
+    settings = {key: analysis[key] for key in _RUN_ANALYSIS_SETTINGS}
+    settings['limits'] = dict(config['limits'])
+    return settings
+
+
+def _run_config(config: dict, settings: dict) -> dict:
+    """The config with a run's settings (see _run_settings) applied: a coordinator's, or a resumed run's."""
+    run_config = {section: dict(values) if isinstance(values, dict) else values
+                  for section, values in config.items()}
+    for key in _RUN_ANALYSIS_SETTINGS:
+        run_config['analysis'][key] = settings[key]
+    run_config['limits'].update(settings['limits'])
+    return run_config
+
+
+def _explicit_settings() -> list:
+    """Run settings (as journal.check_settings keys) set by options on the current command line."""
+    ctx = click.get_current_context()
+    return [key for option, key in _RUN_SETTING_OPTIONS.items()
+            if ctx.get_parameter_source(option) is ParameterSource.COMMANDLINE]
+
+
+def _runs_dir(config: dict) -> Path:
+    """Directory of the run journals (under the cache directory)."""
+    return Path(config['cache']['dir'] or default_cache_dir()) / 'runs'
+
+
+def _split_codes(value: Optional[str]) -> Optional[list]:
+    """Split a comma-separated list of rule codes."""
+    if not value:
+        return None
+    return [code.strip() for code in value.split(',') if code.strip()]
+
+
 def main():
     """Main entry point."""
     cli()
@@ -0,0 +1,150 @@
+"""
+Adaptive concurrency limit for LLM requests (AIMD).
+
+The limit starts low and grows while requests come back healthy: by one per
+successful request until the first sign of congestion (slow start), then by
+one per ``limit`` successful requests (additive increase). A 429 or 503
+halves it, and a request whose time to first output is well above the
+recent average cuts it by a smaller factor (multiplicative decrease). Only
+requests started after the last cut can cut again, so a burst of 429s from
+requests that were already in flight counts as one congestion event.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from .timeouts import Deadline, POLL_INTERVAL
+
+# Limits used when only an upper bound (or nothing) is configured
+INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Weight of the newest sample in the latency average
+_LATENCY_WEIGHT = 0.2
+
+
+class ConcurrencyLimiter:
+    """Thread-safe in-flight limit for one model, adapted to 429/503s and latency."""
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, minimum: int = 1,
+                 maximum: int = DEFAULT_MAX_CONCURRENCY, adaptive: bool = True,
+                 backoff: float = 0.5, latency_backoff: float = 0.9,
+                 latency_tolerance: float = 2.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial: Starting limit (clamped to [minimum, maximum])
+            minimum: Lowest the limit goes on congestion
+            maximum: Highest the limit grows to
+            adaptive: False keeps the limit fixed at ``initial``
+            backoff: Factor applied to the limit on a 429/503
+            latency_backoff: Factor applied on a slow response
+            latency_tolerance: A response is slow when its time to first
+                output exceeds this multiple of the running average
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError(f"invalid concurrency bounds {minimum}..{maximum}")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.adaptive = adaptive
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.overloads = 0        # 429/503 responses
+        self.slow_responses = 0   # Responses over the latency tolerance
+        self.decreases = 0        # Times the limit was cut
+
+        self._limit = float(min(maximum, max(minimum, initial)))
+        self._slow_start = adaptive
+        self._epoch = 0           # Bumped on every cut
+        self._latency: Optional[float] = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> int:
+        """
+        Wait for a free slot.
+
+        Returns:
+            Ticket to hand back to release()
+
+        Raises:
+            AnalysisTimeout: If the deadline expires while waiting
+        """
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                if deadline is not None:
+                    deadline.check()
+                self._condition.wait(POLL_INTERVAL)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self._epoch
+
+    def try_acquire(self) -> Optional[int]:
+        """Take a slot without waiting: its ticket, or None if none is free."""
+        with self._condition:
+            if self.in_flight >= int(self._limit):
+                return None
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self._epoch
+
+    def release(self, ticket: int, latency: Optional[float] = None, overloaded: bool = False):
+        """
+        Free a slot and adapt the limit to how the request went.
+
+        Args:
+            ticket: Value returned by acquire() or try_acquire()
+            latency: Seconds to the first output, or None if the request
+                produced none (it then only frees the slot, unless overloaded)
+            overloaded: The request failed with a 429 or 503
+        """
+        with self._condition:
+            saturated = self.in_flight >= int(self._limit)
+            self.in_flight -= 1
+            if self.adaptive:
+                if overloaded:
+                    self.overloads += 1
+                    self._decrease(ticket, self.backoff)
+                elif latency is not None:
+                    if self._latency is not None and latency > self.latency_tolerance * self._latency:
+                        self.slow_responses += 1
+                        self._decrease(ticket, self.latency_backoff)
+                    elif saturated:
+                        # Only grow a limit that is actually in use
+                        self._limit = min(float(self.maximum),
+                                          self._limit + (1.0 if self._slow_start else 1.0 / self._limit))
+                    self._latency = latency if self._latency is None else (
+                        self._latency + _LATENCY_WEIGHT * (latency - self._latency))
+            self._condition.notify_all()
+
+    def _decrease(self, ticket: int, factor: float):
+        if ticket < self._epoch:
+            # Started before the last cut; its congestion was already answered
+            return
+        self._limit = max(float(self.minimum), self._limit * factor)
+        self._slow_start = False
+        self._epoch += 1
+        self.decreases += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, bounds and congestion counters."""
+        with self._condition:
+            return {
+                'limit': int(self._limit),
+                'minimum': self.minimum,
+                'maximum': self.maximum,
+                'adaptive': self.adaptive,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'overloads': self.overloads,
+                'slow_responses': self.slow_responses,
+                'decreases': self.decreases
+            }
@@ -0,0 +1,233 @@
+"""
+Layered configuration: defaults, .deepoptimizer file, environment, CLI flags.
+
+Each layer only holds the settings it actually sets, and later layers win
+key by key, so a machine can set DEEPOPTIMIZER_MAX_WORKERS without touching
+the project's .deepoptimizer, and a CLI flag still overrides both.
+"""
+import configparser
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+from .reader import FileLimits, GENERATED_POLICIES, parse_size
+from .timeouts import STREAM_STALL_TIMEOUT
+
+CONFIG_FILENAME = '.deepoptimizer'
+
+EXECUTORS = ('thread', 'process')
+
+_NONE_VALUES = ('', 'none', 'null')
+
+_TOP_SECTION = 'top-level'
+
+
+def _bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on'):
+        return True
+    if lowered in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+def _list(value: Any) -> list:
+    """A JSON list (as written by 'deepoptimizer init') or comma-separated values."""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    text = str(value).strip()
+    if text.startswith('['):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError(f"expected a list, got {value!r}")
+        return [str(item) for item in items]
+    return [item.strip().strip('"\'') for item in text.split(',') if item.strip()]
+
+
+def _positive(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def parse(value: Any):
+        number = convert(value)
+        if number <= 0:
+            raise ValueError(f"expected a positive number, got {value!r}")
+        return number
+    return parse
+
+
+def _percentile(value: Any) -> float:
+    number = float(value)
+    if not 0 < number < 100:
+        raise ValueError(f"expected a percentile between 0 and 100, got {value!r}")
+    return number
+
+
+def _choice(choices: Tuple[str, ...]) -> Callable[[Any], str]:
+    def parse(value: Any) -> str:
+        value = str(value).strip().lower()
+        if value not in choices:
+            raise ValueError(f"expected one of {', '.join(choices)}, got {value!r}")
+        return value
+    return parse
+
+
+def _optional(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def parse(value: Any):
+        if value is None or (isinstance(value, str) and value.strip().lower() in _NONE_VALUES):
+            return None
+        return convert(value)
+    return parse
+
+
+# (section, key) -> (parser, default, environment variable)
+OPTIONS: Dict[Tuple[str, str], Tuple[Callable[[Any], Any], Any, Optional[str]]] = {
+    ('analysis', 'use_llm'): (_bool, True, None),
+    ('analysis', 'triage'): (_bool, False, 'DEEPOPTIMIZER_TRIAGE'),
+    ('analysis', 'output_format'): (_choice(('rich', 'simple', 'json', 'markdown')), 'rich', None),
+    ('analysis', 'include_patterns'): (_list, ['**/*.py', '**/*.ipynb'], None),
+    ('analysis', 'exclude_patterns'): (_list, [], None),
+    ('analysis', 'severity_filter'): (_choice(('all', 'error', 'warning', 'info')), 'all', None),
+    ('analysis', 'respect_gitignore'): (_bool, True, None),
+    ('analysis', 'profile'): (str, 'full', None),
+    ('analysis', 'select'): (_optional(_list), None, None),
+    ('analysis', 'ignore'): (_optional(_list), None, None),
+    ('performance', 'max_workers'): (_positive(int), 4, 'DEEPOPTIMIZER_MAX_WORKERS'),
+    ('performance', 'executor'): (_choice(EXECUTORS), 'thread', 'DEEPOPTIMIZER_EXECUTOR'),
+    ('performance', 'timeout'): (_optional(_positive(float)), None, 'DEEPOPTIMIZER_TIMEOUT'),
+    ('performance', 'file_timeout'): (_optional(_positive(float)), None, 'DEEPOPTIMIZER_FILE_TIMEOUT'),
+    ('performance', 'llm_timeout'): (_optional(_positive(float)), None, 'DEEPOPTIMIZER_LLM_TIMEOUT'),
+    ('performance', 'llm_concurrency'): (_optional(_positive(int)), None, 'DEEPOPTIMIZER_LLM_CONCURRENCY'),
+    ('performance', 'adaptive_concurrency'): (_bool, True, 'DEEPOPTIMIZER_ADAPTIVE_CONCURRENCY'),
+    ('performance', 'llm_hedge_percentile'): (_optional(_percentile), None, 'DEEPOPTIMIZER_LLM_HEDGE_PERCENTILE'),
+    ('performance', 'llm_hedge_budget'): (_positive(float), 0.05, 'DEEPOPTIMIZER_LLM_HEDGE_BUDGET'),
+    ('performance', 'llm_stall_timeout'): (_optional(_positive(float)), STREAM_STALL_TIMEOUT,
+                                           'DEEPOPTIMIZER_LLM_STALL_TIMEOUT'),
+    ('cache', 'enabled'): (_bool, True, 'DEEPOPTIMIZER_CACHE'),
+    ('cache', 'dir'): (_optional(str), None, 'DEEPOPTIMIZER_CACHE_DIR'),
+    ('cache', 'journal'): (_bool, True, 'DEEPOPTIMIZER_JOURNAL'),
+    ('limits', 'max_bytes'): (_positive(parse_size), FileLimits.max_bytes, 'DEEPOPTIMIZER_MAX_FILE_SIZE'),
+    ('limits', 'max_llm_bytes'): (_positive(parse_size), FileLimits.max_llm_bytes, 'DEEPOPTIMIZER_MAX_LLM_SIZE'),
+    ('limits', 'mmap_threshold'): (_positive(parse_size), FileLimits.mmap_threshold, None),
+    ('limits', 'max_line_length'): (_positive(int), FileLimits.max_line_length, None),
+    ('limits', 'generated'): (_choice(GENERATED_POLICIES), FileLimits.generated, 'DEEPOPTIMIZER_GENERATED'),
+}
+
+
+def default_config() -> Dict[str, Any]:
+    """All settings at their defaults."""
+    config: Dict[str, Any] = {'api_key': None}
+    for (section, key), (_, default, _) in OPTIONS.items():
+        config.setdefault(section, {})[key] = list(default) if isinstance(default, list) else default
+    return config
+
+
+def merge_config(config: Dict[str, Any], layer: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a (sparse) layer on top of a config, in place. None values in the layer are skipped."""
+    for name, value in layer.items():
+        if isinstance(value, dict):
+            section = config.setdefault(name, {})
+            section.update({key: v for key, v in value.items() if v is not None})
+        elif value is not None:
+            config[name] = value
+    return config
+
+
+def _parse(section: str, key: str, value: Any, source: str) -> Any:
+    convert = OPTIONS[(section, key)][0]
+    try:
+        return convert(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid {section}.{key} in {source}: {e}") from None
+
+
+def read_config_file(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read the settings a .deepoptimizer file sets.
+
+    Top-level keys (before any section) are allowed, e.g. ``api_key``.
+    Unknown sections and keys are ignored.
+
+    Raises:
+        ValueError: If the file can't be parsed or a value is invalid
+    """
+    path = Path(path)
+    # No section inherits from another; keys before the first header go to _TOP_SECTION
+    parser = configparser.ConfigParser(default_section='\0', interpolation=None)
+    try:
+        parser.read_string(f'[{_TOP_SECTION}]\n' + path.read_text(encoding='utf-8'), source=str(path))
+    except (OSError, configparser.Error) as e:
+        raise ValueError(f"Cannot read config file {path}: {e}") from None
+
+    layer: Dict[str, Any] = {}
+    api_key = parser.get(_TOP_SECTION, 'api_key', fallback=None)
+    if api_key:
+        layer['api_key'] = api_key
+
+    for section in parser.sections():
+        for key, value in parser.items(section):
+            if (section, key) in OPTIONS:
+                layer.setdefault(section, {})[key] = _parse(section, key, value, str(path))
+
+    return layer
+
+
+def read_environment(environ: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """
+    Read the settings given through DEEPOPTIMIZER_* environment variables.
+
+    Raises:
+        ValueError: If a variable holds an invalid value
+    """
+    environ = os.environ if environ is None else environ
+    layer: Dict[str, Any] = {}
+    for (section, key), (_, _, variable) in OPTIONS.items():
+        if variable and environ.get(variable):
+            layer.setdefault(section, {})[key] = _parse(section, key, environ[variable], variable)
+    return layer
+
+
+def find_config_file(start: Optional[Union[str, Path]] = None) -> Optional[Path]:
+    """Find the nearest .deepoptimizer file in a directory or its parents (default: the cwd)."""
+    directory = Path(start or Path.cwd()).resolve()
+    if directory.is_file():
+        directory = directory.parent
+    for candidate in (directory, *directory.parents):
+        path = candidate / CONFIG_FILENAME
+        if path.is_file():
+            return path
+    return None
+
+
+def load_config(path: Optional[Union[str, Path]] = None,
+                overrides: Optional[Dict[str, Any]] = None,
+                environ: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """
+    Build the effective configuration: defaults < file < environment < overrides.
+
+    Args:
+        path: Config file (default: the nearest .deepoptimizer, if any)
+        overrides: Settings from CLI flags, as {section: {key: value}};
+            None values mean "not given" and don't override anything
+        environ: Environment to read (default: os.environ)
+
+    Returns:
+        Config dict with 'api_key', 'analysis', 'performance', 'cache' and
+        'limits' sections, and 'config_file' set to the file that was read (or None)
+
+    Raises:
+        ValueError: If the file or environment holds an invalid value
+    """
+    config = default_config()
+
+    config_file = Path(path) if path else find_config_file()
+    if config_file is not None:
+        merge_config(config, read_config_file(config_file))
+
+    merge_config(config, read_environment(environ))
+
+    if overrides:
+        merge_config(config, overrides)
+
+    config['config_file'] = str(config_file) if config_file is not None else None
+    return config
@@ -0,0 +1,154 @@
+"""
+Linear-time merging and deduplication of issues from different analysis methods.
+"""
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
+
+# Pairs of terms that indicate two issues describe the same problem when one
+# issue mentions the first term and the other mentions the second
+DUPLICATE_PATTERNS = [
+    ('model.eval()', 'eval()'),
+    ('torch.no_grad()', 'no_grad'),
+    ('batch_size', 'batch size'),
+    ('memory leak', 'loss.item()'),
+    ('mse', 'classification')
+]
+
+# Issues with the same rule ID are duplicates when their lines are this close
+LINE_TOLERANCE = 2
+
+SEVERITY_ORDER = {'error': 0, 'warning': 1, 'info': 2}
+
+
+class IssueKey:
+    """Normalized matching keys for one issue, computed once."""
+
+    __slots__ = ('title', 'tags', 'rule_id', 'lines')
+
+    def __init__(self, title: str, tags: FrozenSet[str], rule_id: Optional[str],
+                 lines: Optional[Tuple[int, int]]):
+        self.title = title
+        self.tags = tags
+        self.rule_id = rule_id
+        self.lines = lines
+
+
+def issue_key(issue: Dict[str, Any]) -> IssueKey:
+    """
+    Normalize an issue into its matching keys.
+
+    Tags are ``'<pair index>:a'`` / ``'<pair index>:b'`` for each side of a
+    DUPLICATE_PATTERNS pair the issue mentions in its title or description.
+    """
+    title = (issue.get('title') or '').lower()
+    description = (issue.get('description') or '').lower()
+
+    tags = set()
+    for index, (first, second) in enumerate(DUPLICATE_PATTERNS):
+        if first in title or first in description:
+            tags.add(f"{index}:a")
+        if second in title or second in description:
+            tags.add(f"{index}:b")
+
+    line_numbers = [n for n in issue.get('line_numbers') or [] if isinstance(n, int)]
+    lines = (min(line_numbers), max(line_numbers)) if line_numbers else None
+
+    return IssueKey(title, frozenset(tags), issue.get('rule_id'), lines)
+
+
+def _counterpart(tag: str) -> str:
+    index, side = tag.split(':')
+    return f"{index}:{'b' if side == 'a' else 'a'}"
+
+
+def _overlaps(a: Optional[Tuple[int, int]], b: Optional[Tuple[int, int]]) -> bool:
+    if a is None or b is None:
+        return True
+    return a[0] - LINE_TOLERANCE <= b[1] and b[0] - LINE_TOLERANCE <= a[1]
+
+
+class IssueIndex:
+    """Hash index over a list of issues for constant-time duplicate lookups."""
+
+    def __init__(self, issues: List[Dict[str, Any]]):
+        """
+        Index issues by normalized title, concept tag and rule ID.
+
+        Args:
+            issues: Issues to match against (e.g. rule-based findings)
+        """
+        self.issues = issues
+        self._by_title: Dict[str, int] = {}
+        self._by_tag: Dict[str, int] = {}
+        self._by_rule: Dict[str, List[Tuple[Optional[Tuple[int, int]], int]]] = {}
+
+        # Only the first issue per key matters - it is the one that gets enhanced
+        for position, issue in enumerate(issues):
+            key = issue_key(issue)
+            self._by_title.setdefault(key.title, position)
+            for tag in key.tags:
+                self._by_tag.setdefault(tag, position)
+            if key.rule_id:
+                self._by_rule.setdefault(key.rule_id, []).append((key.lines, position))
+
+    def find_duplicate(self, issue: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Find the first indexed issue that duplicates the given one.
+
+        Returns:
+            The matching indexed issue, or None
+        """
+        key = issue_key(issue)
+        candidates = []
+
+        # Same title is a strong indicator
+        if key.title in self._by_title:
+            candidates.append(self._by_title[key.title])
+
+        for tag in key.tags:
+            position = self._by_tag.get(_counterpart(tag))
+            if position is not None:
+                candidates.append(position)
+
+        if key.rule_id:
+            for lines, position in self._by_rule.get(key.rule_id, []):
+                if _overlaps(lines, key.lines):
+                    candidates.append(position)
+                    break
+
+        if not candidates:
+            return None
+        return self.issues[min(candidates)]
+
+
+def merge_issues(primary: List[Dict[str, Any]], secondary: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge two issue lists, dropping secondary issues that duplicate primary ones.
+
+    Runs in O(n + m): the primary issues are indexed once and each secondary
+    issue is matched with hash lookups. When a duplicate carries references
+    the primary issue lacks, they are copied over.
+
+    Args:
+        primary: Issues to keep as-is (rule-based findings)
+        secondary: Issues to add unless duplicated (LLM findings)
+
+    Returns:
+        Merged issues sorted by severity, then confidence
+    """
+    merged = list(primary)
+    index = IssueIndex(primary)
+
+    for issue in secondary:
+        duplicate = index.find_duplicate(issue)
+        if duplicate is None:
+            merged.append(issue)
+        elif issue.get('references') and not duplicate.get('references'):
+            # Enhance rule issue with LLM insights
+            duplicate['references'] = issue['references']
+
+    merged.sort(key=lambda x: (
+        SEVERITY_ORDER.get(x.get('severity', 'info'), 3),
+        -x.get('confidence', 0)
+    ))
+
+    return merged
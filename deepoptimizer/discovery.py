@@ -0,0 +1,212 @@
+"""
+Fast file discovery with directory pruning and .gitignore support.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_INCLUDE_PATTERNS = ['**/*.py', '**/*.ipynb']
+
+DEFAULT_EXCLUDE_PATTERNS = [
+    '**/venv/**', '**/env/**', '**/.venv/**',
+    '**/__pycache__/**', '**/site-packages/**',
+    '**/node_modules/**', '**/.git/**',
+    '**/build/**', '**/dist/**',
+    '**/.ipynb_checkpoints/**'
+]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a glob pattern into a regex over '/'-separated relative paths.
+
+    ``**/`` matches zero or more directories, a trailing ``/**`` matches the
+    directory itself and everything below it, ``*`` and ``?`` never cross a
+    ``/``.
+    """
+    pattern = pattern.replace('\\', '/')
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex.append('(?:/.*)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+
+class PathMatcher:
+    """A set of glob patterns compiled into one regex."""
+
+    def __init__(self, patterns: Iterable[str]):
+        patterns = [p for p in patterns if p]
+        self.patterns = patterns
+        if patterns:
+            combined = '|'.join(f'(?:{glob_to_regex(p)})' for p in patterns)
+            self._regex = re.compile(combined)
+        else:
+            self._regex = None
+
+    def matches(self, relative_path: str) -> bool:
+        """Check a '/'-separated path relative to the discovery root."""
+        return self._regex is not None and self._regex.fullmatch(relative_path) is not None
+
+
+class GitIgnore:
+    """Rules from the .gitignore files of a directory tree."""
+
+    def __init__(self):
+        # (compiled regex, negated, directory only), in file order
+        self.rules: List[Tuple['re.Pattern[str]', bool, bool]] = []
+
+    def load(self, gitignore_path: Path, base: str):
+        """
+        Add rules from a .gitignore file.
+
+        Args:
+            gitignore_path: Path to the .gitignore file
+            base: Its directory relative to the discovery root ('' for the root)
+        """
+        try:
+            lines = gitignore_path.read_text(encoding='utf-8', errors='replace').splitlines()
+        except OSError:
+            return
+
+        prefix = f"{base}/" if base else ''
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            if line.startswith('\\'):
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+
+            # Patterns without an inner slash match at any depth below the file
+            if '/' in line:
+                pattern = prefix + line.lstrip('/')
+            else:
+                pattern = prefix + '**/' + line
+
+            # Anything below an ignored directory is ignored too
+            regex = re.compile(glob_to_regex(pattern) + '(?:/.*)?')
+            self.rules.append((regex, negated, dir_only))
+
+    def ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Check a path against the rules (the last matching rule wins)."""
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                # A dir-only rule can still match a parent directory of a file
+                parent = relative_path.rsplit('/', 1)[0] if '/' in relative_path else ''
+                if not parent or not regex.fullmatch(parent):
+                    continue
+            elif not regex.fullmatch(relative_path):
+                continue
+            return not negated
+        return False
+
+
+def discover_files(root: Path,
+                   include_patterns: Optional[List[str]] = None,
+                   exclude_patterns: Optional[List[str]] = None,
+                   respect_gitignore: bool = True) -> List[Path]:
+    """
+    Find files under a directory, pruning excluded directories before descending.
+
+    Args:
+        root: Root directory to search (a file is returned as-is)
+        include_patterns: Glob patterns to include (default: DEFAULT_INCLUDE_PATTERNS)
+        exclude_patterns: Glob patterns to exclude (default: DEFAULT_EXCLUDE_PATTERNS)
+        respect_gitignore: Whether to honor .gitignore files found in the tree
+
+    Returns:
+        Sorted list of matching file paths
+    """
+    return sorted(iter_files(root, include_patterns, exclude_patterns, respect_gitignore))
+
+
+def iter_files(root: Path,
+               include_patterns: Optional[List[str]] = None,
+               exclude_patterns: Optional[List[str]] = None,
+               respect_gitignore: bool = True) -> Iterator[Path]:
+    """
+    Yield matching files as the walk finds them (see discover_files), in no particular order.
+    """
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+
+    include = PathMatcher(include_patterns if include_patterns is not None else DEFAULT_INCLUDE_PATTERNS)
+    exclude = PathMatcher(exclude_patterns if exclude_patterns is not None else DEFAULT_EXCLUDE_PATTERNS)
+    gitignore = GitIgnore() if respect_gitignore else None
+
+    stack = [(root, '')]
+
+    while stack:
+        directory, relative_dir = stack.pop()
+
+        if gitignore is not None:
+            gitignore_path = directory / '.gitignore'
+            if gitignore_path.is_file():
+                gitignore.load(gitignore_path, relative_dir)
+
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+
+        for entry in entries:
+            relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            try:
+                # Don't follow directory symlinks (avoids cycles and vendored mounts)
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if is_dir:
+                if exclude.matches(relative):
+                    continue
+                if gitignore is not None and gitignore.ignored(relative, is_dir=True):
+                    continue
+                stack.append((Path(entry.path), relative))
+            elif is_file:
+                if not include.matches(relative) or exclude.matches(relative):
+                    continue
+                if gitignore is not None and gitignore.ignored(relative, is_dir=False):
+                    continue
+                yield Path(entry.path)
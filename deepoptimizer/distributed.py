@@ -0,0 +1,405 @@
+"""
+Coordinator/worker mode: a shared work queue instead of static shards.
+
+The coordinator (``analyze --broker URL``) runs the usual project pipeline,
+but its per-file stage puts a task on the broker's task queue instead of
+running locally. Workers (``deepoptimizer worker --broker URL``) on any
+number of machines pop tasks, analyze the file in their own checkout (rules
+and LLM) and push the result back, so fast machines simply take more files.
+For LLM runs each worker indexes its checkout once per run, so prompts get
+the same cross-file symbol context as in a local run. Project-level rules,
+the run journal and the report are handled by the coordinator as in a
+local run.
+
+The coordinator owns reliability:
+
+- A task whose worker reports a failure is queued again, up to
+  ``max_attempts`` times.
+- A task that has been running much longer than the run's typical task
+  (``straggler_factor`` times the median, once the queue has drained) gets
+  a backup copy, and the first result wins.
+- A task with no result ``task_timeout`` seconds after a worker took it
+  (e.g. the worker died) is queued again as well.
+- So is a copy that was popped but never announced (the worker died before
+  announcing it, or the reply was lost): the queue is FIFO, so a copy still
+  unannounced ``task_timeout`` seconds after it was queued is presumed lost
+  once a copy queued after it has been taken, or once no copy at all has
+  been taken for that long.
+
+Workers announce each task they take, so the clocks of running copies start
+when work starts, not while a task waits in the queue. Tasks of a finished
+or abandoned run are dropped by workers, as the run's record is gone.
+"""
+import os
+import socket
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .broker import Broker, BrokerError
+from .discovery import DEFAULT_EXCLUDE_PATTERNS, iter_files
+from .issues import DetectedIssue
+from .project_index import ProjectIndex
+from .sharding import relative_key
+from .timeouts import Deadline, POLL_INTERVAL
+
+DEFAULT_QUEUE = 'deepoptimizer'
+
+# Seconds a started task may go without a result before it is queued again
+TASK_TIMEOUT = 900.0
+
+# Finished tasks needed before running ones are judged against their median
+MIN_SAMPLES = 10
+
+# No task is backed up before it has run this long, however quick the median (seconds)
+MIN_BACKUP_DELAY = 2.0
+
+# Tasks kept queued at once; the pipeline tops the queue up as results arrive
+MAX_QUEUED = 512
+
+# Longest pause of a worker between attempts to reach the broker (seconds)
+MAX_BROKER_BACKOFF = 30.0
+
+
+def task_queue(queue: str) -> str:
+    return f'{queue}:tasks'
+
+
+def result_queue(queue: str, run_id: str) -> str:
+    return f'{queue}:results:{run_id}'
+
+
+def run_key(queue: str, run_id: str) -> str:
+    return f'{queue}:run:{run_id}'
+
+
+@dataclass
+class _Task:
+    path: Path
+    future: Future
+    attempts: int = 0                                        # Copies queued so far
+    failures: List[str] = field(default_factory=list)
+    queued: Dict[int, float] = field(default_factory=dict)   # Attempt -> when it was queued, until taken
+    running: Dict[int, float] = field(default_factory=dict)  # Attempt -> when it was taken
+
+
+class Coordinator:
+    """Queues file tasks on a broker and turns workers' results into futures."""
+
+    def __init__(self, broker: Broker, project_path: Union[str, Path],
+                 settings: Dict[str, Any], queue: str = DEFAULT_QUEUE,
+                 max_attempts: int = 3, task_timeout: float = TASK_TIMEOUT,
+                 straggler_factor: float = 3.0, min_samples: int = MIN_SAMPLES,
+                 max_queued: int = MAX_QUEUED):
+        """
+        Initialize the coordinator.
+
+        Args:
+            broker: Broker shared with the workers
+            project_path: Project root; tasks name files relative to it
+            settings: Analysis settings workers apply (use_llm, rules, limits)
+            queue: Queue name workers listen on
+            max_attempts: Copies of a task queued at most (retries and backups)
+            task_timeout: Seconds after a worker took a task before it is
+                presumed lost and queued again
+            straggler_factor: A task running longer than this multiple of
+                the median task time gets a backup copy once the queue is empty
+            min_samples: Finished tasks needed before backups are considered
+            max_queued: Files handed out at once (queued or running); the
+                pipeline submits more as results come back
+        """
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+        self.broker = broker
+        self.project_path = Path(project_path)
+        self.settings = settings
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.task_timeout = task_timeout
+        self.straggler_factor = straggler_factor
+        self.min_samples = min_samples
+        self.max_queued = max_queued
+        self.run_id = uuid.uuid4().hex[:12]
+
+        self.retries = 0       # Copies queued after a failure or lost worker
+        self.backups = 0       # Copies queued for stragglers
+        self.duplicates = 0    # Results that arrived after another copy's
+        self.failed = 0        # Tasks that failed on every attempt
+        self.workers = set()
+        self._durations: List[float] = []
+        self._tasks: Dict[str, _Task] = {}
+        self._taken_up_to = 0.0                # When the latest copy workers have taken was queued
+        self._last_taken = time.monotonic()    # When a worker last took a copy
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Publish the run so workers accept its tasks, and start collecting results."""
+        self.broker.set(run_key(self.queue, self.run_id), {
+            'run_id': self.run_id,
+            'project_path': str(self.project_path.resolve()),
+            'settings': self.settings
+        })
+        self._last_taken = time.monotonic()
+        self._thread = threading.Thread(target=self._collect, name='deepoptimizer-coordinator', daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path: Path) -> Future:
+        """
+        Queue a file for the workers.
+
+        Returns:
+            Future yielding (result, seconds) once a worker has analyzed it
+        """
+        key = relative_key(file_path, self.project_path)
+        task = _Task(Path(file_path), Future())
+        with self._lock:
+            self._tasks[key] = task
+            self._dispatch(key, task)
+        return task.future
+
+    def _dispatch(self, key: str, task: _Task):
+        task.attempts += 1
+        task.queued[task.attempts] = time.monotonic()
+        self.broker.push(task_queue(self.queue), {
+            'run_id': self.run_id,
+            'task': key,
+            'attempt': task.attempts
+        })
+
+    def _collect(self):
+        results = result_queue(self.queue, self.run_id)
+        while not self._stop.is_set():
+            try:
+                message = self.broker.pop(results, POLL_INTERVAL * 4)
+            except BrokerError:
+                # Transient broker trouble: stragglers are still re-queued below
+                self._stop.wait(POLL_INTERVAL)
+                message = None
+            with self._lock:
+                if message is not None:
+                    self._handle(message)
+                self._check_running()
+
+    def _handle(self, message: Dict[str, Any]):
+        task = self._tasks.get(message.get('task'))
+        if task is None:
+            return
+        attempt = message.get('attempt', 0)
+        self.workers.add(message.get('worker'))
+        kind = message.get('type')
+
+        queued_at = task.queued.pop(attempt, None)
+        if kind == 'started':
+            now = time.monotonic()
+            if queued_at is not None:
+                self._taken_up_to = max(self._taken_up_to, queued_at)
+            self._last_taken = now
+            task.running[attempt] = now
+        elif kind == 'result':
+            task.running.pop(attempt, None)
+            if task.future.done():
+                self.duplicates += 1
+                return
+            seconds = message.get('seconds', 0.0)
+            self._durations.append(seconds)
+            result = message['result']
+            result['issues'] = [DetectedIssue.from_dict(issue) for issue in result.get('issues', [])]
+            if 'file' in result:
+                result['file'] = str(task.path)
+            self._resolve(task, result=(result, seconds))
+        elif kind == 'failed':
+            task.running.pop(attempt, None)
+            task.failures.append(message.get('error', 'unknown error'))
+            if task.future.done():
+                return
+            if task.attempts < self.max_attempts:
+                self.retries += 1
+                self._dispatch(message['task'], task)
+            elif not task.running and not task.queued:
+                self.failed += 1
+                self._resolve(task, error=RuntimeError(
+                    f"Failed on {task.attempts} worker attempt(s): {task.failures[-1]}"))
+
+    def _check_running(self):
+        """Queue another copy of tasks whose copies are lost or overdue."""
+        now = time.monotonic()
+        stalled = now - self._last_taken > self.task_timeout
+        for task in self._tasks.values():
+            if task.future.done():
+                continue
+            for attempt, queued_at in list(task.queued.items()):
+                if now - queued_at > self.task_timeout and (queued_at < self._taken_up_to or stalled):
+                    # Popped but never announced: a later copy was taken before it, or none was for too long
+                    del task.queued[attempt]
+                    task.running[attempt] = queued_at
+
+        drained = not any(task.queued for task in self._tasks.values())
+        straggler_after = None
+        if drained and len(self._durations) >= self.min_samples:
+            straggler_after = max(MIN_BACKUP_DELAY, self.straggler_factor * statistics.median(self._durations))
+
+        for key, task in self._tasks.items():
+            if task.future.done() or not task.running or task.queued:
+                continue
+            running_for = now - max(task.running.values())
+            lost = running_for > self.task_timeout
+            if task.attempts < self.max_attempts:
+                if lost:
+                    self.retries += 1
+                    self._dispatch(key, task)
+                elif straggler_after is not None and running_for > straggler_after:
+                    self.backups += 1
+                    self._dispatch(key, task)
+            elif lost:
+                # Every copy is overdue and none may be queued again
+                self.failed += 1
+                self._resolve(task, error=RuntimeError(
+                    f"No result from {task.attempts} worker attempt(s) within {self.task_timeout:g}s"))
+
+    def _resolve(self, task: _Task, result: Any = None, error: Optional[Exception] = None):
+        # The pipeline cancels futures of files it gave up on (run deadline)
+        if task.future.set_running_or_notify_cancel():
+            if error is not None:
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(result)
+        # Finished tasks keep their entry so late copies count as duplicates
+
+    def stats(self) -> Dict[str, Any]:
+        """Tasks, retries, backups and workers seen in this run."""
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'queue': self.queue,
+                'tasks': len(self._tasks),
+                'workers': len(self.workers - {None}),
+                'retries': self.retries,
+                'backups': self.backups,
+                'duplicates': self.duplicates,
+                'failed': self.failed,
+                'median_task_seconds': round(statistics.median(self._durations), 4) if self._durations else None
+            }
+
+    def close(self):
+        """Stop collecting and withdraw the run; workers drop its remaining tasks."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.broker.delete(run_key(self.queue, self.run_id), result_queue(self.queue, self.run_id))
+        except BrokerError:
+            pass
+
+    def __enter__(self) -> 'Coordinator':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def worker_name() -> str:
+    """Identifies a worker in results: host and process ID."""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_worker(broker: Broker, make_analyzer: Callable[[Dict[str, Any]], Any],
+               queue: str = DEFAULT_QUEUE, root: Optional[Union[str, Path]] = None,
+               idle_timeout: Optional[float] = None, stop: Optional[threading.Event] = None,
+               name: Optional[str] = None) -> int:
+    """
+    Pull file tasks from a broker and push back their results until stopped.
+
+    Args:
+        broker: Broker shared with the coordinator
+        make_analyzer: Builds a DeepOptimizer for a run's settings (called
+            once per run)
+        queue: Queue name the coordinator uses
+        root: This machine's checkout of the project (default: the
+            coordinator's project path)
+        idle_timeout: Return after this many seconds without a task (None:
+            run until stopped)
+        stop: Event that ends the loop after the current task
+        name: Worker name reported to the coordinator (default: host-pid)
+
+    Returns:
+        Number of tasks completed
+    """
+    name = name or worker_name()
+    stop = stop or threading.Event()
+    runs: Dict[str, Any] = {}
+    completed = 0
+    idle_since = time.monotonic()
+    backoff = POLL_INTERVAL
+
+    while not stop.is_set():
+        if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+            break
+        try:
+            message = broker.pop(task_queue(queue), POLL_INTERVAL * 4)
+            backoff = POLL_INTERVAL
+            if message is None:
+                continue
+            idle_since = time.monotonic()
+            if _run_task(broker, make_analyzer, queue, root, name, runs, message):
+                completed += 1
+        except BrokerError:
+            # Broker unreachable: retry with growing pauses. A task taken meanwhile
+            # is lost here, and the coordinator queues it again
+            stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_BROKER_BACKOFF)
+    return completed
+
+
+def _start_run(make_analyzer: Callable[[Dict[str, Any]], Any], project_path: Path,
+               settings: Dict[str, Any]) -> Tuple[Any, Optional[ProjectIndex]]:
+    """A run's analyzer, and for LLM runs the index of this machine's checkout."""
+    analyzer = make_analyzer(settings)
+    if not settings.get('use_llm', True) or analyzer.llm_analyzer is None:
+        # The index only feeds prompts here; project-level rules run on the coordinator
+        return analyzer, None
+    files = iter_files(project_path, settings.get('include_patterns'),
+                       DEFAULT_EXCLUDE_PATTERNS + settings.get('exclude_patterns', []),
+                       settings.get('respect_gitignore', True))
+    return analyzer, analyzer.index_project(project_path, files)
+
+
+def _run_task(broker: Broker, make_analyzer: Callable[[Dict[str, Any]], Any], queue: str,
+              root: Optional[Union[str, Path]], name: str, runs: Dict[str, Any],
+              message: Dict[str, Any]) -> bool:
+    """Analyze one task's file and push back the result. Returns whether it succeeded."""
+    run_id = message.get('run_id')
+    run = broker.get(run_key(queue, run_id))
+    if run is None:
+        # Its coordinator finished or gave up
+        runs.pop(run_id, None)
+        return False
+
+    reply = {'task': message['task'], 'attempt': message.get('attempt', 0), 'worker': name}
+    results = result_queue(queue, run_id)
+    broker.push(results, {**reply, 'type': 'started'})
+    project_path = Path(root or run['project_path'])
+    file_path = project_path / message['task']
+    try:
+        # A run whose settings this machine can't apply fails each task, which the coordinator reports
+        if run_id not in runs:
+            runs[run_id] = _start_run(make_analyzer, project_path, run['settings'])
+        analyzer, project_index = runs[run_id]
+        context = {'symbol_context': project_index.format_context(str(file_path))} if project_index else None
+        start = time.perf_counter()
+        deadline = Deadline(analyzer.file_timeout) if analyzer.file_timeout is not None else None
+        result = analyzer.analyze_file(file_path, include_llm=run['settings'].get('use_llm', True),
+                                       project_context=context, deadline=deadline)
+    except Exception as e:
+        broker.push(results, {**reply, 'type': 'failed', 'error': f'{type(e).__name__}: {e}'})
+        return False
+    broker.push(results, {**reply, 'type': 'result', 'seconds': time.perf_counter() - start,
+                          'result': result})
+    return True
@@ -8,6 +8,7 @@ from pathlib import Path
 from datetime import datetime
 
 from .utils import safe_print
+from .issues import json_default
 
 try:
     import click
@@ -69,7 +70,7 @@ class OutputFormatter:
     def format_file_results(self, results: Dict[str, Any], show_code: bool = True) -> str:
         """Format results for a single file."""
         if self.style == 'json':
-            return json.dumps(results, indent=2)
+            return json.dumps(results, indent=2, default=json_default)
         elif self.style == 'markdown':
             return self._format_markdown(results)
         elif self.style == 'simple':
@@ -80,7 +81,7 @@ class OutputFormatter:
     def format_project_results(self, results: Dict[str, Any]) -> str:
         """Format results for an entire project."""
         if self.style == 'json':
-            return json.dumps(results, indent=2)
+            return json.dumps(results, indent=2, default=json_default)
         elif self.style == 'markdown':
             return self._format_project_markdown(results)
         else:
@@ -100,6 +101,10 @@ class OutputFormatter:
         
         # File info
         output.append(safe_print(f"\n📄 File: {file_path}"))
+        if results.get('skipped'):
+            output.append(self._echo(f"⏭️  Skipped: {results['skipped']}", fg='yellow'))
+        elif results.get('llm_skipped'):
+            output.append(self._echo(f"📏 Rules only: {results['llm_skipped']}", fg='yellow'))
         
         # Summary
         if summary:
@@ -154,12 +159,15 @@ class OutputFormatter:
         
         # Title with line numbers
         title = f"{index}. {category_icon} {issue.get('title', 'Unknown issue')}"
+        if issue.get('rule_id'):
+            title += f" [{issue['rule_id']}]"
+        cell = f"Cell {issue['cell']}, " if issue.get('cell') is not None else ""
         if issue.get('line_numbers'):
             lines = issue['line_numbers']
             if len(lines) == 1:
-                title += f" (Line {lines[0]})"
+                title += f" ({cell}Line {lines[0]})"
             else:
-                title += f" (Lines {lines[0]}-{lines[-1]})"
+                title += f" ({cell}Lines {lines[0]}-{lines[-1]})"
         
         output.append(self._echo(title, fg=color, bold=True))
         
@@ -238,6 +246,28 @@ class OutputFormatter:
         output.append(safe_print(f"📄 Files analyzed: {results.get('files_analyzed', 0)}"))
         output.append(safe_print(f"📊 Total issues: {results.get('total_issues', 0)}"))
         
+        # Files cut off by --timeout / --file-timeout
+        unfinished = results.get('unfinished_files', [])
+        if unfinished:
+            output.append(self._echo(f"\n⏱️  Timed out: {len(unfinished)} file(s) not analyzed", 
+                                   fg='yellow', bold=True))
+            for file_path in unfinished[:10]:
+                output.append(safe_print(f"   • {file_path}"))
+            if len(unfinished) > 10:
+                output.append(f"   ... and {len(unfinished) - 10} more")
+        
+        # Files routed around the LLM (or skipped) by size and generated-file limits
+        skipped = results.get('skipped_files', {})
+        rules_only = results.get('rules_only_files', {})
+        if skipped:
+            output.append(safe_print(f"⏭️  Skipped: {len(skipped)} file(s) (too large or generated)"))
+        if rules_only:
+            output.append(safe_print(f"📏 Rules only: {len(rules_only)} file(s) (too large or generated for LLM)"))
+        triage = results.get('llm_triage')
+        if triage:
+            output.append(safe_print(f"🔎 Triage: {triage['cleared']} of {triage['screened']} file(s) cleared by "
+                                     f"{triage['model']}, not sent to the deep model"))
+        
         # Issues by severity
         by_severity = results.get('issues_by_severity', {})
         if by_severity:
@@ -308,7 +338,8 @@ class OutputFormatter:
                         output.append(f"### {issue.get('title', 'Unknown')}")
                         
                         if issue.get('line_numbers'):
-                            output.append(f"**Location:** Lines {', '.join(map(str, issue['line_numbers']))}")
+                            cell = f"Cell {issue['cell']}, " if issue.get('cell') is not None else ""
+                            output.append(f"**Location:** {cell}Lines {', '.join(map(str, issue['line_numbers']))}")
                         
                         if issue.get('description'):
                             output.append(f"\n{issue['description']}")
@@ -336,9 +367,12 @@ class OutputFormatter:
             line_info = ""
             
             if issue.get('line_numbers'):
-                line_info = f" (Line {issue['line_numbers'][0]})"
+                cell = f"Cell {issue['cell']}, " if issue.get('cell') is not None else ""
+                line_info = f" ({cell}Line {issue['line_numbers'][0]})"
+            
+            rule_info = f" [{issue['rule_id']}]" if issue.get('rule_id') else ""
             
-            output.append(f"{severity}: {title}{line_info}")
+            output.append(f"{severity}: {title}{rule_info}{line_info}")
             
             if issue.get('suggestion'):
                 output.append(f"  Fix: {issue['suggestion']}")
@@ -406,6 +440,24 @@ class OutputFormatter:
         output.append(f"**Files Analyzed:** {results.get('files_analyzed', 0)}")
         output.append(f"**Total Issues:** {results.get('total_issues', 0)}")
         
+        unfinished = results.get('unfinished_files', [])
+        if unfinished:
+            output.append(f"\n## Timed Out ({len(unfinished)} files not analyzed)\n")
+            for file_path in unfinished:
+                output.append(f"- `{file_path}`")
+        
+        for heading, files in (('Skipped Files', results.get('skipped_files', {})),
+                               ('Rules-Only Files', results.get('rules_only_files', {}))):
+            if files:
+                output.append(f"\n## {heading} ({len(files)})\n")
+                for file_path, reason in files.items():
+                    output.append(f"- `{file_path}`: {reason}")
+        
+        triage = results.get('llm_triage')
+        if triage:
+            output.append(f"\n**Triage:** {triage['cleared']} of {triage['screened']} file(s) cleared by "
+                          f"`{triage['model']}`, not sent to the deep model")
+        
         # Summary statistics
         by_severity = results.get('issues_by_severity', {})
         if by_severity:
@@ -0,0 +1,112 @@
+"""
+Hedged LLM requests: duplicate a request that is slower than usual.
+
+Each model's recent times to first output are kept in a sliding window. Once
+a request has waited longer than the configured percentile of that window,
+a duplicate is sent, if the model's concurrency limit has a free slot for
+it, and whichever produces output first is used (see
+timeouts.iter_with_timeout). Duplicates are extra spend, so they are capped
+at a fraction of the requests made in the run.
+"""
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Samples needed before a percentile is trusted, and how many are kept per model
+MIN_SAMPLES = 20
+WINDOW = 200
+
+
+class Hedger:
+    """Per-model latency percentiles plus the run's budget for duplicate requests."""
+
+    def __init__(self, percentile: float = 95.0, budget: float = 0.05,
+                 min_samples: int = MIN_SAMPLES, window: int = WINDOW):
+        """
+        Initialize the hedger.
+
+        Args:
+            percentile: Send a duplicate once a request has waited longer than
+                this percentile of observed times to first output (0-100)
+            budget: Maximum duplicates as a fraction of requests (0.05: at
+                most one extra request per 20)
+            min_samples: Observations of a model needed before hedging it
+            window: Most recent observations kept per model
+        """
+        if not 0 < percentile < 100:
+            raise ValueError(f"hedge percentile must be between 0 and 100, got {percentile}")
+        if budget < 0:
+            raise ValueError(f"hedge budget must not be negative, got {budget}")
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+
+        self.requests = 0      # Primary requests
+        self.hedges = 0        # Duplicates sent
+        self.hedge_wins = 0    # Duplicates that answered first
+        self.skipped = 0       # Duplicates not sent for lack of a concurrency slot
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def delay(self, model_name: str) -> Optional[float]:
+        """Seconds after which a request to a model gets a duplicate (None: too few samples yet)."""
+        with self._lock:
+            samples = self._samples.get(model_name)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        rank = math.ceil(self.percentile / 100 * len(ordered)) - 1
+        return ordered[max(0, rank)]
+
+    def requested(self):
+        """Count a primary request towards the budget."""
+        with self._lock:
+            self.requests += 1
+
+    def try_hedge(self) -> bool:
+        """Take a duplicate from the budget; False once the run has spent it."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def skip(self):
+        """Count a duplicate that was due but found the model's concurrency limit full."""
+        with self._lock:
+            self.skipped += 1
+
+    def record(self, model_name: str, latency: float, hedged: bool = False):
+        """
+        Record a request's time to first output.
+
+        Args:
+            model_name: Model that answered
+            latency: Seconds from sending the request to its first output
+            hedged: The duplicate answered first
+        """
+        with self._lock:
+            samples = self._samples.get(model_name)
+            if samples is None:
+                samples = self._samples[model_name] = deque(maxlen=self.window)
+            samples.append(latency)
+            if hedged:
+                self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests, duplicates sent and won, and the current hedge delay per model."""
+        with self._lock:
+            models = list(self._samples)
+            stats = {
+                'percentile': self.percentile,
+                'budget': self.budget,
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'hedges_skipped': self.skipped
+            }
+        delays = {model_name: self.delay(model_name) for model_name in models}
+        stats['delays'] = {name: round(delay, 3) for name, delay in delays.items() if delay is not None}
+        return stats
@@ -0,0 +1,294 @@
+"""
+SQLite database of analysis runs for history and trend queries.
+
+Each recorded run stores its files, issues and per-file timings. Issues get
+a line-independent fingerprint (file, rule and title) so runs can be
+compared without reprocessing old exports: new issues since the previous
+run, files whose issue count grew the most, and the slowest files.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+from .cache import default_cache_dir
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL,
+    files_analyzed INTEGER NOT NULL DEFAULT 0,
+    total_issues INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    warnings INTEGER NOT NULL DEFAULT 0,
+    infos INTEGER NOT NULL DEFAULT 0,
+    methods TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS issues (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    rule TEXT,
+    severity TEXT NOT NULL,
+    category TEXT,
+    title TEXT NOT NULL,
+    line INTEGER,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    seconds REAL NOT NULL,
+    issue_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, file_id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_root ON runs(root, started_at);
+CREATE INDEX IF NOT EXISTS idx_issues_run ON issues(run_id, fingerprint);
+CREATE INDEX IF NOT EXISTS idx_issues_file ON issues(file_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_issues_rule ON issues(rule, run_id);
+"""
+
+
+def default_history_path() -> Path:
+    """Get the history database path (DEEPOPTIMIZER_HISTORY_DB or <cache dir>/history.sqlite3)."""
+    env_path = os.environ.get('DEEPOPTIMIZER_HISTORY_DB')
+    if env_path:
+        return Path(env_path)
+    return default_cache_dir() / 'history.sqlite3'
+
+
+def issue_fingerprint(file_path: str, issue: Any) -> str:
+    """Identify an issue across runs independently of its line numbers."""
+    key = f"{file_path}\0{issue.get('rule_id') or ''}\0{issue.get('title', '')}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class ResultsDB:
+    """Run history backed by a single SQLite file."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        Open (and create if needed) the results database.
+
+        Args:
+            path: Database file (uses default_history_path() if not provided)
+        """
+        self.path = Path(path) if path else default_history_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        # Readers (e.g. 'history') don't block a nightly run that is recording
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'ResultsDB':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _file_ids(self, paths: List[str]) -> Dict[str, int]:
+        self.conn.executemany('INSERT OR IGNORE INTO files (path) VALUES (?)', [(p,) for p in paths])
+        ids = {}
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            for row in self.conn.execute(f'SELECT id, path FROM files WHERE path IN ({placeholders})', batch):
+                ids[row['path']] = row['id']
+        return ids
+
+    def record_run(self, results: Dict[str, Any], root: Union[str, Path],
+                   started_at: Optional[float] = None, duration: Optional[float] = None) -> int:
+        """
+        Store the results of one analysis.
+
+        Args:
+            results: Output of DeepOptimizer.analyze_project or analyze_file
+            root: Analyzed project directory or file
+            started_at: Run start (Unix time; defaults to now)
+            duration: Wall-clock run time in seconds
+
+        Returns:
+            ID of the new run
+        """
+        def resolve(path: str) -> str:
+            # Store absolute paths so runs from different directories line up
+            return str(Path(path).resolve())
+
+        if 'issues_by_file' in results:
+            file_results = {
+                resolve(path): data for path, data in results['issues_by_file'].items()
+                if isinstance(data, dict)
+            }
+            timings = {resolve(path): seconds for path, seconds in results.get('file_timings', {}).items()}
+        else:
+            file_path = resolve(results.get('file', str(root)))
+            file_results = {file_path: results}
+            timings = {file_path: duration or 0.0}
+
+        paths = sorted(set(file_results) | set(timings))
+        counts = {'error': 0, 'warning': 0, 'info': 0}
+        issue_rows = []
+
+        with self.conn:
+            file_ids = self._file_ids(paths)
+
+            for path, data in file_results.items():
+                for issue in data.get('issues', []):
+                    severity = issue.get('severity', 'info')
+                    if severity in counts:
+                        counts[severity] += 1
+                    lines = issue.get('line_numbers') or []
+                    issue_rows.append((
+                        file_ids[path], issue.get('rule_id'), severity, issue.get('category'),
+                        issue.get('title', ''), lines[0] if lines else None,
+                        issue_fingerprint(path, issue)
+                    ))
+
+            cursor = self.conn.execute(
+                'INSERT INTO runs (root, started_at, duration, files_analyzed, total_issues, '
+                'errors, warnings, infos, methods) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(Path(root).resolve()), started_at or time.time(), duration,
+                 len(timings) or len(file_results), len(issue_rows),
+                 counts['error'], counts['warning'], counts['info'],
+                 ','.join(results.get('analysis_methods', [])))
+            )
+            run_id = cursor.lastrowid
+
+            self.conn.executemany(
+                'INSERT INTO issues (run_id, file_id, rule, severity, category, title, line, fingerprint) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id,) + row for row in issue_rows]
+            )
+            self.conn.executemany(
+                'INSERT INTO timings (run_id, file_id, seconds, issue_count) VALUES (?, ?, ?, ?)',
+                [
+                    (run_id, file_ids[path], timings.get(path, 0.0),
+                     len(file_results.get(path, {}).get('issues', [])))
+                    for path in paths
+                ]
+            )
+
+        return run_id
+
+    def runs(self, root: Optional[Union[str, Path]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs, newest first (optionally only those of one root)."""
+        if root is not None:
+            rows = self.conn.execute(
+                'SELECT * FROM runs WHERE root = ? ORDER BY started_at DESC, id DESC LIMIT ?',
+                (str(Path(root).resolve()), limit)
+            )
+        else:
+            rows = self.conn.execute('SELECT * FROM runs ORDER BY started_at DESC, id DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    def latest_run(self, root: Optional[Union[str, Path]] = None) -> Optional[int]:
+        """ID of the most recent run (optionally of one root)."""
+        runs = self.runs(root, limit=1)
+        return runs[0]['id'] if runs else None
+
+    def previous_run(self, run_id: int) -> Optional[int]:
+        """ID of the run of the same root that preceded the given one."""
+        row = self.conn.execute(
+            'SELECT prev.id FROM runs cur JOIN runs prev ON prev.root = cur.root '
+            'AND (prev.started_at < cur.started_at OR (prev.started_at = cur.started_at AND prev.id < cur.id)) '
+            'WHERE cur.id = ? ORDER BY prev.started_at DESC, prev.id DESC LIMIT 1',
+            (run_id,)
+        ).fetchone()
+        return row['id'] if row else None
+
+    def new_issues(self, run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Issues of a run that the previous run of the same root did not have.
+
+        Args:
+            run_id: Run to inspect (default: the latest run)
+        """
+        run_id = run_id or self.latest_run()
+        if run_id is None:
+            return []
+        previous = self.previous_run(run_id)
+
+        rows = self.conn.execute(
+            'SELECT f.path, i.rule, i.severity, i.category, i.title, i.line FROM issues i '
+            'JOIN files f ON f.id = i.file_id WHERE i.run_id = ? AND NOT EXISTS ('
+            '  SELECT 1 FROM issues p WHERE p.run_id = ? AND p.fingerprint = i.fingerprint'
+            ') ORDER BY f.path, i.line',
+            (run_id, previous if previous is not None else -1)
+        )
+        return [dict(row) for row in rows]
+
+    def top_regressing_files(self, run_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Files whose issue count grew the most since the previous run.
+
+        Args:
+            run_id: Run to inspect (default: the latest run)
+            limit: Maximum number of files
+        """
+        run_id = run_id or self.latest_run()
+        if run_id is None:
+            return []
+        previous = self.previous_run(run_id)
+
+        rows = self.conn.execute(
+            'SELECT f.path, cur.issue_count AS issues, COALESCE(prev.issue_count, 0) AS previous, '
+            'cur.issue_count - COALESCE(prev.issue_count, 0) AS delta FROM timings cur '
+            'JOIN files f ON f.id = cur.file_id '
+            'LEFT JOIN timings prev ON prev.run_id = ? AND prev.file_id = cur.file_id '
+            'WHERE cur.run_id = ? AND cur.issue_count > COALESCE(prev.issue_count, 0) '
+            'ORDER BY delta DESC, f.path LIMIT ?',
+            (previous if previous is not None else -1, run_id, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def slowest_files(self, run_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Files that took longest to analyze in a run.
+
+        Args:
+            run_id: Run to inspect (default: the latest run)
+            limit: Maximum number of files
+        """
+        run_id = run_id or self.latest_run()
+        if run_id is None:
+            return []
+
+        rows = self.conn.execute(
+            'SELECT f.path, t.seconds, t.issue_count AS issues FROM timings t '
+            'JOIN files f ON f.id = t.file_id WHERE t.run_id = ? ORDER BY t.seconds DESC LIMIT ?',
+            (run_id, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def rule_trend(self, rule: str, root: Optional[Union[str, Path]] = None,
+                   limit: int = 30) -> List[Dict[str, Any]]:
+        """Issue count of one rule per run, newest first (optionally only runs of one root)."""
+        query = (
+            'SELECT r.id, r.started_at, '
+            '(SELECT COUNT(*) FROM issues i WHERE i.run_id = r.id AND i.rule = ?) AS issues '
+            'FROM runs r'
+        )
+        params: List[Any] = [rule]
+        if root is not None:
+            query += ' WHERE r.root = ?'
+            params.append(str(Path(root).resolve()))
+        query += ' ORDER BY r.started_at DESC, r.id DESC LIMIT ?'
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
@@ -0,0 +1,187 @@
+"""
+Columnar store of a project's issues for one-pass aggregation.
+
+Each issue becomes one row across compact ``array`` columns (file, rule,
+title, severity, category, line), with repeated strings stored once in code
+tables. Group-bys count the integer columns with ``collections.Counter``
+instead of walking issue records and re-checking titles per query.
+"""
+from array import array
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+SEVERITIES = ('error', 'warning', 'info')
+SEVERITY_ORDER = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+
+class _Codes:
+    """Maps distinct values to small integer codes."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class IssueStore:
+    """
+    Append-only, array-backed issue table.
+
+    Issues are grouped under their rule ID, or their title when they have none
+    (LLM findings). The first issue of each group is kept as its example.
+    """
+
+    def __init__(self):
+        self.files = _Codes()
+        self.keys = _Codes()
+        self.titles = _Codes()
+        self.severities = _Codes(SEVERITIES)
+        self.categories = _Codes()
+
+        self.file_col = array('I')
+        self.key_col = array('I')
+        self.title_col = array('I')
+        self.severity_col = array('B')
+        self.category_col = array('I')
+        self.line_col = array('i')  # First line, 0 if unknown
+
+        self.examples: List[Any] = []  # First issue per key code
+
+    @classmethod
+    def from_issues(cls, issues: Iterable[Any], file_path: str = '') -> 'IssueStore':
+        """Build a store holding the issues of a single file."""
+        store = cls()
+        store.add(file_path, issues)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.key_col)
+
+    def add(self, file_path: str, issues: Iterable[Any]):
+        """
+        Append the issues of a file.
+
+        Args:
+            file_path: File the issues belong to
+            issues: Issue records (or dicts)
+        """
+        file_code = self.files.code(file_path)
+
+        for issue in issues:
+            title = issue.get('title', '')
+            key = issue.get('rule_id') or title
+            key_code = self.keys.code(key)
+            if key_code == len(self.examples):
+                self.examples.append(issue)
+
+            lines = issue.get('line_numbers') or []
+            line = lines[0] if lines and isinstance(lines[0], int) else 0
+
+            self.file_col.append(file_code)
+            self.key_col.append(key_code)
+            self.title_col.append(self.titles.code(title))
+            self.severity_col.append(self.severities.code(issue.get('severity', 'info')))
+            self.category_col.append(self.categories.code(issue.get('category', 'general')))
+            self.line_col.append(line)
+
+    def _count(self, column: array, codes: _Codes) -> Dict[str, int]:
+        counts = Counter(column)
+        return {codes.values[code]: count for code, count in sorted(counts.items())}
+
+    def count_by_severity(self) -> Dict[str, int]:
+        """Issue counts per severity (error, warning and info are always present)."""
+        counts = {severity: 0 for severity in SEVERITIES}
+        counts.update(self._count(self.severity_col, self.severities))
+        return counts
+
+    def count_by_category(self) -> Dict[str, int]:
+        """Issue counts per category."""
+        return self._count(self.category_col, self.categories)
+
+    def count_by_rule(self) -> Dict[str, int]:
+        """Issue counts per rule ID (or title for issues without one)."""
+        return self._count(self.key_col, self.keys)
+
+    def count_by_file(self) -> Dict[str, int]:
+        """Issue counts per file."""
+        return self._count(self.file_col, self.files)
+
+    def file_coverage(self) -> Dict[str, int]:
+        """Number of distinct files each rule fires in."""
+        counts = Counter(key for key, _ in set(zip(self.key_col, self.file_col)))
+        return {self.keys.values[code]: count for code, count in sorted(counts.items())}
+
+    def files_with_title(self, *terms: str) -> int:
+        """
+        Count files with an issue whose title mentions any of the terms.
+
+        Titles are matched once per distinct title, not once per issue.
+        """
+        terms = [term.lower() for term in terms]
+        matching = {
+            code for code, title in enumerate(self.titles.values)
+            if any(term in title.lower() for term in terms)
+        }
+        if not matching:
+            return 0
+        return len({f for t, f in zip(self.title_col, self.file_col) if t in matching})
+
+    def select(self, rule: Optional[str] = None, severity: Optional[str] = None,
+               file_path: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        Find issue locations matching all given filters.
+
+        Returns:
+            (file path, first line) per matching issue, 0 when the line is unknown
+        """
+        filters = []
+        for codes, column, value in ((self.keys, self.key_col, rule),
+                                     (self.severities, self.severity_col, severity),
+                                     (self.files, self.file_col, file_path)):
+            if value is not None:
+                if value not in codes.codes:
+                    return []
+                filters.append((column, codes.codes[value]))
+
+        return [
+            (self.files.values[self.file_col[row]], self.line_col[row])
+            for row in range(len(self))
+            if all(column[row] == code for column, code in filters)
+        ]
+
+    def top_issues(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Most common rules across the store.
+
+        Returns:
+            Entries with count, severity (of the first occurrence), example
+            issue and rule_id (when the group is a rule), most frequent first
+        """
+        counts = Counter(self.key_col)
+        entries = []
+        for code, key in enumerate(self.keys.values):
+            if not key:
+                continue
+            example = self.examples[code]
+            entry = {
+                'count': counts[code],
+                'severity': example.get('severity', 'info'),
+                'example': example
+            }
+            if example.get('rule_id'):
+                entry['rule_id'] = key
+            entries.append(entry)
+
+        entries.sort(key=lambda x: (-x['count'], SEVERITY_ORDER.get(x['severity'], 3)))
+        return entries[:limit]
@@ -0,0 +1,145 @@
+"""
+Compact issue record shared by every analysis stage.
+
+Issues are slotted objects with interned strings from detection through
+merging, aggregation and formatting. They support the read/write mapping
+operations the rest of the code uses (``issue.get('title')``,
+``issue['line_numbers'] = ...``), and are turned into plain dicts only at
+the serialization boundary (JSON output and the on-disk caches).
+"""
+import sys
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+# Record fields, in serialization order
+ISSUE_FIELDS = (
+    'severity', 'category', 'title', 'description', 'line_numbers', 'file_path',
+    'suggestion', 'confidence', 'references', 'rule_id', 'file', 'cell'
+)
+
+# Fields whose values repeat across findings and are interned
+INTERNED_FIELDS = frozenset({'severity', 'category', 'title', 'suggestion', 'rule_id', 'file_path', 'file'})
+
+_FIELD_SET = frozenset(ISSUE_FIELDS)
+
+
+def _intern(field: str, value: Any) -> Any:
+    if field in INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class DetectedIssue:
+    """
+    A single finding.
+
+    A field set to None counts as absent, the same as a missing key in the
+    dict form. Keys outside ISSUE_FIELDS (e.g. extra fields an LLM returns)
+    are kept in a side dict that is only allocated when needed.
+    """
+
+    __slots__ = ISSUE_FIELDS + ('extra',)
+
+    def __init__(self, severity: str, category: str, title: str, description: str,
+                 line_numbers: Optional[List[int]] = None, file_path: Optional[str] = None,
+                 suggestion: Optional[str] = None, confidence: Optional[float] = 0.9,
+                 references: Optional[List[str]] = None, rule_id: Optional[str] = None,
+                 file: Optional[str] = None, cell: Optional[int] = None, **extra):
+        self.severity = _intern('severity', severity)
+        self.category = _intern('category', category)
+        self.title = _intern('title', title)
+        self.description = description
+        self.line_numbers = line_numbers
+        self.file_path = _intern('file_path', file_path)
+        self.suggestion = _intern('suggestion', suggestion)
+        self.confidence = confidence
+        self.references = references
+        self.rule_id = _intern('rule_id', rule_id)
+        self.file = _intern('file', file)
+        self.cell = cell
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DetectedIssue':
+        """Build an issue from its dict form (missing fields stay absent)."""
+        issue = cls.__new__(cls)
+        for field in ISSUE_FIELDS:
+            setattr(issue, field, _intern(field, data.get(field)))
+        extra = {k: v for k, v in data.items() if k not in _FIELD_SET}
+        issue.extra = extra or None
+        return issue
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format (absent fields are omitted)."""
+        result = {}
+        for key, value in self.items():
+            result[key] = list(value) if isinstance(value, list) else value
+        return result
+
+    # Mapping-style access, matching the dict form
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None and key not in self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        if key in _FIELD_SET:
+            setattr(self, key, _intern(key, value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not None
+        return self.extra is not None and key in self.extra
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self.get(key)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for field in ISSUE_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                yield field, value
+        if self.extra is not None:
+            yield from self.extra.items()
+
+    def keys(self) -> Iterator[str]:
+        for key, _ in self.items():
+            yield key
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def __repr__(self) -> str:
+        return f"DetectedIssue({self.to_dict()!r})"
+
+
+def as_issue(issue: Any) -> DetectedIssue:
+    """Wrap a dict-form issue (issue records are passed through unchanged)."""
+    if isinstance(issue, DetectedIssue):
+        return issue
+    return DetectedIssue.from_dict(issue)
+
+
+def json_default(obj: Any) -> Any:
+    """``default`` hook for json.dump(s) that serializes issue records."""
+    if isinstance(obj, DetectedIssue):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,253 @@
+"""
+Append-only journal of a project run, for resuming after a crash.
+
+Each line is one JSON record: a header with the run's settings, then one
+record per finished file (by its path relative to the project root, so the
+run can be resumed from any directory) with its result and the file's size
+and mtime at the time. Lines are flushed as they are written and fsynced at most once a
+second, so an interrupted run (OOM, preemption, Ctrl-C) loses at most the
+files that were in flight. When the run is resumed, files whose stamp is
+unchanged are taken from the journal instead of being analyzed again, and
+new results are appended to the same journal. A torn last line is ignored.
+Results where part of the analysis failed (a Gemini request that errored or
+timed out) are not recorded, so a resumed run analyzes those files again.
+"""
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from .issues import DetectedIssue, json_default
+from .sharding import relative_key
+
+JOURNAL_VERSION = 2
+
+# Journals kept per directory; older ones are removed when a run starts
+MAX_JOURNALS = 20
+
+# Minimum seconds between fsyncs
+FSYNC_INTERVAL = 1.0
+
+_RUN_ID = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def new_run_id() -> str:
+    """A sortable, unique run ID such as 20250106-142233-9f1c2a."""
+    return time.strftime('%Y%m%d-%H%M%S') + '-' + secrets.token_hex(3)
+
+
+def _stamp(file_path: Union[str, Path]) -> Optional[list]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _setting(settings: Dict[str, Any], key: str) -> Any:
+    for part in key.split('.'):
+        if not isinstance(settings, dict):
+            return None
+        settings = settings.get(part)
+    return settings
+
+
+def _incomplete(result: Dict[str, Any]) -> bool:
+    """Whether a stage of the file's analysis failed (its result carries an analysis_error issue)."""
+    return any(issue.get('category') == 'analysis_error' for issue in result.get('issues', []))
+
+
+class RunJournal:
+    """The journal of one project run."""
+
+    def __init__(self, path: Path, header: Dict[str, Any],
+                 completed: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Open a journal for appending (use create() or resume()).
+
+        Args:
+            path: Journal file
+            header: The run's header record
+            completed: Finished-file records already in the journal, by
+                path relative to the project root
+        """
+        self.path = path
+        self.header = header
+        self.run_id = header['run_id']
+        self.completed = completed or {}
+        self.project_path = Path(header['project_path'])
+        self.resumed = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._synced = time.monotonic()
+
+    @classmethod
+    def create(cls, directory: Union[str, Path], project_path: Union[str, Path],
+               settings: Dict[str, Any]) -> 'RunJournal':
+        """
+        Start the journal of a new run.
+
+        Args:
+            directory: Directory holding run journals
+            project_path: Project being analyzed
+            settings: Settings that affect results; a resumed run must match them
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        _prune(directory, MAX_JOURNALS - 1)
+
+        header = {
+            'type': 'run',
+            'version': JOURNAL_VERSION,
+            'run_id': new_run_id(),
+            'project_path': str(Path(project_path).resolve()),
+            'started_at': time.time(),
+            'settings': settings
+        }
+        journal = cls(directory / f"{header['run_id']}.jsonl", header)
+        journal._write(header, sync=True)
+        return journal
+
+    @classmethod
+    def resume(cls, directory: Union[str, Path], run_id: str) -> 'RunJournal':
+        """
+        Reopen the journal of an earlier run.
+
+        Raises:
+            ValueError: If there is no readable journal for the run ID
+        """
+        if not _RUN_ID.match(run_id):
+            raise ValueError(f"Invalid run ID: {run_id!r}")
+        path = Path(directory) / f"{run_id}.jsonl"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().split('\n')
+        except OSError:
+            raise ValueError(f"No journal for run {run_id} in {directory}") from None
+
+        header = None
+        completed = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Empty, or torn by the crash being recovered from
+                continue
+            if not isinstance(record, dict):
+                continue
+            if record.get('type') == 'run' and header is None:
+                header = record
+            elif record.get('type') == 'file' and isinstance(record.get('result'), dict):
+                completed[record['path']] = record
+        if header is None or header.get('version') != JOURNAL_VERSION:
+            raise ValueError(f"Journal of run {run_id} is unreadable or from another version")
+
+        journal = cls(path, header, completed)
+        if lines and lines[-1]:
+            # Terminate a torn last line so the next record starts cleanly
+            journal._write(None, sync=True)
+        return journal
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """The settings the run was started with."""
+        return self.header.get('settings', {})
+
+    def check_settings(self, settings: Dict[str, Any], keys: Optional[Iterable[str]] = None):
+        """
+        Check that settings given for a resumed run agree with the ones it was started with.
+
+        Args:
+            settings: Settings of the resumed run
+            keys: Settings to compare, '.' reaching into nested ones such as
+                'limits.max_bytes' (default: all)
+
+        Raises:
+            ValueError: Naming the settings that differ
+        """
+        # Compare through JSON, as the recorded settings went through it
+        current = json.loads(json.dumps(settings))
+        if keys is None:
+            keys = set(self.settings) | set(current)
+        changed = sorted(key for key in keys if _setting(self.settings, key) != _setting(current, key))
+        if changed:
+            raise ValueError(
+                f"Run {self.run_id} was started with different settings ({', '.join(changed)}); "
+                f"resume it without those options or with the values it used"
+            )
+
+    def completed_result(self, file_path: Union[str, Path]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        A file's result from the journal, if it is unchanged since it was recorded.
+
+        Returns:
+            Tuple of (result, seconds), or None if the file has to be analyzed
+        """
+        record = self.completed.get(self._key(file_path))
+        if record is None or record.get('stamp') != _stamp(file_path) or _incomplete(record['result']):
+            return None
+        result = dict(record['result'])
+        result['issues'] = [DetectedIssue.from_dict(issue) for issue in result.get('issues', [])]
+        # Name the file as this run does (the run may have started from another directory)
+        name = str(file_path)
+        for entry in [result, *result['issues']]:
+            for field in ('file', 'file_path'):
+                if field in entry:
+                    entry[field] = name
+        self.resumed += 1
+        return result, record.get('seconds', 0.0)
+
+    def record(self, file_path: Union[str, Path], result: Dict[str, Any], seconds: float):
+        """Append a finished file's result, unless part of its analysis failed."""
+        if _incomplete(result):
+            return
+        self._write({
+            'type': 'file',
+            'path': self._key(file_path),
+            'stamp': _stamp(file_path),
+            'seconds': round(seconds, 4),
+            'result': result
+        })
+
+    def _key(self, file_path: Union[str, Path]) -> str:
+        return relative_key(Path(file_path).resolve(), self.project_path)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def _write(self, record: Optional[Dict[str, Any]], sync: bool = False):
+        line = json.dumps(record, default=json_default) if record is not None else ''
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            now = time.monotonic()
+            if sync or now - self._synced >= FSYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._synced = now
+
+    def __enter__(self) -> 'RunJournal':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _prune(directory: Path, keep: int):
+    """Remove all but the newest ``keep`` journals."""
+    try:
+        journals = sorted(directory.glob('*.jsonl'), key=lambda path: path.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for path in journals[keep:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
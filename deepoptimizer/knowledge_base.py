@@ -3,7 +3,9 @@ Knowledge base for ML optimization techniques and their relationships.
 """
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+
+from .source import SourceUnit, as_source_unit
 
 
 class KnowledgeBase:
@@ -20,6 +22,7 @@ class KnowledgeBase:
         self.relationships = []
         self.techniques_by_category = {}
         self.techniques_by_name = {}
+        self._terms = None
         
         self._load_data()
     
@@ -84,6 +87,7 @@ class KnowledgeBase:
     def _add_technique(self, technique: Dict[str, Any]):
         """Add a technique to the knowledge base."""
         self.techniques.append(technique)
+        self._terms = None
         
         # Index by category
         category = technique.get('category', 'general')
@@ -135,35 +139,52 @@ class KnowledgeBase:
         
         return conflicts
     
-    def get_relevant_techniques_for_code(self, code: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get techniques relevant to the given code."""
+    def _technique_terms(self) -> List[Dict[str, Any]]:
+        """Lowercased search terms per technique, computed once."""
+        if self._terms is None:
+            self._terms = []
+            for technique in self.techniques:
+                self._terms.append({
+                    'name_words': technique.get('name', '').lower().split(),
+                    'description_words': [
+                        word for word in technique.get('description', '').lower().split()
+                        if len(word) > 4
+                    ],
+                    'impl_lines': [
+                        line for line in technique.get('implementation_code', '').lower().split('\n')
+                        if len(line) > 10
+                    ],
+                    'framework': technique.get('framework', '').lower()
+                })
+        return self._terms
+    
+    def get_relevant_techniques_for_code(self, code: Union[str, SourceUnit], limit: int = 10) -> List[Dict[str, Any]]:
+        """Get techniques relevant to the given code (raw source or a SourceUnit)."""
         relevant = []
-        code_lower = code.lower()
+        unit = as_source_unit(code)
+        code_lower = unit.lower
         
         # Score techniques based on relevance
-        for technique in self.techniques:
+        for technique, terms in zip(self.techniques, self._technique_terms()):
             score = 0
             
             # Check if technique name or keywords appear in code
-            name = technique.get('name', '').lower()
-            if name and any(word in code_lower for word in name.split()):
+            if any(word in code_lower for word in terms['name_words']):
                 score += 3
             
             # Check description
-            description = technique.get('description', '').lower()
-            if description:
-                keyword_matches = sum(1 for word in description.split() if len(word) > 4 and word in code_lower)
+            if terms['description_words']:
+                keyword_matches = sum(1 for word in terms['description_words'] if word in code_lower)
                 score += min(keyword_matches * 0.5, 2)
             
             # Check implementation code similarity
-            impl_code = technique.get('implementation_code', '').lower()
-            if impl_code and any(line in code_lower for line in impl_code.split('\n') if len(line) > 10):
+            if any(line in code_lower for line in terms['impl_lines']):
                 score += 2
             
             # Framework match
-            framework = technique.get('framework', '').lower()
+            framework = terms['framework']
             if framework and framework != 'any':
-                if f'import {framework}' in code_lower or f'from {framework}' in code_lower:
+                if framework in unit.imports:
                     score += 1
             
             if score > 0:
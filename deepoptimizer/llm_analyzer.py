@@ -1,15 +1,26 @@
 """
 Gemini LLM integration for advanced ML code analysis.
 """
+import ast
+import inspect
 import os
-import json
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
 from pathlib import Path
 import google.generativeai as genai
 
 from .prompts import PromptBuilder
 from .knowledge_base import KnowledgeBase
+from .hedging import Hedger
+from .concurrency import ConcurrencyLimiter, DEFAULT_MAX_CONCURRENCY, INITIAL_CONCURRENCY
+from .cache import AnalysisCache, CodeSegment, split_segments, segment_for_line, encode_issue, decode_issue
+from .source import SourceUnit, as_source_unit
+from .issues import DetectedIssue
+from .response_parser import (
+    ISSUE_SCHEMA, TRIAGE_SCHEMA, IssueStreamParser, parse_issue_array, validate_area, validate_issue
+)
+from .timeouts import Deadline, AnalysisTimeout, iter_with_timeout, STREAM_STALL_TIMEOUT
 
 # Try to load .env file if it exists
 try:
@@ -25,44 +36,171 @@ except ImportError:
     pass
 
 
+class TokenUsage:
+    """Thread-safe running totals of tokens exchanged with Gemini (estimated from text length)."""
+    
+    CHARS_PER_TOKEN = 4
+    
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+    
+    def add(self, prompt: str, response: str):
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += len(prompt) // self.CHARS_PER_TOKEN
+            self.output_tokens += len(response) // self.CHARS_PER_TOKEN
+    
+    @property
+    def total(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+
+def _elide(lines: List[str], placeholders: Dict[int, Tuple[int, str]]) -> Tuple[str, List[Optional[int]]]:
+    """
+    Replace line ranges with one-line placeholders.
+    
+    Args:
+        lines: Source lines
+        placeholders: {first line: (last line, placeholder text)}, 1-based
+    
+    Returns:
+        Tuple of (shortened code, original line number for each line; None for placeholders)
+    """
+    kept_lines = []
+    line_map = []
+    line_no = 1
+    while line_no <= len(lines):
+        if line_no in placeholders:
+            end, placeholder = placeholders[line_no]
+            kept_lines.append(placeholder)
+            line_map.append(None)
+            line_no = end + 1
+        else:
+            kept_lines.append(lines[line_no - 1])
+            line_map.append(line_no)
+            line_no += 1
+    
+    return '\n'.join(kept_lines), line_map
+
+
+# Errors that mean the API is over quota or capacity
+_OVERLOAD_MARKERS = ('429', '503', 'resource exhausted', 'resourceexhausted', 'resource has been exhausted',
+                     'service unavailable', 'serviceunavailable')
+
+
+def _is_overload(error: Exception) -> bool:
+    """Whether a failed request was rejected for quota or capacity (429/503)."""
+    text = f"{type(error).__name__}: {error}".lower()
+    return any(marker in text for marker in _OVERLOAD_MARKERS)
+
+
+def _schema_output_supported() -> bool:
+    """Whether the installed SDK can constrain output to a JSON schema (older releases cannot)."""
+    try:
+        parameters = inspect.signature(genai.GenerationConfig).parameters
+    except (TypeError, ValueError):
+        return False
+    return 'response_mime_type' in parameters and 'response_schema' in parameters
+
+
 class GeminiAnalyzer:
     """Analyzes ML code using Gemini API with context-aware prompting."""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize Gemini client with API key."""
+    # Follow-up requests for the rest of an answer cut off at the output token limit
+    MAX_CONTINUATIONS = 2
+    
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[AnalysisCache] = None,
+                 timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 stall_timeout: Optional[float] = STREAM_STALL_TIMEOUT, triage: bool = False,
+                 adaptive_concurrency: bool = True, hedge_percentile: Optional[float] = None,
+                 hedge_budget: float = 0.05):
+        """
+        Initialize Gemini client with API key.
+        
+        Args:
+            api_key: Gemini API key (uses GEMINI_API_KEY env var if not provided)
+            cache: Optional persistent cache; unchanged definitions are served
+                from it and only changed ones are sent to Gemini
+            timeout: Seconds to wait for a single Gemini request (None for no limit)
+            max_concurrency: Maximum requests in flight at once per model across
+                threads (None: no limit, or DEFAULT_MAX_CONCURRENCY when adaptive)
+            stall_timeout: Seconds without streamed output, once output has
+                started, after which a request is abandoned and retried (None
+                for no limit)
+            triage: Screen code with the fast GEMINI_TRIAGE_MODEL first, and
+                send only flagged code to the deep model (code it clears is
+                never seen by the deep model)
+            adaptive_concurrency: Start below max_concurrency and adapt the
+                limit to 429/503 responses and latency (AIMD); otherwise
+                max_concurrency is a fixed limit
+            hedge_percentile: Send a duplicate of a request that has produced
+                no output after this percentile of observed latency, and use
+                whichever answers first (None: no hedging)
+            hedge_budget: Maximum duplicate requests as a fraction of requests
+        """
         self.api_key = api_key or os.environ.get('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("Gemini API key required. Set GEMINI_API_KEY environment variable or pass api_key parameter.")
         
         genai.configure(api_key=self.api_key)
+        self.model_name = os.environ.get('GEMINI_MODEL', 'gemini-2.5-pro')
+        self.triage_model = os.environ.get('GEMINI_TRIAGE_MODEL', 'gemini-2.5-flash') if triage else None
+        if self.triage_model == self.model_name:
+            self.triage_model = None
+        # Screened files: cleared (never sent to the deep model), flagged, or screening failed
+        self.triage_counts = {'screened': 0, 'cleared': 0, 'flagged': 0, 'failed': 0}
+        self._triage_lock = threading.Lock()
+        # Schema-constrained JSON when the SDK supports it, otherwise prompt-guided JSON
+        self.structured_output = _schema_output_supported()
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.max_concurrency = max_concurrency
+        self.adaptive_concurrency = adaptive_concurrency
+        # One limiter per model: quotas are per model and latencies differ
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.hedger = Hedger(hedge_percentile, hedge_budget) if hedge_percentile is not None else None
+        self.usage = TokenUsage()
         self.knowledge_base = KnowledgeBase()
         self.prompt_builder = PromptBuilder(self.knowledge_base)
+        
+        self.cache = cache
+        if self.cache is not None and not self.cache.namespace:
+            # Screened-clean results depend on the triage model too
+            self.cache.namespace = self.model_name + (f"+triage:{self.triage_model}" if self.triage_model else '')
     
-    def analyze(self, code: str, file_path: str = None, project_context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def analyze(self, code: Union[str, SourceUnit], file_path: str = None,
+                project_context: Dict[str, Any] = None,
+                deadline: Optional[Deadline] = None,
+                on_issue: Optional[Callable[[DetectedIssue], None]] = None) -> List[Dict[str, Any]]:
         """
         Analyze code for ML-specific issues using Gemini.
         
         Args:
-            code: Python code to analyze
+            code: Python code to analyze (raw source or a shared SourceUnit)
             file_path: Path to the file being analyzed
             project_context: Additional context (framework, hardware, etc.)
+            deadline: Stops waiting for Gemini (and retrying) once it expires
+            on_issue: Called with each issue as soon as it has streamed in
+                (line numbers are those of the code that was sent)
             
         Returns:
             List of detected issues with severity, suggestions, etc.
         """
-        # Build context-aware prompt
-        prompt = self.prompt_builder.build_analysis_prompt(
-            code=code,
-            file_path=file_path,
-            project_context=project_context or {}
-        )
+        unit = as_source_unit(code, file_path)
         
         try:
-            # Call Gemini with structured output
-            response = self._generate_analysis(prompt)
+            segments = None
+            if self.cache is not None and unit.tree is not None:
+                segments = split_segments(unit.code, unit.tree, getattr(unit, 'cells', None))
             
-            # Parse and validate response
-            issues = self._parse_response(response)
+            if segments is None:
+                issues, _ = self._run_analysis(unit.code, file_path, project_context, unit, deadline, on_issue)
+            else:
+                issues = self._analyze_with_cache(unit, segments, file_path, project_context, deadline, on_issue)
             
             # Add file path to all issues
             if file_path:
@@ -71,100 +209,404 @@ class GeminiAnalyzer:
             
             return issues
             
+        except AnalysisTimeout as e:
+            return [DetectedIssue(
+                severity='warning',
+                category='analysis_error',
+                title='LLM Analysis Timed Out',
+                description=f'Gemini analysis did not finish in time: {str(e)}',
+                file=file_path,
+                suggestion='Rule-based results are still reported. Raise --file-timeout/--timeout or use --no-llm',
+                confidence=1.0
+            )]
         except Exception as e:
             # Return error as an issue so it's visible to user
-            return [{
-                'severity': 'error',
-                'category': 'analysis_error',
-                'title': 'LLM Analysis Failed',
-                'description': f'Failed to analyze code with Gemini: {str(e)}',
-                'file': file_path,
-                'suggestion': 'For larger files, try: 1) --no-llm flag, 2) AI Studio: https://aistudio.google.com, 3) smaller code portions',
-                'confidence': 1.0
-            }]
+            return [DetectedIssue(
+                severity='error',
+                category='analysis_error',
+                title='LLM Analysis Failed',
+                description=f'Failed to analyze code with Gemini: {str(e)}',
+                file=file_path,
+                suggestion='For larger files, try: 1) --no-llm flag, 2) AI Studio: https://aistudio.google.com, 3) smaller code portions',
+                confidence=1.0
+            )]
+    
+    def _run_analysis(self, code: str, file_path: str = None,
+                      project_context: Dict[str, Any] = None,
+                      source: Optional[SourceUnit] = None,
+                      deadline: Optional[Deadline] = None,
+                      on_issue: Optional[Callable[[DetectedIssue], None]] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Prompt Gemini with the code and parse the result. Returns (issues, parsed_cleanly)."""
+        # Cascade: the fast model screens the code, the deep model only sees what it flags
+        line_map = None
+        if self.triage_model:
+            areas = self._triage(code, file_path, deadline)
+            if areas == []:
+                return [], True
+            if areas:
+                focused = self._focus_code(code, areas)
+                if focused is not None:
+                    code, line_map = focused
+                project_context = {
+                    **(project_context or {}),
+                    'triage_notes': [area['reason'] for area in areas if area['reason']]
+                }
+        
+        # Build context-aware prompt
+        prompt = self.prompt_builder.build_analysis_prompt(
+            code=code,
+            file_path=file_path,
+            project_context=project_context or {},
+            source=source
+        )
+        
+        # Stream the response; issues are parsed as they arrive
+        response, issues, status = self._generate_analysis(prompt, deadline, on_issue)
+        self.usage.add(prompt, response)
+        
+        # Cut off at the output token limit: keep what arrived and ask for the rest
+        continuations = 0
+        while status == 'truncated' and continuations < self.MAX_CONTINUATIONS:
+            continuations += 1
+            continuation = self.prompt_builder.build_continuation_prompt(prompt, issues)
+            more_text, more, status = self._generate_analysis(continuation, deadline, on_issue)
+            self.usage.add(continuation, more_text)
+            
+            seen = {(issue.get('title'), tuple(issue.get('line_numbers') or ())) for issue in issues}
+            issues.extend(
+                issue for issue in more
+                if (issue.get('title'), tuple(issue.get('line_numbers') or ())) not in seen
+            )
+        
+        if status == 'complete':
+            result = issues, True
+        elif issues or self.structured_output:
+            # Keep the issues that did come through, but don't cache an incomplete answer
+            result = issues, False
+        else:
+            # Prose instead of JSON (only possible without schema-constrained output)
+            result = self._parse_response_with_status(response)
+        
+        if line_map is not None:
+            # Map line numbers from the focused code back onto the code given
+            for issue in result[0]:
+                issue['line_numbers'] = [
+                    line_map[line - 1] for line in issue.get('line_numbers') or []
+                    if isinstance(line, int) and 0 < line <= len(line_map) and line_map[line - 1]
+                ]
+        return result
+    
+    def _analyze_with_cache(self, unit: SourceUnit, segments: List[CodeSegment], file_path: str = None,
+                            project_context: Dict[str, Any] = None,
+                            deadline: Optional[Deadline] = None,
+                            on_issue: Optional[Callable[[DetectedIssue], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze code, reusing cached results for unchanged definitions.
+        
+        Module-level statements are always sent along as context, so Gemini is
+        only called when at least one definition (or the module code) changed.
+        Issues that no segment owns (whole-file findings without a line) are
+        cached for the file as a whole.
+        """
+        # Cross-file context is part of the prompt, so it is part of the key
+        context = (project_context or {}).get('symbol_context', '')
+        keys = [self.cache.key(segment, context) for segment in segments]
+        cached = [self.cache.get(key) for key in keys]
+        file_key = self.cache.file_key(segments, context)
+        file_cached = self.cache.get(file_key)
+        module = segments[-1]
+        
+        # Everything unchanged - no API call needed
+        if file_cached is not None and all(entry is not None for entry in cached):
+            issues = [
+                decode_issue(stored, segment)
+                for segment, entry in zip(segments, cached)
+                for stored in entry
+            ]
+            issues.extend(decode_issue(stored, module) for stored in file_cached)
+            return issues
+        
+        sent = {
+            index for index, (segment, entry) in enumerate(zip(segments, cached))
+            if entry is None or segment.kind == 'module'
+        }
+        
+        if len(sent) == len(segments):
+            issues, parsed_ok = self._run_analysis(unit.code, file_path, project_context, unit, deadline, on_issue)
+        else:
+            partial_code, line_map = self._build_partial_code(unit, segments, sent)
+            issues, parsed_ok = self._run_analysis(partial_code, file_path, project_context, unit, deadline, on_issue)
+            
+            # Map line numbers from the partial code back onto the original file
+            for issue in issues:
+                issue['line_numbers'] = [
+                    line_map[line - 1] for line in issue.get('line_numbers') or []
+                    if isinstance(line, int) and 0 < line <= len(line_map) and line_map[line - 1]
+                ]
+        
+        # Attribute fresh issues to the segment that owns their first line;
+        # the rest belong to this version of the file only
+        by_segment = {index: [] for index in sent}
+        file_issues = []
+        for issue in issues:
+            lines = issue.get('line_numbers') or []
+            segment = segment_for_line(segments, lines[0] if lines else None)
+            index = segments.index(segment)
+            if lines and index in sent and segment.contains(lines[0]):
+                by_segment[index].append(issue)
+            else:
+                file_issues.append(issue)
+        
+        # Don't persist heuristic fallback results from an unparseable response
+        if parsed_ok:
+            for index, segment_issues in by_segment.items():
+                self.cache.set(keys[index], [encode_issue(i, segments[index]) for i in segment_issues])
+            self.cache.set(file_key, [encode_issue(i, module) for i in file_issues])
+        
+        for index, (segment, entry) in enumerate(zip(segments, cached)):
+            if index not in sent:
+                issues.extend(decode_issue(stored, segment) for stored in entry)
+        
+        return issues
+    
+    def _build_partial_code(self, unit: SourceUnit, segments: List[CodeSegment],
+                            sent: set) -> Tuple[str, List[Optional[int]]]:
+        """
+        Replace cached definitions with one-line placeholders.
+        
+        Returns:
+            Tuple of (partial code, original line number for each partial line)
+        """
+        placeholders = {}
+        for index, segment in enumerate(segments):
+            if index not in sent and (segment.extent or segment.lines):
+                start, end = segment.extent or segment.lines[0]
+                placeholders[start] = (end, f"# {segment.kind} {segment.name}: unchanged, analysis cached (omitted)")
+        
+        return _elide(unit.lines, placeholders)
     
-    def _generate_analysis(self, prompt: str) -> str:
-        """Generate analysis using Gemini API with retry logic."""
+    def _triage(self, code: str, file_path: str = None,
+                deadline: Optional[Deadline] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Screen code with the fast triage model.
+        
+        Returns:
+            Regions needing a deep review ([] if none), or None if the triage
+            request failed or its answer was incomplete
+        """
+        prompt = self.prompt_builder.build_triage_prompt(code, file_path)
+        try:
+            response, areas, status = self._generate_analysis(
+                prompt, deadline, model_name=self.triage_model, schema=TRIAGE_SCHEMA,
+                accept=validate_area, temperature=0.0, max_output_tokens=2048, max_retries=1
+            )
+        except AnalysisTimeout:
+            raise
+        except Exception:
+            # Screening is an optimization; without it the deep model sees everything
+            areas = None
+        else:
+            self.usage.add(prompt, response)
+            if status != 'complete':
+                areas = None
+        
+        with self._triage_lock:
+            self.triage_counts['screened'] += 1
+            self.triage_counts['failed' if areas is None else 'flagged' if areas else 'cleared'] += 1
+        return areas
+    
+    def triage_stats(self) -> Dict[str, Any]:
+        """The triage model and how many files it screened, cleared, flagged or failed to screen."""
+        with self._triage_lock:
+            return {'model': self.triage_model, **self.triage_counts}
+    
+    def _focus_code(self, code: str, areas: List[Dict[str, Any]]) -> Optional[Tuple[str, List[Optional[int]]]]:
+        """
+        Omit top-level statements that no triage area touches (imports are kept).
+        
+        Returns:
+            Tuple of (focused code, original line number for each line), or
+            None if nothing can be omitted or the code does not parse
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+        
+        placeholders = {}
+        run = None
+        for node in tree.body:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+            end = getattr(node, 'end_lineno', None) or node.lineno
+            flagged = any(area['start_line'] <= end and start <= area['end_line'] for area in areas)
+            if flagged or isinstance(node, (ast.Import, ast.ImportFrom)):
+                if run is not None:
+                    placeholders[run[0]] = (run[1], f"# lines {run[0]}-{run[1]}: screened, nothing flagged (omitted)")
+                    run = None
+            else:
+                run = (run[0] if run is not None else start, end)
+        if run is not None:
+            placeholders[run[0]] = (run[1], f"# lines {run[0]}-{run[1]}: screened, nothing flagged (omitted)")
+        
+        if not placeholders:
+            return None
+        return _elide(code.split('\n'), placeholders)
+    
+    def limiter(self, model_name: Optional[str] = None) -> Optional[ConcurrencyLimiter]:
+        """The concurrency limiter for a model (default: the deep model); None if unlimited."""
+        if not self.adaptive_concurrency and not self.max_concurrency:
+            return None
+        model_name = model_name or self.model_name
+        with self._limiters_lock:
+            limiter = self._limiters.get(model_name)
+            if limiter is None:
+                if self.adaptive_concurrency:
+                    maximum = self.max_concurrency or DEFAULT_MAX_CONCURRENCY
+                    limiter = ConcurrencyLimiter(INITIAL_CONCURRENCY, maximum=maximum)
+                else:
+                    limiter = ConcurrencyLimiter(self.max_concurrency, maximum=self.max_concurrency,
+                                                 adaptive=False)
+                self._limiters[model_name] = limiter
+            return limiter
+    
+    def concurrency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Limiter state per model that has been called."""
+        with self._limiters_lock:
+            limiters = dict(self._limiters)
+        return {model_name: limiter.stats() for model_name, limiter in limiters.items()}
+    
+    def _generate_analysis(self, prompt: str, deadline: Optional[Deadline] = None,
+                           on_issue: Optional[Callable[[Any], None]] = None, *,
+                           model_name: Optional[str] = None, schema: Dict[str, Any] = ISSUE_SCHEMA,
+                           accept: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                           temperature: float = 0.3, max_output_tokens: int = 32768,
+                           max_retries: int = 3) -> Tuple[str, List[Any], str]:
+        """
+        Generate analysis using Gemini API with retry logic.
+        
+        Output is constrained to ``schema`` when the SDK supports it. The
+        response is streamed: each item is validated and passed to
+        ``on_issue`` as soon as its JSON object is complete, and the stream is
+        dropped once the array closes. Each request is bounded by
+        ``self.timeout`` and abandoned when its output stops for
+        ``self.stall_timeout``; the deadline bounds the whole call including
+        retries and the delays between them. Each request holds a slot of the
+        model's limiter, which adapts to 429/503s and time to first output.
+        With hedging on, a request still silent after the model's latency
+        percentile is duplicated, if a limiter slot is free for the copy, and
+        the first to answer is used.
+        
+        The keyword arguments select another model and item type (default:
+        the deep model returning issues, validated by _clean_issue).
+        
+        Returns:
+            Tuple of (response text, valid items, status): 'complete' when the
+            array closed, 'truncated' when it was cut off at the output
+            token limit, otherwise 'incomplete'
+        """
         import time
         
-        # Get model from environment or use default
-        model_name = os.environ.get('GEMINI_MODEL', 'gemini-2.5-pro')
+        model_name = model_name or self.model_name
+        accept = accept or self._clean_issue
         model = genai.GenerativeModel(model_name)
         
         # Configure generation parameters
-        generation_config = genai.GenerationConfig(
-            temperature=0.3,
+        generation_options = dict(
+            temperature=temperature,
             top_p=0.9,
-            max_output_tokens=32768,  # More conservative limit to avoid errors
+            max_output_tokens=max_output_tokens,  # 32768 by default: more conservative limit to avoid errors
         )
+        if self.structured_output:
+            generation_options.update(response_mime_type='application/json', response_schema=schema)
+        generation_config = genai.GenerationConfig(**generation_options)
         
         # Retry configuration
-        max_retries = 3
         retry_delays = [30, 60, 120]  # Longer delays: 30s, 1min, 2min between retries
         
         last_error = None
         
         for attempt in range(max_retries):
+            if deadline is not None:
+                deadline.check()
+            
             try:
                 # Log retry attempt if not first
                 if attempt > 0:
                     import sys
                     print(f"Retry attempt {attempt + 1}/{max_retries} after {retry_delays[attempt-1]}s delay...", file=sys.stderr)
-                elif attempt == 0:
+                elif model_name == self.model_name:
                     import sys
                     print(f"Calling Gemini API (be patient, this may take several minutes for large files)...", file=sys.stderr)
                 
-                # API call (Gemini will handle its own timeouts)
-                response = model.generate_content(
-                    prompt,
-                    generation_config=generation_config
-                )
-                
-                # Check if response was blocked
-                if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
-                    if hasattr(response.prompt_feedback, 'block_reason') and response.prompt_feedback.block_reason:
-                        raise Exception(f"Response blocked: {response.prompt_feedback.block_reason}")
+                # Streamed API call, abandoned after the request timeout, on a stall or at the deadline
+                parser = IssueStreamParser()
+                issues = []
+                finish_reason = ''
+                limiter = self.limiter(model_name)
+                ticket = limiter.acquire(deadline) if limiter is not None else 0
+                started = time.monotonic()
+                first_output = None
+                overloaded = False
+                hedge_after = record_latency = None
+                hedge_slot = []  # Limiter ticket of the duplicate request, while it holds one
                 
-                # Handle multi-part responses
-                try:
-                    # Try simple text accessor first
-                    return response.text
-                except Exception as e:
-                    # If that fails, try accessing parts
-                    pass
+                def release_hedge_slot():
+                    if hedge_slot:
+                        limiter.release(hedge_slot.pop())
                 
-                # Try accessing via candidates
-                if hasattr(response, 'candidates') and response.candidates:
-                    candidate = response.candidates[0]
-                    
-                    # Check finish reason
-                    if hasattr(candidate, 'finish_reason'):
-                        finish_reason = str(candidate.finish_reason)
-                        if 'SAFETY' in finish_reason:
-                            raise Exception("Content generation stopped for safety reasons")
-                        elif 'MAX_TOKENS' in finish_reason:
-                            # This is expected with our limit, just continue
-                            pass
+                if self.hedger is not None:
+                    self.hedger.requested()
+                    hedge_after = self.hedger.delay(model_name)
                     
-                    if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                        text_parts = []
-                        for part in candidate.content.parts:
-                            if hasattr(part, 'text'):
-                                text_parts.append(part.text)
-                        if text_parts:
-                            return ' '.join(text_parts)
+                    def record_latency(hedged, latency):
+                        # The losing copy has been stopped: its slot is free again
+                        release_hedge_slot()
+                        self.hedger.record(model_name, latency, hedged)
                 
-                # Try direct parts access
-                if hasattr(response, 'parts'):
-                    text_parts = []
-                    for part in response.parts:
-                        if hasattr(part, 'text'):
-                            text_parts.append(part.text)
-                    if text_parts:
-                        return ' '.join(text_parts)
+                stream = iter_with_timeout(
+                    lambda: model.generate_content(prompt, generation_config=generation_config, stream=True),
+                    timeout=self.timeout,
+                    stall_timeout=self.stall_timeout,
+                    deadline=deadline,
+                    hedge_after=hedge_after,
+                    may_hedge=lambda: self._start_hedge(prompt, limiter, hedge_slot),
+                    on_first_item=record_latency
+                )
+                try:
+                    for chunk in stream:
+                        if first_output is None:
+                            first_output = time.monotonic() - started
+                        finish_reason = self._finish_reason(chunk) or finish_reason
+                        for issue in parser.feed(self._chunk_text(chunk)):
+                            issue = accept(issue)
+                            if issue is not None:
+                                issues.append(issue)
+                                if on_issue is not None:
+                                    on_issue(issue)
+                        if parser.done:
+                            # Anything after the array is commentary
+                            break
+                except Exception as e:
+                    overloaded = _is_overload(e)
+                    raise
+                finally:
+                    stream.close()
+                    release_hedge_slot()
+                    if limiter is not None:
+                        # Time to first output reflects queueing at the API, whatever the answer's length
+                        limiter.release(ticket, first_output, overloaded)
                 
-                raise Exception("Unable to extract text from Gemini response")
+                response = parser.text
+                if not response.strip():
+                    raise Exception("Unable to extract text from Gemini response")
+                if parser.done:
+                    return response, issues, 'complete'
+                if finish_reason == 'MAX_TOKENS' and parser.started:
+                    return response, issues, 'truncated'
+                return response, issues, 'incomplete'
                 
+            except AnalysisTimeout:
+                raise
             except Exception as e:
                 last_error = e
                 error_str = str(e)
@@ -180,8 +622,11 @@ class GeminiAnalyzer:
                 is_retryable = any(err in error_str for err in retryable_errors)
                 
                 if is_retryable and attempt < max_retries - 1:
-                    # Wait before retry
-                    time.sleep(retry_delays[attempt])
+                    # Wait before retry (cut short if the deadline expires)
+                    if deadline is None:
+                        time.sleep(retry_delays[attempt])
+                    elif not deadline.sleep(retry_delays[attempt]):
+                        deadline.check()
                     continue
                 else:
                     # Non-retryable error or last attempt
@@ -190,64 +635,92 @@ class GeminiAnalyzer:
         # All retries failed
         raise Exception(f"Gemini API error after {max_retries} attempts: {str(last_error)}")
     
-    def _parse_response(self, response: str) -> List[Dict[str, Any]]:
-        """Parse and validate Gemini's JSON response."""
-        try:
-            # First try to extract JSON between tags
-            json_match = re.search(r'<json>\s*(.*?)\s*</json>', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                issues = json.loads(json_str)
-            else:
-                # Fall back to extracting JSON array
-                json_match = re.search(r'\[.*\]', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                    issues = json.loads(json_str)
-                else:
-                    # Try parsing the whole response as JSON
-                    issues = json.loads(response)
-            
-            # Validate and clean up each issue
-            validated_issues = []
-            for issue in issues:
-                if self._validate_issue(issue):
-                    validated_issues.append(self._clean_issue(issue))
+    def _start_hedge(self, prompt: str, limiter: Optional[ConcurrencyLimiter], hedge_slot: List[int]) -> bool:
+        """
+        Whether a duplicate request may be sent; counts its prompt tokens.
+        
+        The duplicate needs a free slot of the model's limiter, taken without
+        waiting (its ticket goes to ``hedge_slot``), and room in the budget.
+        """
+        ticket = None
+        if limiter is not None:
+            ticket = limiter.try_acquire()
+            if ticket is None:
+                self.hedger.skip()
+                return False
+        if not self.hedger.try_hedge():
+            if ticket is not None:
+                limiter.release(ticket)
+            return False
+        if ticket is not None:
+            hedge_slot.append(ticket)
+        self.usage.add(prompt, '')
+        return True
+    
+    def _finish_reason(self, chunk: Any) -> str:
+        """Name of a chunk's finish reason ('' while the response is still going)."""
+        candidates = getattr(chunk, 'candidates', None)
+        reason = getattr(candidates[0], 'finish_reason', None) if candidates else None
+        if not reason:
+            return ''
+        # Enum members stringify as their value on Python 3.11+, so prefer the name
+        return str(getattr(reason, 'name', reason)).rsplit('.', 1)[-1]
+    
+    def _chunk_text(self, chunk: Any) -> str:
+        """Text of one streamed response chunk ('' if it carries none)."""
+        # Check if response was blocked
+        if hasattr(chunk, 'prompt_feedback') and chunk.prompt_feedback:
+            if hasattr(chunk.prompt_feedback, 'block_reason') and chunk.prompt_feedback.block_reason:
+                raise Exception(f"Response blocked: {chunk.prompt_feedback.block_reason}")
+        
+        if hasattr(chunk, 'candidates') and chunk.candidates:
+            candidate = chunk.candidates[0]
             
-            return validated_issues
+            # Check finish reason
+            if self._finish_reason(chunk) == 'SAFETY':
+                raise Exception("Content generation stopped for safety reasons")
             
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, try to extract useful information
-            # Log the parsing error for debugging
-            import sys
-            print(f"JSON parsing error: {e}", file=sys.stderr)
-            print(f"Response excerpt: {response[:500]}...", file=sys.stderr)
-            return self._fallback_parse(response)
+            if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
+                return ''.join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
+            return ''
+        
+        # Try simple text accessor
+        try:
+            return chunk.text or ''
+        except Exception:
+            return ''
     
-    def _validate_issue(self, issue: Dict[str, Any]) -> bool:
-        """Validate that an issue has required fields."""
-        required_fields = ['severity', 'title', 'description']
-        return all(field in issue for field in required_fields)
+    def _parse_response(self, response: str) -> List[Dict[str, Any]]:
+        """Parse and validate Gemini's JSON response."""
+        issues, _ = self._parse_response_with_status(response)
+        return issues
     
-    def _clean_issue(self, issue: Dict[str, Any]) -> Dict[str, Any]:
-        """Clean and standardize issue format."""
-        # Ensure severity is valid
-        valid_severities = ['error', 'warning', 'info']
-        if issue.get('severity', '').lower() not in valid_severities:
-            issue['severity'] = 'info'
-        else:
-            issue['severity'] = issue['severity'].lower()
+    def _parse_response_with_status(self, response: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """Parse Gemini's response. Returns (issues, False if the fallback parser was used)."""
+        issues = parse_issue_array(response)
+        if issues is None:
+            # No complete JSON array - try to extract useful information
+            import sys
+            print("JSON parsing error: no complete issue array in response", file=sys.stderr)
+            print(f"Response excerpt: {response[:500]}...", file=sys.stderr)
+            return self._fallback_parse(response), False
         
-        # Set defaults for optional fields
-        issue.setdefault('category', 'general')
-        issue.setdefault('confidence', 0.8)
-        issue.setdefault('line_numbers', [])
-        issue.setdefault('references', [])
+        # Validate and clean up each issue
+        validated_issues = []
+        for issue in issues:
+            issue = self._clean_issue(issue)
+            if issue is not None:
+                validated_issues.append(issue)
         
-        return issue
+        return validated_issues, True
+    
+    def _clean_issue(self, issue: Dict[str, Any]) -> Optional[DetectedIssue]:
+        """Validate an issue against the response schema (None if it doesn't fit)."""
+        issue = validate_issue(issue)
+        return DetectedIssue.from_dict(issue) if issue is not None else None
     
     def _fallback_parse(self, response: str) -> List[Dict[str, Any]]:
-        """Fallback parser if JSON parsing fails."""
+        """Fallback parser for prose responses (SDKs without schema-constrained output)."""
         # Try to extract issues from text format
         issues = []
         
@@ -261,23 +734,23 @@ class GeminiAnalyzer:
         for pattern, severity in patterns:
             matches = re.findall(pattern, response, re.MULTILINE)
             for match in matches:
-                issues.append({
-                    'severity': severity,
-                    'title': match.strip()[:100],  # First 100 chars as title
-                    'description': match.strip(),
-                    'category': 'general',
-                    'confidence': 0.6  # Lower confidence for fallback parsing
-                })
+                issues.append(DetectedIssue(
+                    severity=severity,
+                    title=match.strip()[:100],  # First 100 chars as title
+                    description=match.strip(),
+                    category='general',
+                    confidence=0.6  # Lower confidence for fallback parsing
+                ))
         
         if not issues:
             # If no patterns found, return the whole response as info
-            issues.append({
-                'severity': 'info',
-                'title': 'Analysis Notes',
-                'description': response.strip(),
-                'category': 'general',
-                'confidence': 0.5
-            })
+            issues.append(DetectedIssue(
+                severity='info',
+                title='Analysis Notes',
+                description=response.strip(),
+                category='general',
+                confidence=0.5
+            ))
         
         return issues
     
@@ -292,25 +765,19 @@ class GeminiAnalyzer:
         Returns:
             Dictionary with project-wide analysis results
         """
-        from pathlib import Path
-        import glob
+        from .discovery import discover_files
         
         project_path = Path(project_path)
         if not project_path.exists():
             raise ValueError(f"Project path does not exist: {project_path}")
         
-        # Default patterns
-        if file_patterns is None:
-            file_patterns = ['**/*.py']
-        
-        # Collect all files
-        all_files = []
-        for pattern in file_patterns:
-            all_files.extend(project_path.glob(pattern))
-        
-        # Filter out common non-source files
-        excluded_dirs = {'__pycache__', '.git', 'venv', 'env', '.env', 'node_modules'}
-        all_files = [f for f in all_files if not any(excluded in f.parts for excluded in excluded_dirs)]
+        # Collect all files, skipping common non-source directories
+        excluded_dirs = ['__pycache__', '.git', 'venv', 'env', '.env', 'node_modules']
+        all_files = discover_files(
+            project_path,
+            include_patterns=file_patterns,
+            exclude_patterns=[f'**/{d}/**' for d in excluded_dirs]
+        )
         
         # Analyze each file
         results = {
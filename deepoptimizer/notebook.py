@@ -0,0 +1,266 @@
+"""
+Jupyter notebook (.ipynb) support.
+
+Code cells are pulled out of the notebook JSON with a streaming scanner that
+only decodes ``cell_type`` and ``source`` values; outputs (often megabytes of
+base64 images) are skipped without being parsed. The cells are joined into
+one program, with a ``# %% [cell N]`` marker line before each cell, that the
+rule engine and the LLM analyze as a whole. Issues are then mapped back to
+the cell and the line within it.
+"""
+import bisect
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .source import SourceUnit
+
+NOTEBOOK_SUFFIX = '.ipynb'
+
+# One JSON token: a string, a structural character, or a literal (number, true, ...)
+_TOKEN = re.compile(rb'\s*(?:("[^"\\]*(?:\\.[^"\\]*)*")|([\[\]{},:])|([^\s\[\]{},:"]+))', re.DOTALL)
+
+# Cell magics whose body is still Python
+_PYTHON_CELL_MAGICS = frozenset({'time', 'timeit', 'capture', 'prun', 'debug'})
+
+
+@dataclass
+class NotebookCell:
+    """A code cell and where it sits in the combined program."""
+    index: int        # Position among all notebook cells, 1-based
+    source: str       # Cell source with IPython magics neutralized
+    start_line: int   # First line of the cell in the combined program
+    end_line: int     # Last line (start_line - 1 for an empty cell)
+
+
+class _Scanner:
+    """Walks JSON tokens over bytes or an mmap without building the document."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self._peeked: Optional[Tuple[bytes, int, int]] = None
+
+    def next(self) -> Tuple[bytes, int, int]:
+        """Next token as (kind, start, end); kind is b'"', a structural char or b'lit'."""
+        if self._peeked is not None:
+            token, self._peeked = self._peeked, None
+            return token
+        match = _TOKEN.match(self.data, self.pos)
+        if match is None:
+            raise ValueError(f'Invalid notebook JSON at byte {self.pos}')
+        self.pos = match.end()
+        if match.group(1) is not None:
+            return b'"', match.start(1), match.end(1)
+        if match.group(2) is not None:
+            return match.group(2), match.start(2), match.end(2)
+        return b'lit', match.start(3), match.end(3)
+
+    def peek(self) -> Tuple[bytes, int, int]:
+        if self._peeked is None:
+            self._peeked = self.next()
+        return self._peeked
+
+    def expect(self, kind: bytes) -> Tuple[bytes, int, int]:
+        token = self.next()
+        if token[0] != kind:
+            raise ValueError(f'Invalid notebook JSON at byte {token[1]}: expected {kind.decode()}')
+        return token
+
+    def value_span(self) -> Tuple[int, int]:
+        """Skip one value, returning its byte span."""
+        kind, start, end = self.next()
+        if kind in (b'{', b'['):
+            depth = 1
+            while depth:
+                kind, _, end = self.next()
+                if kind in (b'{', b'['):
+                    depth += 1
+                elif kind in (b'}', b']'):
+                    depth -= 1
+        return start, end
+
+    def value(self) -> Any:
+        start, end = self.value_span()
+        return json.loads(bytes(self.data[start:end]))
+
+    def members(self) -> Iterator[bytes]:
+        """Iterate an object's raw keys; the caller consumes each value."""
+        self.expect(b'{')
+        if self.peek()[0] == b'}':
+            self.next()
+            return
+        while True:
+            _, start, end = self.expect(b'"')
+            self.expect(b':')
+            yield bytes(self.data[start + 1:end - 1])
+            kind = self.next()[0]
+            if kind == b'}':
+                return
+            if kind != b',':
+                raise ValueError('Invalid notebook JSON: expected , or }')
+
+    def items(self) -> Iterator[None]:
+        """Iterate an array; the caller consumes each element."""
+        self.expect(b'[')
+        if self.peek()[0] == b']':
+            self.next()
+            return
+        while True:
+            yield None
+            kind = self.next()[0]
+            if kind == b']':
+                return
+            if kind != b',':
+                raise ValueError('Invalid notebook JSON: expected , or ]')
+
+
+def iter_cells(data) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (cell_type, source) pairs out of nbformat 4 notebook JSON.
+
+    Args:
+        data: Notebook file contents (bytes or an mmap)
+
+    Raises:
+        ValueError: If the JSON is malformed or has no 'cells' list
+    """
+    scanner = _Scanner(data)
+    found = False
+    for key in scanner.members():
+        if key != b'cells':
+            scanner.value_span()
+            continue
+        found = True
+        for _ in scanner.items():
+            cell_type, source = None, ''
+            for cell_key in scanner.members():
+                if cell_key == b'cell_type':
+                    cell_type = scanner.value()
+                elif cell_key == b'source':
+                    source = scanner.value()
+                else:
+                    scanner.value_span()
+            yield cell_type, ''.join(source) if isinstance(source, list) else source
+    if not found:
+        raise ValueError("Not an nbformat 4 notebook (no 'cells' list)")
+
+
+def neutralize_magics(source: str) -> str:
+    """
+    Make IPython syntax parseable without changing line numbers.
+
+    Line magics and shell escapes (``%pip``, ``!ls``) become ``pass`` with the
+    original line as a comment; cells under a non-Python cell magic
+    (``%%bash``) are commented out entirely.
+    """
+    lines = source.split('\n')
+    stripped = lines[0].lstrip()
+    if stripped.startswith('%%'):
+        magic = stripped[2:].split(None, 1)[0] if stripped[2:].strip() else ''
+        if magic not in _PYTHON_CELL_MAGICS:
+            return '\n'.join('# ' + line for line in lines)
+        lines[0] = '# ' + lines[0]
+        start = 1
+    else:
+        start = 0
+
+    for i in range(start, len(lines)):
+        line = lines[i]
+        body = line.lstrip()
+        if body.startswith(('%', '!')):
+            indent = line[:len(line) - len(body)]
+            lines[i] = f'{indent}pass  # {body}'
+    return '\n'.join(lines)
+
+
+def build_program(cells: Iterator[Tuple[str, str]]) -> Tuple[str, List[NotebookCell]]:
+    """
+    Join the code cells of a notebook into one program.
+
+    Returns:
+        Tuple of (program code, code cells with their line ranges)
+    """
+    parts = []
+    code_cells = []
+    line = 1
+    for index, (cell_type, source) in enumerate(cells, 1):
+        if cell_type != 'code':
+            continue
+        source = neutralize_magics(source.rstrip('\n'))
+        count = source.count('\n') + 1 if source else 0
+        parts.append(f'# %% [cell {index}]')
+        if source:
+            parts.append(source)
+        code_cells.append(NotebookCell(index, source, line + 1, line + count))
+        line += count + 1
+    return '\n'.join(parts) + '\n' if parts else '', code_cells
+
+
+class NotebookUnit(SourceUnit):
+    """SourceUnit over a notebook's combined program, with its cell layout."""
+
+    def __init__(self, code: str, file_path: Optional[str], cells: List[NotebookCell]):
+        """
+        Initialize a notebook unit.
+
+        Args:
+            code: Combined program (see build_program)
+            file_path: Notebook path
+            cells: Code cells with their line ranges in the program
+        """
+        super().__init__(code, file_path)
+        self.cells = cells
+
+
+def _locate(cells: List[NotebookCell], starts: List[int], line: int) -> Tuple[NotebookCell, int]:
+    """Map a program line to (cell, 1-based line within the cell); a marker line maps to its cell."""
+    position = bisect.bisect_right(starts, line) - 1
+    if position < 0:
+        return cells[0], 1
+    cell = cells[position]
+    if line > cell.end_line:
+        if position + 1 < len(cells):
+            return cells[position + 1], 1
+        return cell, max(1, cell.end_line - cell.start_line + 1)
+    return cell, line - cell.start_line + 1
+
+
+def locate_issues(cells: List[NotebookCell], issues: List[Any]):
+    """
+    Rewrite issue locations from program lines to cells, in place.
+
+    Each issue gets the index of the cell its first line falls in, and its
+    line numbers become relative to that cell. Issues that already have a
+    cell are left alone.
+    """
+    if not cells:
+        return
+    starts = [cell.start_line for cell in cells]
+    for issue in issues:
+        lines = [line for line in issue.get('line_numbers') or [] if isinstance(line, int)]
+        if not lines or issue.get('cell') is not None:
+            continue
+        located = [_locate(cells, starts, line) for line in lines]
+        cell = located[0][0]
+        issue['cell'] = cell.index
+        issue['line_numbers'] = [line for owner, line in located if owner is cell]
+
+
+def cell_summary(cells: List[NotebookCell], issues: List[Any]) -> List[Dict[str, Any]]:
+    """Per code cell: its index, program line range and number of (located) issues."""
+    counts: Dict[int, int] = {}
+    for issue in issues:
+        if issue.get('cell') is not None:
+            counts[issue['cell']] = counts.get(issue['cell'], 0) + 1
+    return [
+        {'cell': cell.index, 'start_line': cell.start_line, 'end_line': cell.end_line,
+         'issues': counts.get(cell.index, 0)}
+        for cell in cells
+    ]
+
+
+def cells_from_summary(summary: List[Dict[str, Any]]) -> List[NotebookCell]:
+    """Rebuild the cell layout (without sources) from a result's 'cells' entry."""
+    return [NotebookCell(entry['cell'], '', entry['start_line'], entry['end_line']) for entry in summary]
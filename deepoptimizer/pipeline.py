@@ -0,0 +1,266 @@
+"""
+Staged project analysis: discovery, then rules (CPU), then the LLM (I/O).
+
+Files flow from a lazy discovery walk into a CPU pool that reads, parses and
+rule-checks them, and from there into a separate I/O pool for LLM analysis.
+Each stage only gets as many files as it can work on (plus a small queue),
+so discovery, rule checks and LLM calls overlap and nothing runs ahead
+unbounded. Files waiting for the LLM beyond the backlog limit drop their
+parsed source and are re-read when their turn comes, which bounds memory
+without ever stalling rule checks behind slow LLM calls.
+
+The project index (for LLM symbol context and project-level rules) is
+built in the background from the start of the run, over its own discovery
+walk. LLM analysis does not wait for it: a file whose LLM stage starts
+before the index is ready goes without cross-file symbol context, which
+only the first files of a cold run (no index cache) should hit. Results
+are held until the index is ready, since project-level rules need it.
+"""
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .notebook import NotebookCell
+from .source import SourceUnit
+from .timeouts import Deadline
+
+# Files queued per CPU worker, and files held for the LLM stage per LLM worker
+CPU_QUEUE_FACTOR = 2
+LLM_BACKLOG_FACTOR = 4
+
+# Extra time a worker gets past its deadline to wind down before it is abandoned
+FILE_TIMEOUT_GRACE = 2.0
+
+
+@dataclass
+class StagedFile:
+    """A file's rule results, and what its LLM stage (if any) needs."""
+    path: str
+    result: Dict[str, Any]
+    rule_issues: Optional[List[Any]] = None     # None when the file was skipped or unreadable
+    llm: bool = False                           # Still needs LLM analysis
+    llm_skipped: Optional[str] = None           # Why the LLM was not used (size/generated limits)
+    code: Optional[str] = None                  # Source for the LLM stage (None once spilled)
+    cells: Optional[List[NotebookCell]] = None  # Code cells, for notebooks
+    unit: Optional[SourceUnit] = None           # Parsed source, reused within one process
+    seconds: float = 0.0                        # Time spent on the file so far
+
+    def spill(self):
+        """Drop the in-memory source; the LLM stage re-reads the file."""
+        self.unit = None
+        self.code = None
+
+
+class Pipeline:
+    """Moves files through the CPU and LLM stages with bounded queues and deadlines."""
+
+    def __init__(self, cpu_stage: Callable[[Path], Future],
+                 llm_stage: Optional[Callable[[StagedFile], Future]],
+                 build_index: Callable[[], Future],
+                 collect: Callable[[Path, Any, bool], None],
+                 cpu_workers: int, llm_workers: int,
+                 run_deadline: Deadline, file_deadlines: Dict[str, Deadline],
+                 file_timeout: Optional[float] = None,
+                 emit: Optional[Callable[..., None]] = None,
+                 finished: Optional[Callable[[Path, Any], Any]] = None,
+                 completed: Optional[Callable[[Path], Any]] = None,
+                 selected: Optional[Callable[[Path], bool]] = None,
+                 cpu_window: Optional[int] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            cpu_stage: Submits a file's read/parse/rules stage; its future
+                yields a StagedFile, or (result, seconds) if the file was
+                analyzed completely (e.g. by a remote worker)
+            llm_stage: Submits a file's LLM stage; its future yields the final
+                result dict and seconds (None when LLM analysis is off)
+            build_index: Starts building the project index (called when the
+                run starts); its future completes when it is ready
+            collect: Called with (file, StagedFile or (result, seconds) or
+                exception, whether the project index is ready)
+            cpu_workers: Size of the CPU pool
+            llm_workers: Size of the LLM pool
+            run_deadline: Deadline of the whole run
+            file_deadlines: Deadline of each file's running stage, by path
+                (filled in by the stages, checked here for stuck workers)
+            file_timeout: Per-stage time limit, for abandoning stuck workers
+            emit: Progress callback, called like ProgressTracker.emit
+            finished: Called with a file's outcome as soon as its own analysis
+                is done (before it waits for the index); returns the outcome to
+                collect, e.g. after journaling it
+            completed: Returns the outcome of a file that is already done
+                (e.g. from a run journal), or None; such a file is indexed and
+                collected, but not analyzed again
+            selected: Returns False for a file that belongs to another shard;
+                it is indexed (for project-level rules) but not analyzed
+            cpu_window: Files in the CPU stage at once (default:
+                CPU_QUEUE_FACTOR per CPU worker)
+        """
+        self.cpu_stage = cpu_stage
+        self.llm_stage = llm_stage
+        self.build_index = build_index
+        self.collect = collect
+        self.cpu_window = cpu_window or CPU_QUEUE_FACTOR * cpu_workers
+        self.llm_window = llm_workers
+        self.llm_backlog = LLM_BACKLOG_FACTOR * llm_workers
+        self.run_deadline = run_deadline
+        self.file_deadlines = file_deadlines
+        self.file_timeout = file_timeout
+        self.emit = emit
+        self.finished = finished
+        self.completed = completed
+        self.selected = selected
+
+        self.queued = 0
+        self.spilled = 0
+        self._cpu: Dict[Future, Path] = {}
+        self._llm: Dict[Future, Path] = {}
+        self._backlog: Deque[StagedFile] = deque()
+        self._held: List[Tuple[Path, Any]] = []
+        self._index: Optional[Future] = None
+
+    def run(self, paths: Iterable[Path]) -> List[Path]:
+        """
+        Analyze the files as they are discovered.
+
+        Returns:
+            Files that did not finish before the run deadline or were
+            abandoned past their file deadline
+        """
+        paths = iter(paths)
+        exhausted = False
+        unfinished: List[Path] = []
+        self._index = self.build_index()
+
+        while True:
+            if self.run_deadline.expired():
+                break
+
+            # Top up the CPU stage from discovery
+            while not exhausted and len(self._cpu) < self.cpu_window:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                    self._notify('discovered', total=self.queued)
+                    break
+                if self.selected is not None and not self.selected(path):
+                    continue
+                self.queued += 1
+                self._notify('queued', str(path))
+                outcome = self.completed(path) if self.completed is not None else None
+                if outcome is not None:
+                    self._hold(path, outcome)
+                    continue
+                self._cpu[self.cpu_stage(path)] = path
+
+            if self._index.done():
+                self._release_held()
+            while self._backlog and len(self._llm) < self.llm_window:
+                staged = self._backlog.popleft()
+                self._llm[self.llm_stage(staged)] = Path(staged.path)
+
+            waiting = set(self._cpu) | set(self._llm)
+            if not self._index.done():
+                waiting.add(self._index)
+            if not waiting:
+                if exhausted:
+                    break
+                continue
+
+            remaining = self.run_deadline.remaining()
+            poll = 1.0 if self.file_timeout is not None else None
+            if remaining is not None:
+                poll = remaining if poll is None else min(poll, remaining)
+            done, _ = wait(waiting, timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._finish(future)
+
+            # Abandon workers stuck past their file deadline (e.g. in a rule)
+            if self.file_timeout is not None:
+                for futures in (self._cpu, self._llm):
+                    for future, path in list(futures.items()):
+                        deadline = self.file_deadlines.get(str(path))
+                        if deadline is not None and deadline.overdue(FILE_TIMEOUT_GRACE):
+                            del futures[future]
+                            unfinished.append(path)
+                            self._notify('timed_out', str(path))
+
+        if self._cpu or self._llm or self._backlog or not exhausted:
+            unfinished.extend(self._wind_down())
+        # Anything still waiting for the index is reported without project rules
+        self._release_held(force=True)
+        return unfinished
+
+    def _finish(self, future: Future):
+        if future is self._index:
+            return
+        if future in self._cpu:
+            path = self._cpu.pop(future)
+            try:
+                staged = future.result()
+            except Exception as e:
+                self._hold(path, e)
+                return
+            if isinstance(staged, StagedFile) and staged.llm and self.llm_stage is not None:
+                self._backlog.append(staged)
+                if len(self._backlog) > self.llm_backlog:
+                    staged.spill()
+                    self.spilled += 1
+            else:
+                self._hold(path, self._settle(path, staged))
+        else:
+            path = self._llm.pop(future)
+            try:
+                outcome = future.result()
+            except Exception as e:
+                self._hold(path, e)
+                return
+            self._hold(path, self._settle(path, outcome))
+
+    def _settle(self, path: Path, outcome: Any) -> Any:
+        """Pass a file's own result through the finished hook."""
+        if self.finished is None:
+            return outcome
+        try:
+            return self.finished(path, outcome)
+        except Exception as e:
+            return e
+
+    def _hold(self, path: Path, outcome: Any):
+        """Collect a finished file, or hold it until the project index is ready."""
+        if self._index is not None and self._index.done():
+            self.collect(path, outcome, True)
+        else:
+            self._held.append((path, outcome))
+
+    def _release_held(self, force: bool = False):
+        ready = self._index is not None and self._index.done()
+        if not (ready or force):
+            return
+        held, self._held = self._held, []
+        for path, outcome in held:
+            self.collect(path, outcome, ready)
+
+    def _wind_down(self) -> List[Path]:
+        """Run deadline passed: drop queued work, keep what finishes within the grace period."""
+        self.run_deadline.cancel()
+        running = [future for future in list(self._cpu) + list(self._llm) if not future.cancel()]
+        done, _ = wait(running, timeout=FILE_TIMEOUT_GRACE)
+        for future in done:
+            self._finish(future)
+
+        # Files whose rules ran but whose LLM stage never started count as unfinished
+        unfinished = list(self._cpu.values()) + list(self._llm.values())
+        unfinished.extend(Path(staged.path) for staged in self._backlog)
+        self._cpu.clear()
+        self._llm.clear()
+        self._backlog.clear()
+        self._notify('timeout', unfinished=len(unfinished))
+        return unfinished
+
+    def _notify(self, event: str, file_path: Optional[str] = None, **data):
+        if self.emit is not None:
+            self.emit(event, file_path, **data)
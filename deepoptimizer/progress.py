@@ -0,0 +1,164 @@
+"""
+Progress events for project analysis, with throughput and ETA.
+
+``DeepOptimizer.analyze_project`` reports each file's way through the
+pipeline (queued, parsed, rule-checked, LLM pending/done, done), and each LLM
+finding as it streams in, to a ProgressTracker, which keeps thread-safe counters and hands every event
+plus a stats snapshot to a callback. Two callbacks are provided: a rich
+live display and a JSON-lines stream for machines.
+"""
+import json
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, TextIO
+
+# Per-file stages, in pipeline order
+STAGES = ('queued', 'parsed', 'rule_checked', 'llm_pending', 'llm_done', 'done')
+
+
+class ProgressTracker:
+    """Thread-safe stage counters and throughput for one analysis run."""
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 token_counter: Optional[Callable[[], int]] = None,
+                 llm_limit: Optional[Callable[[], Optional[int]]] = None):
+        """
+        Initialize the tracker.
+
+        Args:
+            callback: Called with each event dict (event name, file, stats snapshot)
+            token_counter: Returns the running total of LLM tokens, for tokens/s
+            llm_limit: Returns the current LLM concurrency limit (None if unlimited)
+        """
+        self.callback = callback
+        self.token_counter = token_counter
+        self.llm_limit = llm_limit
+        self.started = time.monotonic()
+        self.total = 0
+        self.counts = {stage: 0 for stage in STAGES}
+        self.llm_issues = 0
+        self._tokens_at_start = token_counter() if token_counter else 0
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, file_path: Optional[str] = None, **data):
+        """
+        Record an event and pass it on to the callback.
+
+        Args:
+            event: A stage from STAGES, 'llm_issue' for a streamed LLM finding,
+                or a run-level event ('discovered', 'indexed', 'finished')
+            file_path: File the event is about
+            **data: Extra fields (e.g. total=... for 'discovered')
+        """
+        with self._lock:
+            if event == 'discovered':
+                self.total = data.get('total', self.total)
+            elif event == 'llm_issue':
+                self.llm_issues += 1
+            elif event in self.counts:
+                self.counts[event] += 1
+
+            if self.callback is not None:
+                payload = {'event': event}
+                if file_path is not None:
+                    payload['file'] = str(file_path)
+                payload.update(data)
+                payload.update(self._snapshot())
+                self.callback(payload)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters, throughput and ETA."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        done = self.counts['done']
+        tokens = (self.token_counter() - self._tokens_at_start) if self.token_counter else 0
+
+        files_per_sec = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / files_per_sec if files_per_sec > 0 and self.total else None
+
+        return {
+            'total': self.total,
+            'queued': self.counts['queued'],
+            'parsed': self.counts['parsed'],
+            'rule_checked': self.counts['rule_checked'],
+            'llm_in_flight': self.counts['llm_pending'] - self.counts['llm_done'],
+            'llm_done': self.counts['llm_done'],
+            'llm_concurrency': self.llm_limit() if self.llm_limit else None,
+            'llm_issues': self.llm_issues,
+            'done': done,
+            'elapsed': round(elapsed, 3),
+            'files_per_sec': round(files_per_sec, 3),
+            'tokens': tokens,
+            'tokens_per_sec': round(tokens / elapsed, 1) if elapsed > 0 else 0.0,
+            'eta': round(eta, 1) if eta is not None else None
+        }
+
+
+class JsonProgressStream:
+    """Writes each progress event as one JSON line (default: stderr)."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stderr
+
+    def __call__(self, event: Dict[str, Any]):
+        self.stream.write(json.dumps(event) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class RichProgressDisplay:
+    """Live progress bar with per-stage counts, throughput and ETA (on stderr)."""
+
+    def __init__(self, label: str = 'Analyzing'):
+        from rich.console import Console
+        from rich.progress import Progress, TextColumn, BarColumn, MofNCompleteColumn
+
+        self.progress = Progress(
+            TextColumn('[bold]{task.description}'),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TextColumn('{task.fields[stats]}'),
+            console=Console(stderr=True),
+            transient=True,
+            redirect_stderr=True
+        )
+        self.task = self.progress.add_task(label, total=None, stats='discovering files...')
+        self.progress.start()
+
+    def __call__(self, event: Dict[str, Any]):
+        if event['event'] == 'indexed':
+            stats = 'indexing done'
+        else:
+            stats = f"parsed {event['parsed']} · rules {event['rule_checked']} · LLM {event['llm_in_flight']} in flight"
+            if event['llm_concurrency']:
+                stats += f" (limit {event['llm_concurrency']})"
+            stats += f"/{event['llm_done']} done · {event['files_per_sec']:.1f} files/s"
+            if event['llm_issues']:
+                stats += f" · {event['llm_issues']} LLM findings"
+            if event['tokens']:
+                stats += f" · {event['tokens_per_sec']:.0f} tok/s"
+            stats += f" · ETA {_format_duration(event['eta'])}"
+
+        self.progress.update(
+            self.task,
+            total=event['total'] or None,
+            completed=event['done'],
+            stats=stats
+        )
+
+    def close(self):
+        self.progress.stop()
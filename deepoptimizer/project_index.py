@@ -0,0 +1,522 @@
+"""
+Project-wide symbol table and import/call graph for cross-file context.
+"""
+import ast
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Union
+
+from .source import SourceUnit, as_source_unit
+from .notebook import NOTEBOOK_SUFFIX, build_program, iter_cells
+
+# Bump when the index entry format changes
+INDEX_VERSION = 2
+
+
+@dataclass
+class SymbolInfo:
+    """A top-level function or class (or a method of one) defined in the project."""
+    name: str
+    qualname: str  # module-qualified, e.g. 'models.Net.forward'
+    kind: str  # 'function', 'class' or 'method'
+    file_path: str
+    lineno: int
+    signature: str
+    summary: Optional[str] = None
+    bases: List[str] = field(default_factory=list)
+    methods: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return asdict(self)
+
+
+@dataclass
+class ModuleInfo:
+    """Everything the index knows about one file."""
+    module: str
+    file_path: str
+    symbols: List[SymbolInfo] = field(default_factory=list)
+    imports: Dict[str, str] = field(default_factory=dict)  # local alias -> qualified name
+    references: List[str] = field(default_factory=list)  # dotted names used in the file
+    calls: Dict[str, List[str]] = field(default_factory=dict)  # caller qualname -> callee names
+    # Facts used by project-level rules
+    call_sites: List[Dict[str, Any]] = field(default_factory=list)
+    dataloaders: List[Dict[str, Any]] = field(default_factory=list)
+    optimizers: List[Dict[str, Any]] = field(default_factory=list)
+    constants: Dict[str, Any] = field(default_factory=dict)  # module-level numeric constants
+    uses_cuda: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModuleInfo':
+        """Create from dictionary format."""
+        data = dict(data)
+        data['symbols'] = [SymbolInfo(**s) for s in data.get('symbols', [])]
+        return cls(**data)
+
+
+def module_name_for(file_path: Path, root: Path) -> str:
+    """Derive a dotted module name from a file path relative to the project root."""
+    try:
+        relative = file_path.resolve().relative_to(root.resolve())
+    except ValueError:
+        relative = Path(file_path.name)
+
+    parts = list(relative.with_suffix('').parts)
+    if parts and parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts) or file_path.stem
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """Turn Name/Attribute chains like torch.nn.Linear into a dotted string."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return '.'.join(reversed(parts))
+    return None
+
+
+def _signature(node: ast.AST) -> str:
+    """Compact one-line signature for a function or class."""
+    if isinstance(node, ast.ClassDef):
+        bases = ', '.join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+
+    prefix = 'async def' if isinstance(node, ast.AsyncFunctionDef) else 'def'
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ''
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _summary(node: ast.AST) -> Optional[str]:
+    """First line of a docstring, if any."""
+    docstring = ast.get_docstring(node)
+    if docstring:
+        return docstring.strip().split('\n')[0][:120]
+    return None
+
+
+def _resolve_relative(module: str, level: int, target: Optional[str], is_package: bool) -> str:
+    """Resolve 'from ..x import y' against the importing module."""
+    package = module.split('.') if is_package else module.split('.')[:-1]
+    if level > 1:
+        package = package[:-(level - 1)] if level - 1 <= len(package) else []
+    if target:
+        package = package + [target]
+    return '.'.join(package)
+
+
+def index_module(code: Union[str, SourceUnit], module: str, file_path: str) -> ModuleInfo:
+    """
+    Build the index entry for one module.
+
+    Args:
+        code: Python source code (raw source or a shared SourceUnit)
+        module: Dotted module name
+        file_path: Path of the file (for reporting)
+
+    Returns:
+        ModuleInfo with symbols, imports, references and call graph
+    """
+    info = ModuleInfo(module=module, file_path=file_path)
+
+    unit = as_source_unit(code, file_path)
+    tree = unit.tree
+    if tree is None:
+        return info
+
+    is_package = Path(file_path).stem == '__init__'
+
+    # Imports anywhere in the file
+    for node in unit.nodes:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    info.imports[alias.asname] = alias.name
+                else:
+                    top = alias.name.split('.')[0]
+                    info.imports[top] = top
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = _resolve_relative(module, node.level, node.module, is_package)
+            else:
+                base = node.module or ''
+            for alias in node.names:
+                if alias.name != '*':
+                    info.imports[alias.asname or alias.name] = f"{base}.{alias.name}" if base else alias.name
+
+    # Top-level symbols and their methods
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            info.symbols.append(SymbolInfo(
+                name=node.name,
+                qualname=f"{module}.{node.name}",
+                kind='function',
+                file_path=file_path,
+                lineno=node.lineno,
+                signature=_signature(node),
+                summary=_summary(node)
+            ))
+        elif isinstance(node, ast.ClassDef):
+            methods = [
+                n for n in node.body
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            info.symbols.append(SymbolInfo(
+                name=node.name,
+                qualname=f"{module}.{node.name}",
+                kind='class',
+                file_path=file_path,
+                lineno=node.lineno,
+                signature=_signature(node),
+                summary=_summary(node),
+                bases=[ast.unparse(b) for b in node.bases],
+                methods=[m.name for m in methods]
+            ))
+            for method in methods:
+                info.symbols.append(SymbolInfo(
+                    name=method.name,
+                    qualname=f"{module}.{node.name}.{method.name}",
+                    kind='method',
+                    file_path=file_path,
+                    lineno=method.lineno,
+                    signature=_signature(method),
+                    summary=_summary(method)
+                ))
+
+    # Dotted names referenced anywhere
+    references = set()
+    for node in unit.nodes:
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            name = _dotted_name(node)
+            if name:
+                references.add(name)
+    info.references = sorted(references)
+
+    # Module-level numeric constants (e.g. LR = 1e-3 in config.py)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            value = node.value.value
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        info.constants[target.id] = value
+
+    _FactCollector(info).visit(tree)
+    info.uses_cuda = 'cuda' in unit.code
+
+    return info
+
+
+def _is_no_grad(node: ast.AST) -> bool:
+    """Check if a with-item or decorator disables gradient tracking."""
+    name = _dotted_name(node.func if isinstance(node, ast.Call) else node) or ''
+    return name.endswith('no_grad') or name.endswith('inference_mode')
+
+
+class _FactCollector(ast.NodeVisitor):
+    """Single walk collecting calls, DataLoader and optimizer constructions."""
+
+    def __init__(self, info: ModuleInfo):
+        self.info = info
+        self.scope = [info.module]
+        self.no_grad_depth = 0
+        self.assign_target = None
+
+    def _visit_function(self, node):
+        disables_grad = any(_is_no_grad(d) for d in node.decorator_list)
+        self.scope.append(node.name)
+        self.no_grad_depth += disables_grad
+        self.generic_visit(node)
+        self.no_grad_depth -= disables_grad
+        self.scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_With(self, node: ast.With):
+        disables_grad = any(_is_no_grad(item.context_expr) for item in node.items)
+        for item in node.items:
+            self.visit(item)
+        self.no_grad_depth += disables_grad
+        for statement in node.body:
+            self.visit(statement)
+        self.no_grad_depth -= disables_grad
+
+    def visit_Assign(self, node: ast.Assign):
+        if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            self.assign_target = node.targets[0].id
+        self.visit(node.value)
+        self.assign_target = None
+        for target in node.targets:
+            self.visit(target)
+
+    def visit_Call(self, node: ast.Call):
+        name = _dotted_name(node.func)
+        target, self.assign_target = self.assign_target, None
+        scope = '.'.join(self.scope)
+
+        if name:
+            if len(self.scope) > 1:
+                callees = self.info.calls.setdefault(scope, [])
+                if name not in callees:
+                    callees.append(name)
+
+            self.info.call_sites.append({
+                'callee': name,
+                'caller': scope,
+                'lineno': node.lineno,
+                'no_grad': self.no_grad_depth > 0
+            })
+
+            last = name.rsplit('.', 1)[-1]
+            if last == 'DataLoader':
+                self.info.dataloaders.append({
+                    'lineno': node.lineno,
+                    'scope': scope,
+                    'target': target if len(self.scope) == 1 else None,
+                    'keywords': [kw.arg for kw in node.keywords if kw.arg]
+                })
+            elif 'SGD' in last or 'Adam' in last:
+                lr_value, lr_name = None, None
+                for keyword in node.keywords:
+                    if keyword.arg == 'lr':
+                        if isinstance(keyword.value, ast.Constant):
+                            lr_value = keyword.value.value
+                        else:
+                            lr_name = _dotted_name(keyword.value)
+                self.info.optimizers.append({
+                    'name': last,
+                    'lineno': node.lineno,
+                    'lr': lr_value,
+                    'lr_name': lr_name
+                })
+
+        self.generic_visit(node)
+
+
+class ProjectIndex:
+    """Symbol table and import/call graph for a whole project, built once per run."""
+
+    def __init__(self, root: Path, cache_dir: Optional[Path] = None,
+                 max_file_bytes: Optional[int] = None):
+        """
+        Initialize the index.
+
+        Args:
+            root: Project root (module names are derived relative to it)
+            cache_dir: Directory for the on-disk index cache (None disables it)
+            max_file_bytes: Files larger than this are not indexed (None for no limit)
+        """
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir) / 'index' if cache_dir else None
+        self.max_file_bytes = max_file_bytes
+        self.modules: Dict[str, ModuleInfo] = {}  # file path -> module info
+        self.symbols: Dict[str, SymbolInfo] = {}  # qualname -> symbol
+
+    def _cache_path(self) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(str(self.root.resolve()).encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{key}.json"
+
+    def _load_cache(self) -> Dict[str, Any]:
+        path = self._cache_path()
+        if path is None or not path.exists():
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return {}
+            return data.get('files', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, entries: Dict[str, Any]):
+        path = self._cache_path()
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'files': entries}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def build(self, files: Iterable[Path]) -> 'ProjectIndex':
+        """
+        Index the given files, reusing cached entries for unchanged files.
+
+        Args:
+            files: Python files (and notebooks) belonging to the project
+
+        Returns:
+            self, for chaining
+        """
+        cached = self._load_cache()
+        entries = {}
+        changed = False
+
+        for file_path in files:
+            file_path = Path(file_path)
+            key = str(file_path)
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            notebook = file_path.suffix == NOTEBOOK_SUFFIX
+            # A notebook's size is mostly outputs; its program is checked once extracted
+            if self.max_file_bytes is not None and stat.st_size > self.max_file_bytes and not notebook:
+                continue
+            stamp = [stat.st_mtime_ns, stat.st_size]
+
+            entry = cached.get(key)
+            if entry and entry.get('stamp') == stamp:
+                info = ModuleInfo.from_dict(entry['module'])
+                entries[key] = entry
+            else:
+                try:
+                    if notebook:
+                        code, _ = build_program(iter_cells(file_path.read_bytes()))
+                        if self.max_file_bytes is not None and len(code.encode('utf-8')) > self.max_file_bytes:
+                            continue
+                    else:
+                        code = file_path.read_text(encoding='utf-8')
+                except (OSError, UnicodeDecodeError, ValueError):
+                    continue
+                info = index_module(code, module_name_for(file_path, self.root), key)
+                entries[key] = {'stamp': stamp, 'module': info.to_dict()}
+                changed = True
+            self.add_module(info)
+
+        # Rewritten only when a file was (re)indexed or one has gone
+        if changed or len(entries) != len(cached):
+            self._save_cache(entries)
+        return self
+
+    def add_module(self, info: ModuleInfo):
+        """Add (or replace) a module in the index."""
+        self.modules[info.file_path] = info
+        for symbol in info.symbols:
+            self.symbols[symbol.qualname] = symbol
+
+    def resolve(self, name: str, file_path: str) -> Optional[SymbolInfo]:
+        """
+        Resolve a dotted name used in a file to a project symbol.
+
+        Handles aliases from imports (``from models import Net as N``) and
+        attribute access through imported modules (``models.Net``).
+        """
+        info = self.modules.get(str(file_path))
+        if info is None:
+            return None
+
+        head, _, rest = name.partition('.')
+        if head in info.imports:
+            qualified = info.imports[head] + (f".{rest}" if rest else '')
+        else:
+            qualified = f"{info.module}.{name}"
+
+        # Walk back until a known symbol is found (e.g. models.Net.forward -> models.Net)
+        parts = qualified.split('.')
+        while parts:
+            symbol = self.symbols.get('.'.join(parts))
+            if symbol is not None:
+                return symbol
+            parts.pop()
+        return None
+
+    def resolve_constant(self, name: str, file_path: str) -> Optional[Any]:
+        """Resolve a name used in a file to a module-level numeric constant in the project."""
+        info = self.modules.get(str(file_path))
+        if info is None:
+            return None
+
+        head, _, rest = name.partition('.')
+        if not rest and head in info.constants:
+            return info.constants[head]
+
+        qualified = info.imports.get(head, head) + (f".{rest}" if rest else '')
+        module, _, constant = qualified.rpartition('.')
+        for other in self.modules.values():
+            if other.module == module and constant in other.constants:
+                return other.constants[constant]
+        return None
+
+    def referenced_symbols(self, file_path: str) -> List[SymbolInfo]:
+        """Project symbols defined in other files and referenced by this one."""
+        info = self.modules.get(str(file_path))
+        if info is None:
+            return []
+
+        found = {}
+        for name in info.references:
+            symbol = self.resolve(name, file_path)
+            if symbol is not None and symbol.file_path != info.file_path:
+                found[symbol.qualname] = symbol
+
+        return sorted(found.values(), key=lambda s: (s.file_path, s.lineno))
+
+    def callers_of(self, qualname: str) -> List[str]:
+        """Qualified names of project functions that call the given symbol."""
+        callers = []
+        for info in self.modules.values():
+            for caller, callees in info.calls.items():
+                for callee in callees:
+                    symbol = self.resolve(callee, info.file_path)
+                    if symbol is not None and symbol.qualname == qualname:
+                        callers.append(caller)
+                        break
+        return callers
+
+    def format_context(self, file_path: str, limit: int = 20) -> str:
+        """
+        Format referenced symbols as compact prompt context.
+
+        Only signatures and one-line summaries are included, never source.
+        Classes referenced by the file are listed with their method names.
+        """
+        symbols = self.referenced_symbols(file_path)
+        if not symbols:
+            return ''
+
+        # Methods are covered by their class entry when the class is referenced too
+        classes = {s.qualname for s in symbols if s.kind == 'class'}
+        symbols = [
+            s for s in symbols
+            if not (s.kind == 'method' and s.qualname.rsplit('.', 1)[0] in classes)
+        ]
+
+        lines = []
+        for symbol in symbols[:limit]:
+            location = f"{Path(symbol.file_path).name}:{symbol.lineno}"
+            line = f"- `{symbol.signature}` ({symbol.qualname}, {location})"
+            if symbol.summary:
+                line += f" - {symbol.summary}"
+            if symbol.methods:
+                line += f"\n  methods: {', '.join(symbol.methods)}"
+            lines.append(line)
+
+        if len(symbols) > limit:
+            lines.append(f"- ... and {len(symbols) - limit} more")
+
+        return '\n'.join(lines)
@@ -2,7 +2,9 @@
 Smart prompt building for ML code analysis.
 """
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
+
+from .source import SourceUnit, as_source_unit
 
 
 class PromptBuilder:
@@ -11,17 +13,32 @@ class PromptBuilder:
     def __init__(self, knowledge_base):
         self.knowledge_base = knowledge_base
     
-    def build_analysis_prompt(self, code: str, file_path: str = None, project_context: Dict[str, Any] = None) -> str:
-        """Build a comprehensive analysis prompt with context."""
+    def build_analysis_prompt(self, code: Union[str, SourceUnit], file_path: str = None,
+                              project_context: Dict[str, Any] = None,
+                              source: Optional[SourceUnit] = None) -> str:
+        """
+        Build a comprehensive analysis prompt with context.
+        
+        Args:
+            code: Code to include in the prompt (raw source or a SourceUnit)
+            file_path: Path to the file being analyzed
+            project_context: Additional context (referenced symbols, etc.)
+            source: Unit to detect code characteristics from, when the prompt
+                only shows part of the file (defaults to the code itself)
+        """
+        unit = source or as_source_unit(code, file_path)
+        if isinstance(code, SourceUnit):
+            code = code.code
+        
         # Detect code characteristics
-        framework = self._detect_framework(code)
-        task_type = self._infer_task_type(code)
-        architecture = self._detect_architecture(code)
-        has_training = self._has_training_code(code)
-        has_validation = self._has_validation_code(code)
+        framework = self._detect_framework(unit)
+        task_type = self._infer_task_type(unit)
+        architecture = self._detect_architecture(unit)
+        has_training = self._has_training_code(unit)
+        has_validation = self._has_validation_code(unit)
         
         # Get relevant techniques from knowledge base
-        relevant_techniques = self._get_relevant_techniques(code, framework)
+        relevant_techniques = self._get_relevant_techniques(unit, framework)
         technique_conflicts = self._get_technique_conflicts()
         
         # Build the prompt
@@ -29,13 +46,70 @@ class PromptBuilder:
             self._system_prompt(),
             self._context_section(file_path, framework, task_type, architecture),
             self._code_section(code),
+            self._project_symbols_section(project_context or {}),
+            self._triage_section(project_context or {}),
             self._knowledge_base_section(relevant_techniques, technique_conflicts),
             self._analysis_instructions(has_training, has_validation),
             self._few_shot_examples(),
             self._output_format_instructions()
         ]
         
-        return "\n\n".join(prompt_parts)
+        return "\n\n".join(part for part in prompt_parts if part)
+    
+    def build_triage_prompt(self, code: str, file_path: str = None) -> str:
+        """
+        Build a short screening prompt for the fast triage model.
+        
+        The code is shown with line numbers so the verdict can name regions.
+        
+        Args:
+            code: Code to screen
+            file_path: Path to the file being screened
+        """
+        numbered = "\n".join(f"{number:>5}| {line}" for number, line in enumerate(code.split("\n"), 1))
+        location = f" from {file_path}" if file_path else ""
+        
+        return f"""You are screening ML code{location} to decide whether it needs an expert review.
+
+Flag regions that plausibly contain bugs, performance problems or ML anti-patterns, for example:
+- training/evaluation mistakes (missing eval()/no_grad, gradients not zeroed, leaking tensors)
+- device or data-loading bottlenecks (host-device copies or .item() in loops, DataLoader settings)
+- numerical or reproducibility problems (unstable losses, mixed precision misuse, seeding)
+- inefficient tensor code (Python loops over tensors, repeated allocations)
+
+Ignore style, naming and documentation. When unsure, flag the region.
+
+## Code
+```python
+{numbered}
+```
+
+Return a JSON array with one object per region: {{"start_line": 12, "end_line": 30, "reason": "short reason"}}.
+Return [] if nothing needs review."""
+    
+    def build_continuation_prompt(self, prompt: str, issues: List[Dict[str, Any]]) -> str:
+        """
+        Ask for the rest of an answer that hit the output token limit.
+        
+        Args:
+            prompt: The original analysis prompt
+            issues: Complete issues from the truncated answer(s), in order
+        """
+        reported = "\n".join(
+            f"- [{issue.get('severity')}] {issue.get('title')}"
+            + (f" (lines {', '.join(map(str, issue['line_numbers']))})" if issue.get('line_numbers') else "")
+            for issue in issues
+        ) or "- (none)"
+        last = f' after "{issues[-1].get("title")}"' if issues else ""
+        
+        return f"""{prompt}
+
+## Continuation
+Your previous answer was cut off by the output length limit. It reported these issues:
+{reported}
+
+Report only the remaining issues{last}. Do not repeat any issue listed above.
+Return them as a JSON array in the same format (an empty array if there are none), and keep descriptions and suggestions brief."""
     
     def _system_prompt(self) -> str:
         """System prompt establishing the AI's role."""
@@ -67,6 +141,28 @@ Your analysis should be:
 {code}
 ```"""
     
+    def _project_symbols_section(self, project_context: Dict[str, Any]) -> str:
+        """Signatures of project symbols the code uses but that are defined elsewhere."""
+        symbol_context = project_context.get('symbol_context')
+        if not symbol_context:
+            return ""
+        
+        return f"""## Referenced Project Symbols
+These are defined in other files of the project (signatures and summaries only):
+
+{symbol_context}"""
+    
+    def _triage_section(self, project_context: Dict[str, Any]) -> str:
+        """What the fast screening pass flagged, so the review concentrates there."""
+        notes = project_context.get('triage_notes')
+        if not notes:
+            return ""
+        
+        flagged = "\n".join(f"- {note}" for note in notes)
+        return f"""## Screening Notes
+A first screening pass flagged the following; code it found nothing in may be omitted. Review these areas in depth:
+{flagged}"""
+    
     def _knowledge_base_section(self, techniques: List[Dict], conflicts: List[Dict]) -> str:
         """Include relevant knowledge from the knowledge base."""
         section = "## Relevant ML Knowledge\n\n"
@@ -185,22 +281,25 @@ Example:
 Focus on actionable, specific issues. Don't include generic advice like "consider using a different optimizer" without strong justification.
 Prioritize issues by severity (errors > warnings > info) and impact on the codebase."""
     
-    def _detect_framework(self, code: str) -> str:
+    def _detect_framework(self, unit: SourceUnit) -> str:
         """Detect which ML framework is being used."""
-        if 'import torch' in code or 'from torch' in code:
+        def imports(prefix: str) -> bool:
+            return any(module.startswith(prefix) for module in unit.imports)
+        
+        if imports('torch'):
             return 'PyTorch'
-        elif 'import tensorflow' in code or 'from tensorflow' in code:
+        elif imports('tensorflow'):
             return 'TensorFlow'
-        elif 'import jax' in code or 'from jax' in code:
+        elif imports('jax'):
             return 'JAX'
-        elif 'import sklearn' in code or 'from sklearn' in code:
+        elif imports('sklearn'):
             return 'scikit-learn'
         else:
             return 'Unknown'
     
-    def _infer_task_type(self, code: str) -> str:
+    def _infer_task_type(self, unit: SourceUnit) -> str:
         """Infer the ML task type from code."""
-        code_lower = code.lower()
+        code_lower = unit.lower
         
         # Classification indicators
         if any(term in code_lower for term in ['crossentropy', 'classification', 'logits', 'num_classes']):
@@ -226,12 +325,13 @@ Prioritize issues by severity (errors > warnings > info) and impact on the codeb
         
         return 'General ML'
     
-    def _detect_architecture(self, code: str) -> str:
+    def _detect_architecture(self, unit: SourceUnit) -> str:
         """Detect the model architecture type."""
+        code = unit.code
         architectures = []
         
         # Check for specific architectures
-        if re.search(r'class.*transformer|transformer', code, re.I):
+        if 'transformer' in unit.lower:
             architectures.append('Transformer')
         if 'Conv2d' in code or 'conv2d' in code:
             architectures.append('CNN')
@@ -246,34 +346,34 @@ Prioritize issues by severity (errors > warnings > info) and impact on the codeb
             return ', '.join(architectures)
         return 'Custom Architecture'
     
-    def _has_training_code(self, code: str) -> bool:
+    def _has_training_code(self, unit: SourceUnit) -> bool:
         """Check if code contains training logic."""
         training_indicators = [
             'optimizer', '.backward()', 'train_loader', 'training_step',
             'epochs', '.train()', 'zero_grad()'
         ]
-        return any(indicator in code for indicator in training_indicators)
+        return any(indicator in unit.code for indicator in training_indicators)
     
-    def _has_validation_code(self, code: str) -> bool:
+    def _has_validation_code(self, unit: SourceUnit) -> bool:
         """Check if code contains validation logic."""
         validation_indicators = [
             'val_loader', 'validation', 'evaluate', 'test_loader',
             'valid_', 'val_', '.eval()'
         ]
-        return any(indicator in code for indicator in validation_indicators)
+        return any(indicator in unit.code for indicator in validation_indicators)
     
-    def _get_relevant_techniques(self, code: str, framework: str) -> List[Dict]:
+    def _get_relevant_techniques(self, unit: SourceUnit, framework: str) -> List[Dict]:
         """Get relevant optimization techniques from knowledge base."""
         techniques = []
         
         # Get techniques based on detected patterns
-        if 'attention' in code.lower():
+        if 'attention' in unit.lower:
             techniques.extend(self.knowledge_base.get_techniques_by_category('attention'))
         
-        if 'Conv2d' in code:
+        if 'Conv2d' in unit.code:
             techniques.extend(self.knowledge_base.get_techniques_by_category('convolution'))
         
-        if 'optimizer' in code.lower():
+        if 'optimizer' in unit.lower:
             techniques.extend(self.knowledge_base.get_techniques_by_category('optimization'))
         
         # Filter by framework
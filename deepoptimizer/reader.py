@@ -0,0 +1,170 @@
+"""
+Size-aware source reading with guardrails for huge and generated files.
+
+Files are stat'ed before they are read. Large files are memory-mapped so
+generated-code markers, minified lines and embedded data (multi-MB literal
+arrays, base64 blobs) can be found with byte regexes over the mapping
+without first decoding the whole file. Depending on size and content a file
+is then analyzed fully, with rules only (never sent to the LLM), or skipped.
+Notebooks are streamed into their combined code-cell program first and the
+limits apply to that program, not to the outputs stored alongside it.
+"""
+import mmap
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from .notebook import NOTEBOOK_SUFFIX, NotebookCell, build_program, iter_cells
+
+# How a file is analyzed
+MODES = ('full', 'rules', 'skip')
+
+# What to do with generated or minified files
+GENERATED_POLICIES = ('rules', 'skip', 'analyze')
+
+# Markers conventionally placed near the top of generated sources
+_GENERATED_MARKER = re.compile(
+    rb'@generated|do not edit|autogenerated|auto-generated|generated by (?:the )?'
+    rb'(?:protocol buffer|protoc|grpc|swig|cython|pyuic|django)|code generated by',
+    re.IGNORECASE
+)
+_GENERATED_SUFFIXES = ('_pb2.py', '_pb2_grpc.py', '_pb2.pyi')
+
+# Embedded data: long runs of numeric literals, or base64-like blobs. Every
+# pattern is anchored at the start of a line/run so a scan stays linear.
+_NUMERIC_RUN = re.compile(rb'(?<![\w.])(?:[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?\s*,\s*){256}')
+_BLOB = re.compile(rb'(?<![A-Za-z0-9+/=])[A-Za-z0-9+/=]{4096}')
+
+# Only the head of a file is searched for generated markers
+_HEAD_BYTES = 4096
+
+
+def parse_size(value: Union[str, int]) -> int:
+    """Parse a byte size such as 4096, '512K', '2MB' or '1MiB'."""
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"invalid size {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' kmg'.index(unit.lower() or ' '))
+
+
+@dataclass(frozen=True)
+class FileLimits:
+    """Size thresholds and generated-file policy for reading sources."""
+    max_bytes: int = 8 * 1024 * 1024        # Larger files are skipped
+    max_llm_bytes: int = 512 * 1024         # Larger files get rules only
+    mmap_threshold: int = 256 * 1024        # Larger files are memory-mapped
+    max_line_length: int = 2000             # Longer lines mean minified code
+    generated: str = 'rules'                # Policy for generated/minified/data files
+
+
+@dataclass
+class SourceFile:
+    """A file as read: its code (None when skipped), size and analysis mode."""
+    path: str
+    size: int
+    mode: str
+    reason: Optional[str] = None
+    code: Optional[str] = None
+    cells: Optional[List[NotebookCell]] = None  # Code cells, for notebooks
+
+
+def detect_generated(data, path: str = '', max_line_length: int = FileLimits.max_line_length) -> Optional[str]:
+    """
+    Check whether source bytes look generated, minified or data-heavy.
+
+    Args:
+        data: File contents (bytes or an mmap)
+        path: File path, for name-based detection (e.g. protobuf modules)
+        max_line_length: Lines longer than this count as minified
+
+    Returns:
+        Reason string, or None for ordinary source
+    """
+    if path.endswith(_GENERATED_SUFFIXES):
+        return 'generated protobuf module'
+    if _GENERATED_MARKER.search(data, 0, _HEAD_BYTES):
+        return 'generated file (header marker)'
+    if re.search(rb'(?m)^[^\n]{%d}' % (max_line_length + 1), data):
+        return f'minified code (lines over {max_line_length} characters)'
+    if _NUMERIC_RUN.search(data):
+        return 'embedded numeric data'
+    if _BLOB.search(data):
+        return 'embedded binary blob'
+    return None
+
+
+def read_source(file_path: Union[str, Path], limits: Optional[FileLimits] = None) -> SourceFile:
+    """
+    Read a source file according to the size limits and generated-file policy.
+
+    Args:
+        file_path: File to read
+        limits: Thresholds (default: FileLimits())
+
+    Returns:
+        SourceFile whose mode is 'full', 'rules' or 'skip' ('skip' has no code)
+
+    Raises:
+        OSError: If the file can't be read
+        UnicodeDecodeError: If the file is not valid UTF-8
+    """
+    limits = limits or FileLimits()
+    path = str(file_path)
+    size = Path(file_path).stat().st_size
+    notebook = path.endswith(NOTEBOOK_SUFFIX)
+
+    if size > limits.max_bytes and not notebook:
+        return SourceFile(path, size, 'skip', f'file too large ({size} bytes, limit {limits.max_bytes})')
+    if size == 0:
+        return SourceFile(path, size, 'full', code='', cells=[] if notebook else None)
+
+    with open(file_path, 'rb') as f:
+        if size >= limits.mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _read_notebook(path, data, limits) if notebook else _route(path, size, data, limits)
+        data = f.read()
+        return _read_notebook(path, data, limits) if notebook else _route(path, size, data, limits)
+
+
+def classify(path: str, size: int, data, limits: FileLimits) -> Tuple[str, Optional[str]]:
+    """
+    Decide how to analyze source bytes.
+
+    Returns:
+        Tuple of (mode, reason); reason is None for mode 'full'
+    """
+    if size > limits.max_bytes:
+        return 'skip', f'file too large ({size} bytes, limit {limits.max_bytes})'
+
+    if limits.generated != 'analyze':
+        reason = detect_generated(data, path, limits.max_line_length)
+        if reason is not None:
+            return ('skip' if limits.generated == 'skip' else 'rules'), reason
+
+    if size > limits.max_llm_bytes:
+        return 'rules', f'too large for LLM analysis ({size} bytes, limit {limits.max_llm_bytes})'
+    return 'full', None
+
+
+def _route(path: str, size: int, data, limits: FileLimits) -> SourceFile:
+    mode, reason = classify(path, size, data, limits)
+    if mode == 'skip':
+        return SourceFile(path, size, mode, reason)
+
+    # Decodes straight from the buffer, without an intermediate bytes copy of a mapping
+    code = str(data, 'utf-8')
+    if '\r' in code:
+        # Match text-mode reading
+        code = code.replace('\r\n', '\n').replace('\r', '\n')
+    return SourceFile(path, size, mode, reason, code)
+
+
+def _read_notebook(path: str, data, limits: FileLimits) -> SourceFile:
+    code, cells = build_program(iter_cells(data))
+    encoded = code.encode('utf-8')
+    mode, reason = classify(path, len(encoded), encoded, limits)
+    return SourceFile(path, len(data), mode, reason, None if mode == 'skip' else code, cells)
@@ -0,0 +1,262 @@
+"""
+Incremental parsing of the JSON issue array in a Gemini response.
+
+Text is fed in as it streams in. The parser finds the start of the issue
+array (after a ``<json>`` tag if there is one), follows string and nesting
+state across chunk boundaries, and hands back each top-level object as soon
+as its closing brace arrives. Each chunk is scanned once, jumping between
+structural characters, so parsing stays linear in the response size.
+
+ISSUE_SCHEMA describes the array for schema-constrained generation, and
+validate_issue checks (and normalizes) one decoded object against it;
+TRIAGE_SCHEMA and validate_area do the same for triage verdicts.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Characters that change state outside / inside a JSON string
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+
+_JSON_TAG = '<json>'
+
+SEVERITIES = ('error', 'warning', 'info')
+
+# Response schema for schema-constrained generation (OpenAPI subset used by Gemini)
+ISSUE_SCHEMA: Dict[str, Any] = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'severity': {'type': 'STRING', 'enum': list(SEVERITIES)},
+            'category': {'type': 'STRING'},
+            'title': {'type': 'STRING'},
+            'description': {'type': 'STRING'},
+            'line_numbers': {'type': 'ARRAY', 'items': {'type': 'INTEGER'}},
+            'suggestion': {'type': 'STRING'},
+            'confidence': {'type': 'NUMBER'},
+            'references': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        },
+        'required': ['severity', 'title', 'description'],
+    },
+}
+
+# Triage verdict: the regions that need a deep review (an empty array means none)
+TRIAGE_SCHEMA: Dict[str, Any] = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'start_line': {'type': 'INTEGER'},
+            'end_line': {'type': 'INTEGER'},
+            'reason': {'type': 'STRING'},
+        },
+        'required': ['start_line', 'end_line'],
+    },
+}
+
+
+class IssueStreamParser:
+    """Extracts the objects of a JSON array from text that arrives in chunks."""
+
+    def __init__(self):
+        self.issues: List[Dict[str, Any]] = []   # Every complete object so far
+        self.errors = 0                          # Elements that closed but didn't decode
+        self.started = False                     # Inside the array
+        self.done = False                        # Array closed
+        self._chunks: List[str] = []
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._object_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """The full text fed so far."""
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add a chunk of response text.
+
+        Returns:
+            Objects completed by this chunk, in order
+        """
+        self._chunks.append(chunk)
+        if self.done or not chunk:
+            return []
+        self._buffer += chunk
+
+        if not self.started and not self._find_start():
+            return []
+
+        completed = self._scan()
+
+        # Drop what has been consumed; keep the open object (if any)
+        keep = self._object_start if self._object_start is not None else self._pos
+        if keep:
+            self._buffer = self._buffer[keep:]
+            self._pos -= keep
+            if self._object_start is not None:
+                self._object_start = 0
+        return completed
+
+    def _find_start(self) -> bool:
+        """Position the scanner just inside the issue array, once it has arrived."""
+        buffer = self._buffer
+        tag = buffer.find(_JSON_TAG)
+        search_from = tag + len(_JSON_TAG) if tag >= 0 else 0
+
+        while True:
+            bracket = buffer.find('[', search_from)
+            if bracket < 0:
+                # Keep a tail that could still be the start of a tag
+                self._buffer = buffer[-len(_JSON_TAG):]
+                return False
+            rest = buffer[bracket + 1:].lstrip()
+            if not rest:
+                # Need the next character to tell an array of issues from "[1]" in prose
+                self._buffer = buffer[bracket:]
+                return False
+            if rest[0] in '{]':
+                self.started = True
+                self._buffer = buffer[bracket + 1:]
+                self._pos = 0
+                return True
+            search_from = bracket + 1
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        completed = []
+        buffer = self._buffer
+        pos = self._pos
+
+        while pos < len(buffer):
+            if self._in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == '\\':
+                    if match.end() >= len(buffer):
+                        # Escape split across chunks; wait for the escaped character
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._object_start = match.start()
+                self._depth += 1
+            elif self._depth == 0:
+                if char == ']':
+                    self.done = True
+                    break
+            else:
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    issue = self._decode(buffer[self._object_start:pos])
+                    self._object_start = None
+                    if issue is not None:
+                        self.issues.append(issue)
+                        completed.append(issue)
+
+        self._pos = pos
+        return completed
+
+    def _decode(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        return value if isinstance(value, dict) else None
+
+
+def validate_issue(issue: Any) -> Optional[Dict[str, Any]]:
+    """
+    Check a decoded issue against ISSUE_SCHEMA and normalize it in place.
+
+    Unknown severities become 'info', confidence is clamped to [0, 1], and
+    line numbers and references of the wrong type are dropped. Extra fields
+    are kept.
+
+    Returns:
+        The issue, or None if it is not an object with a string severity,
+        title and description
+    """
+    if not isinstance(issue, dict):
+        return None
+    severity, title, description = issue.get('severity'), issue.get('title'), issue.get('description')
+    if not (isinstance(severity, str) and isinstance(title, str) and isinstance(description, str)):
+        return None
+
+    severity = severity.lower()
+    issue['severity'] = severity if severity in SEVERITIES else 'info'
+
+    if not isinstance(issue.get('category'), str):
+        issue['category'] = 'general'
+
+    confidence = issue.get('confidence')
+    if isinstance(confidence, (int, float)) and not isinstance(confidence, bool):
+        issue['confidence'] = min(1.0, max(0.0, float(confidence)))
+    else:
+        issue['confidence'] = 0.8
+
+    lines = issue.get('line_numbers')
+    issue['line_numbers'] = [
+        line for line in lines if isinstance(line, int) and not isinstance(line, bool) and line > 0
+    ] if isinstance(lines, list) else []
+
+    references = issue.get('references')
+    issue['references'] = [r for r in references if isinstance(r, str)] if isinstance(references, list) else []
+
+    suggestion = issue.get('suggestion')
+    if suggestion is not None and not isinstance(suggestion, str):
+        del issue['suggestion']
+
+    return issue
+
+
+def validate_area(area: Any) -> Optional[Dict[str, Any]]:
+    """
+    Check a decoded triage area against TRIAGE_SCHEMA.
+
+    Returns:
+        {'start_line', 'end_line', 'reason'} with start_line <= end_line, or
+        None if the object has no usable line range
+    """
+    if not isinstance(area, dict):
+        return None
+    start, end = area.get('start_line'), area.get('end_line', area.get('start_line'))
+    if not all(isinstance(line, int) and not isinstance(line, bool) and line > 0 for line in (start, end)):
+        return None
+    reason = area.get('reason')
+    return {'start_line': min(start, end), 'end_line': max(start, end),
+            'reason': reason if isinstance(reason, str) else ''}
+
+
+def parse_issue_array(text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parse the issue array out of a complete response.
+
+    Returns:
+        The array's objects, or None if the response holds no complete array
+    """
+    parser = IssueStreamParser()
+    parser.feed(text)
+    return parser.issues if parser.done else None
@@ -1,135 +1,321 @@
 """
 Rule-based ML bug detection for common patterns and anti-patterns.
+
+Every check is a registered rule with a stable ID (e.g. ``DO102``), the AST
+node types it inspects, a default severity and a cost class. Rules can be
+selected or ignored by ID, and disabled rules are never executed.
 """
 import ast
 import re
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Union, Tuple, Iterable
+from dataclasses import dataclass
 
+from .issues import DetectedIssue
+from .source import SourceUnit, as_source_unit
 
-@dataclass
-class DetectedIssue:
-    """Represents a detected issue in the code."""
-    severity: str  # 'error', 'warning', 'info'
-    category: str  # 'bug', 'anti-pattern', 'optimization', 'best_practice'
-    title: str
-    description: str
-    line_numbers: Optional[List[int]] = None
-    file_path: Optional[str] = None
-    suggestion: Optional[str] = None
-    confidence: float = 0.9
-    references: Optional[List[str]] = None
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary format."""
-        result = asdict(self)
-        # Remove None values
-        return {k: v for k, v in result.items() if v is not None}
 
+@dataclass(frozen=True)
+class Rule:
+    """A registered detection rule."""
+    id: str  # Stable ID, e.g. 'DO102'
+    name: str  # Short kebab-case name, e.g. 'missing-no-grad'
+    severity: str  # Default severity of its issues
+    cost: str = 'cheap'  # 'cheap' or 'expensive'
+    node_types: Tuple[type, ...] = ()  # AST node types inspected; empty means whole-file
+    check: str = ''  # Name of the detector method implementing the rule
 
-class RuleBasedDetector:
-    """Fast rule-based detection of common ML bugs and anti-patterns."""
+
+# All rules by ID, in registration order
+RULES: Dict[str, Rule] = {}
+
+# Cost classes each profile runs
+PROFILES = {
+    'full': ('cheap', 'expensive'),
+    'fast': ('cheap',)
+}
+
+
+def rule(rule_id: str, name: str, severity: str, cost: str = 'cheap',
+         node_types: Tuple[type, ...] = ()):
+    """
+    Register a detector method as a rule.
+    
+    Whole-file rules are called as ``check(unit)``; rules with node types are
+    called as ``check(unit, node)`` for each node of those types.
+    """
+    def decorator(func):
+        RULES[rule_id] = Rule(rule_id, name, severity, cost, tuple(node_types), func.__name__)
+        func._rule_id = rule_id
+        return func
+    return decorator
+
+
+def _matches(rule_obj: Rule, codes: Iterable[str]) -> bool:
+    return any(rule_obj.id.startswith(code.upper()) or rule_obj.name == code.lower()
+               for code in codes)
+
+
+def select_rules(rules: Iterable[Rule], select: Optional[List[str]] = None,
+                 ignore: Optional[List[str]] = None, profile: str = 'full') -> List[Rule]:
+    """
+    Filter rules by ID and cost.
+    
+    Args:
+        rules: Candidate rules
+        select: Rule IDs, ID prefixes (e.g. 'DO1') or names to run (default: all)
+        ignore: Rule IDs, ID prefixes or names to skip
+        profile: 'full' runs every rule, 'fast' only cheap ones
     
-    def __init__(self):
-        self.issues = []
-        self.file_path = None
+    Returns:
+        Enabled rules, in registration order
     
-    def detect_all(self, code: str, file_path: str = None) -> List[Dict[str, Any]]:
-        """Run all detectors on the code."""
-        self.issues = []
-        self.file_path = file_path
+    Raises:
+        ValueError: If a code matches no rule or the profile is unknown
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown rule profile '{profile}' (expected one of: {', '.join(PROFILES)})")
+    
+    for code in list(select or []) + list(ignore or []):
+        if not any(_matches(r, [code]) for r in RULES.values()):
+            raise ValueError(f"Unknown rule '{code}'")
+    
+    return [
+        r for r in rules
+        if r.cost in PROFILES[profile]
+        and (not select or _matches(r, select))
+        and not (ignore and _matches(r, ignore))
+    ]
+
+
+def _check_learning_rate(optimizer_name: str, lr: float, lineno: int,
+                         file_path: Optional[str] = None) -> Optional[DetectedIssue]:
+    """Check a learning rate against typical ranges for the optimizer."""
+    if 'SGD' in optimizer_name:
+        if lr < 1e-5:
+            severity = 'warning'
+        elif lr < 1e-3:
+            severity = 'info'
+        else:
+            return None
         
-        # Parse AST
-        try:
-            tree = ast.parse(code)
-        except SyntaxError:
-            return []
+        return DetectedIssue(
+            severity=severity,
+            category='optimization',
+            title=f'Small learning rate for SGD optimizer',
+            description=f'Learning rate {lr} is small for SGD',
+            line_numbers=[lineno],
+            file_path=file_path,
+            suggestion='SGD typically uses learning rates between 0.01 and 0.1',
+            rule_id='DO110'
+        )
+    
+    elif 'Adam' in optimizer_name:
+        if lr < 1e-5:
+            return DetectedIssue(
+                severity='warning',
+                category='optimization',
+                title=f'Very small learning rate for Adam',
+                description=f'Learning rate {lr} is very small and may prevent convergence',
+                line_numbers=[lineno],
+                file_path=file_path,
+                suggestion='Adam typically uses learning rates between 1e-4 and 1e-3',
+                rule_id='DO111'
+            )
+        elif lr > 1e-2:
+            return DetectedIssue(
+                severity='info',
+                category='optimization',
+                title=f'Large learning rate for Adam',
+                description=f'Learning rate {lr} is large for Adam and may cause instability',
+                line_numbers=[lineno],
+                file_path=file_path,
+                suggestion='Adam typically uses learning rates between 1e-4 and 1e-3',
+                rule_id='DO111'
+            )
+    
+    return None
+
+
+def _optimizer_learning_rate(node: ast.Call) -> Optional[Tuple[str, float]]:
+    """Get (optimizer name, literal lr) from a call like optim.Adam(..., lr=1e-3)."""
+    if not isinstance(node.func, ast.Attribute):
+        return None
+    
+    lr = None
+    for keyword in node.keywords:
+        if keyword.arg == 'lr':
+            if isinstance(keyword.value, ast.Constant):
+                lr = keyword.value.value
+    
+    if not lr:
+        return None
+    return node.func.attr, lr
+
+
+class RuleSet:
+    """
+    Base class for detectors made of registered rules.
+    
+    Enabled rules are bound once at construction. Whole-file rules run once per
+    file; node rules are dispatched by node type during a single walk over the
+    shared AST, so each node is only offered to the rules interested in it.
+    
+    The file being checked, its issues and the running rule are kept per
+    thread, so one detector can serve several analysis threads at once.
+    """
+    
+    rules: List[Rule] = []
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.rules = [RULES[f._rule_id] for f in cls.__dict__.values() if hasattr(f, '_rule_id')]
+    
+    def __init__(self, select: Optional[List[str]] = None, ignore: Optional[List[str]] = None,
+                 profile: str = 'full'):
+        """
+        Initialize the detector with the enabled subset of its rules.
         
-        # Run all detectors
-        self._detect_train_eval_mode_issues(code, tree)
-        self._detect_missing_no_grad(code, tree)
-        self._detect_data_leakage(code, tree)
-        self._detect_gradient_accumulation_bugs(code, tree)
-        self._detect_loss_function_issues(code, tree)
-        self._detect_memory_leaks(code, tree)
-        self._detect_batch_norm_issues(code, tree)
-        self._detect_optimizer_issues(code, tree)
-        self._detect_tensor_operation_issues(code, tree)
-        self._detect_batch_size_issues(code, tree)
-        self._detect_dataloader_optimization(code, tree)
-        self._detect_initialization_issues(code, tree)
+        Args:
+            select: Rule IDs, ID prefixes or names to run (default: all)
+            ignore: Rule IDs, ID prefixes or names to skip
+            profile: 'full' runs every rule, 'fast' only cheap ones
+        """
+        self.enabled_rules = select_rules(self.rules, select, ignore, profile)
         
-        # Convert to dict format
-        return [issue.to_dict() for issue in self.issues]
+        self._local = threading.local()
+        self._order = {r.id: position for position, r in enumerate(self.rules)}
+        self._file_checks = []
+        self._node_checks = {}  # node type -> [(rule, bound check)]
+        for r in self.enabled_rules:
+            check = getattr(self, r.check)
+            if r.node_types:
+                for node_type in r.node_types:
+                    self._node_checks.setdefault(node_type, []).append((r, check))
+            else:
+                self._file_checks.append((r, check))
     
-    def _detect_train_eval_mode_issues(self, code: str, tree: ast.AST):
-        """Detect missing model.eval() or model.train() calls."""
+    @property
+    def issues(self) -> List[DetectedIssue]:
+        """Issues found so far in the file this thread is checking."""
+        return getattr(self._local, 'issues', [])
+    
+    @property
+    def file_path(self) -> Optional[str]:
+        """The file this thread is checking."""
+        return getattr(self._local, 'file_path', None)
+    
+    def _run_rules(self, unit: SourceUnit, file_path: Optional[str] = None) -> List[DetectedIssue]:
+        """Run every enabled rule over the unit."""
+        state = self._local
+        issues = state.issues = []
+        state.file_path = file_path or unit.file_path
+        
+        for rule_obj, check in self._file_checks:
+            state.rule = rule_obj
+            check(unit)
+        
+        if self._node_checks:
+            for node in unit.nodes:
+                checks = self._node_checks.get(type(node))
+                if checks:
+                    for rule_obj, check in checks:
+                        state.rule = rule_obj
+                        check(unit, node)
+        
+        state.rule = None
+        # Keep issues grouped by rule, in registration order
+        issues.sort(key=lambda issue: self._order.get(issue.rule_id, len(self._order)))
+        return issues
+    
+    def _report(self, **fields):
+        """Record an issue for the rule currently running."""
+        state = self._local
+        fields.setdefault('severity', state.rule.severity)
+        fields.setdefault('file_path', state.file_path)
+        fields.setdefault('rule_id', state.rule.id)
+        state.issues.append(DetectedIssue(**fields))
+
+
+class RuleBasedDetector(RuleSet):
+    """Fast rule-based detection of common ML bugs and anti-patterns."""
+    
+    def detect_all(self, code: Union[str, SourceUnit], file_path: str = None) -> List[DetectedIssue]:
+        """Run all enabled rules on the code (raw source or a shared SourceUnit)."""
+        unit = as_source_unit(code, file_path)
+        
+        # Parse AST (shared with the other stages through the unit)
+        if unit.tree is None:
+            return []
+        
+        return list(self._run_rules(unit, file_path))
+    
+    @rule('DO101', 'missing-eval', 'error', node_types=(ast.FunctionDef,))
+    def _detect_missing_eval(self, unit: SourceUnit, node: ast.FunctionDef):
+        """Detect missing model.eval() calls in validation/test functions."""
         validation_patterns = r'(val|valid|test|eval|inference)'
         
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                if re.search(validation_patterns, node.name, re.I):
-                    # Check if model.eval() is called
-                    has_eval = any(
-                        isinstance(n, ast.Call) and 
-                        isinstance(n.func, ast.Attribute) and 
-                        n.func.attr == 'eval'
-                        for n in ast.walk(node)
-                    )
-                    
-                    if not has_eval:
-                        self.issues.append(DetectedIssue(
-                            severity='error',
-                            category='bug',
-                            title='Missing model.eval() in validation/test function',
-                            description=f'Function "{node.name}" appears to be for validation/testing but doesn\'t call model.eval()',
-                            line_numbers=[node.lineno],
-                            file_path=self.file_path,
-                            suggestion='Add "model.eval()" at the beginning of the function and use "with torch.no_grad():" for inference'
-                        ))
+        if re.search(validation_patterns, node.name, re.I):
+            # Check if model.eval() is called
+            has_eval = any(
+                isinstance(n, ast.Call) and
+                isinstance(n.func, ast.Attribute) and
+                n.func.attr == 'eval'
+                for n in ast.walk(node)
+            )
+            
+            if not has_eval:
+                self._report(
+                    category='bug',
+                    title='Missing model.eval() in validation/test function',
+                    description=f'Function "{node.name}" appears to be for validation/testing but doesn\'t call model.eval()',
+                    line_numbers=[node.lineno],
+                    suggestion='Add "model.eval()" at the beginning of the function and use "with torch.no_grad():" for inference'
+                )
     
-    def _detect_missing_no_grad(self, code: str, tree: ast.AST):
+    @rule('DO102', 'missing-no-grad', 'warning', node_types=(ast.FunctionDef,))
+    def _detect_missing_no_grad(self, unit: SourceUnit, node: ast.FunctionDef):
         """Detect validation/inference without torch.no_grad()."""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                func_name = node.name.lower()
-                # Check if it's likely a validation/inference function
-                if any(pattern in func_name for pattern in ['val', 'test', 'eval', 'infer', 'predict']):
-                    # Check if it has backward pass (if so, it's training)
-                    has_backward = any(
-                        isinstance(n, ast.Attribute) and n.attr == 'backward'
-                        for n in ast.walk(node)
-                    )
-                    
-                    if not has_backward:
-                        # Check for no_grad usage
-                        has_no_grad = any(
-                            isinstance(n, ast.With) and 
-                            any(isinstance(item.context_expr, ast.Call) and 
-                                'no_grad' in ast.unparse(item.context_expr)
-                                for item in n.items)
-                            for n in ast.walk(node)
-                        )
-                        
-                        # Also check for decorator
-                        has_no_grad_decorator = any(
-                            isinstance(dec, ast.Name) and 'no_grad' in dec.id or
-                            isinstance(dec, ast.Attribute) and dec.attr == 'no_grad'
-                            for dec in node.decorator_list
-                        )
-                        
-                        if not has_no_grad and not has_no_grad_decorator:
-                            self.issues.append(DetectedIssue(
-                                severity='warning',
-                                category='performance',
-                                title=f'Missing torch.no_grad() in {node.name} function',
-                                description='Inference code should use torch.no_grad() to save memory and improve speed',
-                                line_numbers=[node.lineno],
-                                file_path=self.file_path,
-                                suggestion='Wrap inference code with "with torch.no_grad():" or use @torch.no_grad() decorator'
-                            ))
-    
-    def _detect_data_leakage(self, code: str, tree: ast.AST):
+        func_name = node.name.lower()
+        # Check if it's likely a validation/inference function
+        if not any(pattern in func_name for pattern in ['val', 'test', 'eval', 'infer', 'predict']):
+            return
+        
+        # Check if it has backward pass (if so, it's training)
+        has_backward = any(
+            isinstance(n, ast.Attribute) and n.attr == 'backward'
+            for n in ast.walk(node)
+        )
+        
+        if not has_backward:
+            # Check for no_grad usage
+            has_no_grad = any(
+                isinstance(n, ast.With) and
+                any(isinstance(item.context_expr, ast.Call) and
+                    'no_grad' in ast.unparse(item.context_expr)
+                    for item in n.items)
+                for n in ast.walk(node)
+            )
+            
+            # Also check for decorator
+            has_no_grad_decorator = any(
+                isinstance(dec, ast.Name) and 'no_grad' in dec.id or
+                isinstance(dec, ast.Attribute) and dec.attr == 'no_grad'
+                for dec in node.decorator_list
+            )
+            
+            if not has_no_grad and not has_no_grad_decorator:
+                self._report(
+                    category='performance',
+                    title=f'Missing torch.no_grad() in {node.name} function',
+                    description='Inference code should use torch.no_grad() to save memory and improve speed',
+                    line_numbers=[node.lineno],
+                    suggestion='Wrap inference code with "with torch.no_grad():" or use @torch.no_grad() decorator'
+                )
+    
+    @rule('DO103', 'data-leakage', 'error')
+    def _detect_data_leakage(self, unit: SourceUnit):
         """Detect potential data leakage issues."""
         normalization_patterns = [
             (r'(train|test).*\.mean\(\)', 'Using dataset-wide statistics'),
@@ -138,321 +324,389 @@ class RuleBasedDetector:
         ]
         
         for pattern, issue in normalization_patterns:
-            if re.search(pattern, code, re.I):
-                self.issues.append(DetectedIssue(
-                    severity='error',
+            if re.search(pattern, unit.code, re.I):
+                self._report(
                     category='bug',
                     title='Potential data leakage detected',
                     description=f'{issue} - this can leak test set information into training',
-                    file_path=self.file_path,
                     suggestion='Compute normalization statistics only on training data, then apply to validation/test sets'
-                ))
+                )
     
-    def _detect_gradient_accumulation_bugs(self, code: str, tree: ast.AST):
+    @rule('DO104', 'unscaled-gradient-accumulation', 'error')
+    def _detect_gradient_accumulation_bugs(self, unit: SourceUnit):
         """Detect incorrect gradient accumulation implementations."""
-        if 'accumulation_steps' in code or 'gradient_accumulation' in code:
+        if 'accumulation_steps' in unit.code or 'gradient_accumulation' in unit.code:
             # Check if loss is being scaled
-            loss_scaled = bool(re.search(r'loss\s*/\s*\w*accumulation', code))
+            loss_scaled = bool(re.search(r'loss\s*/\s*\w*accumulation', unit.code))
             
             if not loss_scaled:
-                self.issues.append(DetectedIssue(
-                    severity='error',
+                self._report(
                     category='bug',
                     title='Gradient accumulation without loss scaling',
                     description='When using gradient accumulation, loss must be divided by accumulation steps',
-                    file_path=self.file_path,
                     suggestion='Scale loss by dividing by accumulation_steps: loss = loss / accumulation_steps'
-                ))
-    
-    def _detect_loss_function_issues(self, code: str, tree: ast.AST):
-        """Detect incorrect loss function usage."""
-        # MSE for classification
-        if 'MSELoss' in code and ('classification' in code.lower() or 'classify' in code.lower()):
-            self.issues.append(DetectedIssue(
-                severity='error',
+                )
+    
+    @rule('DO105', 'mse-for-classification', 'error')
+    def _detect_mse_for_classification(self, unit: SourceUnit):
+        """Detect MSE loss used for classification."""
+        if 'MSELoss' in unit.code and ('classification' in unit.lower or 'classify' in unit.lower):
+            self._report(
                 category='bug',
                 title='Using MSE loss for classification',
                 description='MSELoss is inappropriate for classification tasks',
-                file_path=self.file_path,
                 suggestion='Use CrossEntropyLoss for multi-class or BCEWithLogitsLoss for binary classification'
-            ))
-        
-        # CrossEntropyLoss with binary
-        if 'CrossEntropyLoss' in code and 'binary' in code.lower():
-            self.issues.append(DetectedIssue(
-                severity='warning',
+            )
+    
+    @rule('DO106', 'cross-entropy-for-binary', 'warning')
+    def _detect_cross_entropy_for_binary(self, unit: SourceUnit):
+        """Detect CrossEntropyLoss used for binary classification."""
+        if 'CrossEntropyLoss' in unit.code and 'binary' in unit.lower:
+            self._report(
                 category='bug',
                 title='Using CrossEntropyLoss for binary classification',
                 description='CrossEntropyLoss is typically used for multi-class classification',
-                file_path=self.file_path,
                 suggestion='Use BCEWithLogitsLoss for binary classification tasks'
-            ))
-        
-        # BCE without sigmoid
-        if 'BCELoss' in code and ('logits' in code.lower() or ('sigmoid' not in code and 'BCEWithLogitsLoss' not in code)):
-            self.issues.append(DetectedIssue(
-                severity='warning',
+            )
+    
+    @rule('DO107', 'bce-without-sigmoid', 'warning')
+    def _detect_bce_without_sigmoid(self, unit: SourceUnit):
+        """Detect BCELoss applied to raw logits."""
+        if 'BCELoss' in unit.code and ('logits' in unit.lower or ('sigmoid' not in unit.code and 'BCEWithLogitsLoss' not in unit.code)):
+            self._report(
                 category='bug',
                 title='BCELoss without sigmoid activation',
                 description='BCELoss expects inputs in range [0,1], usually from sigmoid',
-                file_path=self.file_path,
                 suggestion='Either add sigmoid to model output or use BCEWithLogitsLoss which includes sigmoid'
-            ))
+            )
     
-    def _detect_memory_leaks(self, code: str, tree: ast.AST):
+    @rule('DO108', 'loss-accumulation-leak', 'error')
+    def _detect_memory_leaks(self, unit: SourceUnit):
         """Detect potential memory leaks in training loops."""
         # Look for loss accumulation without .item()
-        if re.search(r'(total_loss|running_loss)\s*\+=\s*loss(?!\.item)', code):
-            self.issues.append(DetectedIssue(
-                severity='error',
+        if re.search(r'(total_loss|running_loss)\s*\+=\s*loss(?!\.item)', unit.code):
+            self._report(
                 category='bug',
                 title='Memory leak: accumulating loss without .item()',
                 description='Accumulating loss tensors keeps computation graph in memory',
-                file_path=self.file_path,
                 suggestion='Use loss.item() when accumulating losses: total_loss += loss.item()'
-            ))
-    
-    def _detect_batch_norm_issues(self, code: str, tree: ast.AST):
-        """Detect batch normalization issues."""
-        # BatchNorm with batch_size=1 - use AST for better detection
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                # Check for batch_size = 1
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == 'batch_size':
-                        if isinstance(node.value, ast.Constant) and node.value.value == 1:
-                            if 'BatchNorm' in code:
-                                self.issues.append(DetectedIssue(
-                                    severity='error',
-                                    category='bug',
-                                    title='BatchNorm with batch_size=1',
-                                    description='BatchNorm doesn\'t work properly with batch_size=1',
-                                    line_numbers=[node.lineno],
-                                    file_path=self.file_path,
-                                    suggestion='Use GroupNorm, LayerNorm, or InstanceNorm for small batch sizes'
-                                ))
-    
-    def _detect_optimizer_issues(self, code: str, tree: ast.AST):
-        """Detect optimizer-related issues."""
-        # Use AST to find optimizer instantiations
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Attribute):
-                    optimizer_name = node.func.attr
-                    
-                    # Extract learning rate
-                    lr = None
-                    for keyword in node.keywords:
-                        if keyword.arg == 'lr':
-                            if isinstance(keyword.value, ast.Constant):
-                                lr = keyword.value.value
-                    
-                    if lr:
-                        # Check learning rate ranges based on optimizer
-                        if 'SGD' in optimizer_name:
-                            if lr < 1e-5:
-                                severity = 'warning'
-                                suggestion = 'SGD typically uses learning rates between 0.01 and 0.1'
-                            elif lr < 1e-3:
-                                severity = 'info'
-                                suggestion = 'SGD typically uses learning rates between 0.01 and 0.1'
-                            else:
-                                continue
-                                
-                            self.issues.append(DetectedIssue(
-                                severity=severity,
-                                category='optimization',
-                                title=f'Small learning rate for SGD optimizer',
-                                description=f'Learning rate {lr} is small for SGD',
-                                line_numbers=[node.lineno],
-                                file_path=self.file_path,
-                                suggestion=suggestion
-                            ))
-                        
-                        elif 'Adam' in optimizer_name:
-                            if lr < 1e-5:
-                                self.issues.append(DetectedIssue(
-                                    severity='warning',
-                                    category='optimization',
-                                    title=f'Very small learning rate for Adam',
-                                    description=f'Learning rate {lr} is very small and may prevent convergence',
-                                    line_numbers=[node.lineno],
-                                    file_path=self.file_path,
-                                    suggestion='Adam typically uses learning rates between 1e-4 and 1e-3'
-                                ))
-                            elif lr > 1e-2:
-                                self.issues.append(DetectedIssue(
-                                    severity='info',
-                                    category='optimization',
-                                    title=f'Large learning rate for Adam',
-                                    description=f'Learning rate {lr} is large for Adam and may cause instability',
-                                    line_numbers=[node.lineno],
-                                    file_path=self.file_path,
-                                    suggestion='Adam typically uses learning rates between 1e-4 and 1e-3'
-                                ))
-    
-    def _detect_tensor_operation_issues(self, code: str, tree: ast.AST):
-        """Detect inefficient tensor operations."""
-        # .cpu().numpy() in loops
-        if re.search(r'for.*\.cpu\(\)\.numpy\(\)', code, re.S):
-            self.issues.append(DetectedIssue(
-                severity='warning',
+            )
+    
+    @rule('DO109', 'batchnorm-batch-size-one', 'error', node_types=(ast.Assign,))
+    def _detect_batch_norm_issues(self, unit: SourceUnit, node: ast.Assign):
+        """Detect BatchNorm used with batch_size = 1."""
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id == 'batch_size':
+                if isinstance(node.value, ast.Constant) and node.value.value == 1:
+                    if 'BatchNorm' in unit.code:
+                        self._report(
+                            category='bug',
+                            title='BatchNorm with batch_size=1',
+                            description='BatchNorm doesn\'t work properly with batch_size=1',
+                            line_numbers=[node.lineno],
+                            suggestion='Use GroupNorm, LayerNorm, or InstanceNorm for small batch sizes'
+                        )
+    
+    @rule('DO110', 'sgd-learning-rate', 'info', node_types=(ast.Call,))
+    def _detect_sgd_learning_rate(self, unit: SourceUnit, node: ast.Call):
+        """Detect SGD learning rates below the usual range."""
+        optimizer = _optimizer_learning_rate(node)
+        if optimizer and 'SGD' in optimizer[0]:
+            issue = _check_learning_rate(optimizer[0], optimizer[1], node.lineno, self.file_path)
+            if issue:
+                self.issues.append(issue)
+    
+    @rule('DO111', 'adam-learning-rate', 'warning', node_types=(ast.Call,))
+    def _detect_adam_learning_rate(self, unit: SourceUnit, node: ast.Call):
+        """Detect Adam learning rates outside the usual range."""
+        optimizer = _optimizer_learning_rate(node)
+        if optimizer and 'Adam' in optimizer[0] and 'SGD' not in optimizer[0]:
+            issue = _check_learning_rate(optimizer[0], optimizer[1], node.lineno, self.file_path)
+            if issue:
+                self.issues.append(issue)
+    
+    @rule('DO112', 'cpu-transfer-in-loop', 'warning', cost='expensive')
+    def _detect_cpu_transfer_in_loop(self, unit: SourceUnit):
+        """Detect .cpu().numpy() inside loops."""
+        if re.search(r'for.*\.cpu\(\)\.numpy\(\)', unit.code, re.S):
+            self._report(
                 category='performance',
                 title='CPU transfer inside loop',
                 description='Calling .cpu().numpy() inside loops is inefficient',
-                file_path=self.file_path,
                 suggestion='Batch operations and move to CPU once after the loop'
-            ))
-        
-        # Creating tensors on wrong device
-        if 'torch.tensor' in code and 'cuda' in code and 'device=' not in code:
-            self.issues.append(DetectedIssue(
-                severity='warning',
+            )
+    
+    @rule('DO113', 'tensor-without-device', 'warning')
+    def _detect_tensor_without_device(self, unit: SourceUnit):
+        """Detect tensors created on CPU in GPU code."""
+        if 'torch.tensor' in unit.code and 'cuda' in unit.code and 'device=' not in unit.code:
+            self._report(
                 category='performance',
                 title='Creating tensors without specifying device',
                 description='Creating tensors on CPU then moving to GPU is inefficient',
-                file_path=self.file_path,
                 suggestion='Create tensors directly on target device: torch.tensor(..., device=device)'
-            ))
+            )
     
-    def _detect_batch_size_issues(self, code: str, tree: ast.AST):
+    @rule('DO114', 'small-batch-size', 'warning', node_types=(ast.Assign,))
+    def _detect_batch_size_issues(self, unit: SourceUnit, node: ast.Assign):
         """Detect batch size issues."""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and 'batch' in target.id.lower():
-                        if isinstance(node.value, ast.Constant):
-                            batch_size = node.value.value
-                            if batch_size == 1:
-                                self.issues.append(DetectedIssue(
-                                    severity='warning',
-                                    category='performance',
-                                    title='Batch size of 1 detected',
-                                    description='Batch size of 1 is inefficient for training',
-                                    line_numbers=[node.lineno],
-                                    file_path=self.file_path,
-                                    suggestion='Use larger batch sizes (16-128) for better GPU utilization'
-                                ))
-                            elif batch_size < 16:
-                                self.issues.append(DetectedIssue(
-                                    severity='info',
-                                    category='performance',
-                                    title=f'Small batch size ({batch_size}) detected',
-                                    description='Small batch sizes may not fully utilize GPU',
-                                    line_numbers=[node.lineno],
-                                    file_path=self.file_path,
-                                    suggestion='Consider using batch sizes of 16 or larger for better GPU utilization'
-                                ))
-    
-    def _detect_dataloader_optimization(self, code: str, tree: ast.AST):
-        """Detect missing DataLoader optimizations."""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if hasattr(node.func, 'id') and node.func.id == 'DataLoader':
-                    # Check for missing optimizations
-                    has_num_workers = any(kw.arg == 'num_workers' for kw in node.keywords)
-                    has_pin_memory = any(kw.arg == 'pin_memory' for kw in node.keywords)
-                    has_shuffle = any(kw.arg == 'shuffle' for kw in node.keywords)
-                    
-                    if not has_num_workers:
-                        self.issues.append(DetectedIssue(
-                            severity='info',
+        for target in node.targets:
+            if isinstance(target, ast.Name) and 'batch' in target.id.lower():
+                if isinstance(node.value, ast.Constant):
+                    batch_size = node.value.value
+                    if batch_size == 1:
+                        self._report(
                             category='performance',
-                            title='DataLoader without num_workers',
-                            description='Using default num_workers=0 means no parallel data loading',
+                            title='Batch size of 1 detected',
+                            description='Batch size of 1 is inefficient for training',
                             line_numbers=[node.lineno],
-                            file_path=self.file_path,
-                            suggestion='Set num_workers=4 (or number of CPU cores) for faster data loading'
-                        ))
-                    
-                    if not has_pin_memory and 'cuda' in code:
-                        self.issues.append(DetectedIssue(
+                            suggestion='Use larger batch sizes (16-128) for better GPU utilization'
+                        )
+                    elif batch_size < 16:
+                        self._report(
                             severity='info',
                             category='performance',
-                            title='DataLoader without pin_memory for GPU training',
-                            description='pin_memory=True can speed up GPU data transfer',
+                            title=f'Small batch size ({batch_size}) detected',
+                            description='Small batch sizes may not fully utilize GPU',
                             line_numbers=[node.lineno],
-                            file_path=self.file_path,
-                            suggestion='Add pin_memory=True when training on GPU'
-                        ))
-    
-    def _detect_initialization_issues(self, code: str, tree: ast.AST):
-        """Detect missing weight initialization."""
-        # Look for custom nn.Module classes
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Check if it's likely a neural network module
-                inherits_module = any(
-                    (isinstance(base, ast.Name) and 'Module' in base.id) or
-                    (isinstance(base, ast.Attribute) and base.attr == 'Module')
-                    for base in node.bases
+                            suggestion='Consider using batch sizes of 16 or larger for better GPU utilization'
+                        )
+    
+    @rule('DO115', 'dataloader-num-workers', 'info', node_types=(ast.Call,))
+    def _detect_dataloader_num_workers(self, unit: SourceUnit, node: ast.Call):
+        """Detect DataLoaders without parallel loading."""
+        if hasattr(node.func, 'id') and node.func.id == 'DataLoader':
+            if not any(kw.arg == 'num_workers' for kw in node.keywords):
+                self._report(
+                    category='performance',
+                    title='DataLoader without num_workers',
+                    description='Using default num_workers=0 means no parallel data loading',
+                    line_numbers=[node.lineno],
+                    suggestion='Set num_workers=4 (or number of CPU cores) for faster data loading'
+                )
+    
+    @rule('DO116', 'dataloader-pin-memory', 'info', node_types=(ast.Call,))
+    def _detect_dataloader_pin_memory(self, unit: SourceUnit, node: ast.Call):
+        """Detect DataLoaders without pinned memory in GPU code."""
+        if hasattr(node.func, 'id') and node.func.id == 'DataLoader':
+            if not any(kw.arg == 'pin_memory' for kw in node.keywords) and 'cuda' in unit.code:
+                self._report(
+                    category='performance',
+                    title='DataLoader without pin_memory for GPU training',
+                    description='pin_memory=True can speed up GPU data transfer',
+                    line_numbers=[node.lineno],
+                    suggestion='Add pin_memory=True when training on GPU'
                 )
+    
+    @rule('DO117', 'missing-weight-init', 'info', cost='expensive', node_types=(ast.ClassDef,))
+    def _detect_initialization_issues(self, unit: SourceUnit, node: ast.ClassDef):
+        """Detect missing weight initialization in custom nn.Module classes."""
+        # Check if it's likely a neural network module
+        inherits_module = any(
+            (isinstance(base, ast.Name) and 'Module' in base.id) or
+            (isinstance(base, ast.Attribute) and base.attr == 'Module')
+            for base in node.bases
+        )
+        
+        if inherits_module:
+            # Check if there's any initialization
+            has_init = any(
+                'init' in ast.unparse(n).lower() and
+                any(init_func in ast.unparse(n) for init_func in
+                    ['xavier', 'kaiming', 'normal_', 'uniform_', 'orthogonal'])
+                for n in ast.walk(node)
+            )
+            
+            if not has_init:
+                self._report(
+                    category='best_practice',
+                    title=f'No explicit weight initialization in {node.name}',
+                    description='Custom models benefit from proper weight initialization',
+                    line_numbers=[node.lineno],
+                    suggestion='Consider using kaiming_uniform_ or xavier_uniform_ initialization'
+                )
+
+
+class ProjectRuleDetector:
+    """
+    Rules that need facts from more than one file.
+    
+    Runs over a ProjectIndex built in a single pass over the project, so no
+    file is re-parsed. Call sites are resolved once up front; per-file lookups
+    are then dictionary hits. Cross-file findings reuse the IDs of the per-file
+    rules they extend and follow the same selection.
+    """
+    
+    def __init__(self, index, select: Optional[List[str]] = None,
+                 ignore: Optional[List[str]] = None, profile: str = 'full'):
+        """
+        Initialize from a built ProjectIndex.
+        
+        Args:
+            index: ProjectIndex covering all analyzed files
+            select: Rule IDs, ID prefixes or names to run (default: all)
+            ignore: Rule IDs, ID prefixes or names to skip
+            profile: 'full' runs every rule, 'fast' only cheap ones
+        """
+        self.index = index
+        self.enabled = {r.id for r in select_rules(RULES.values(), select, ignore, profile)}
+        self.call_sites_by_callee = {}  # callee qualname -> [(file, call site)]
+        self.issues_by_file = {}
+        
+        for file_path, info in index.modules.items():
+            for site in info.call_sites:
+                symbol = index.resolve(site['callee'], file_path)
+                if symbol is not None:
+                    self.call_sites_by_callee.setdefault(symbol.qualname, []).append((file_path, site))
+        
+        if 'DO116' in self.enabled:
+            self._detect_cross_file_pin_memory()
+        if 'DO110' in self.enabled or 'DO111' in self.enabled:
+            self._detect_imported_learning_rates()
+    
+    def detect_all(self, file_path: str) -> List[DetectedIssue]:
+        """Get project-level issues reported against a file."""
+        return list(self.issues_by_file.get(str(file_path), []))
+    
+    def filter_issues(self, file_path: str, issues: List[DetectedIssue]) -> List[DetectedIssue]:
+        """
+        Drop per-file findings that other files prove to be false positives.
+        
+        A validation function without torch.no_grad() (DO102) is fine when
+        every call site in the project already runs it under
+        no_grad/inference_mode.
+        """
+        info = self.index.modules.get(str(file_path))
+        if info is None:
+            return issues
+        
+        functions_by_line = {s.lineno: s for s in info.symbols if s.kind in ('function', 'method')}
+        
+        kept = []
+        for issue in issues:
+            if issue.get('rule_id') == 'DO102':
+                lines = issue.get('line_numbers') or []
+                symbol = functions_by_line.get(lines[0]) if lines else None
+                if symbol is not None:
+                    sites = self.call_sites_by_callee.get(symbol.qualname, [])
+                    if sites and all(site['no_grad'] for _, site in sites):
+                        continue
+            kept.append(issue)
+        
+        return kept
+    
+    def _add(self, file_path: str, issue: DetectedIssue):
+        self.issues_by_file.setdefault(file_path, []).append(issue)
+    
+    def _detect_cross_file_pin_memory(self):
+        """DataLoader built in a CPU-only module but consumed by GPU training code elsewhere."""
+        # Modules importing each module-level name, e.g. {'data.train_loader': {train.py}}
+        importers = {}
+        for file_path, info in self.index.modules.items():
+            for qualified in info.imports.values():
+                importers.setdefault(qualified, set()).add(file_path)
+        
+        for file_path, info in self.index.modules.items():
+            if info.uses_cuda:
+                # Same-file case is covered by RuleBasedDetector
+                continue
+            
+            for loader in info.dataloaders:
+                if 'pin_memory' in loader['keywords']:
+                    continue
+                
+                consumers = set()
+                if loader['target']:
+                    consumers |= importers.get(f"{info.module}.{loader['target']}", set())
+                if loader['scope'] != info.module:
+                    consumers |= {f for f, _ in self.call_sites_by_callee.get(loader['scope'], [])}
                 
-                if inherits_module:
-                    # Check if there's any initialization
-                    has_init = any(
-                        'init' in ast.unparse(n).lower() and 
-                        any(init_func in ast.unparse(n) for init_func in 
-                            ['xavier', 'kaiming', 'normal_', 'uniform_', 'orthogonal'])
-                        for n in ast.walk(node)
+                gpu_consumers = sorted(
+                    f for f in consumers
+                    if f != file_path and self.index.modules[f].uses_cuda
+                )
+                if gpu_consumers:
+                    used_in = ', '.join(Path(f).name for f in gpu_consumers[:3])
+                    self._add(file_path, DetectedIssue(
+                        severity='info',
+                        category='performance',
+                        title='DataLoader without pin_memory for GPU training',
+                        description=f'This DataLoader feeds GPU training code in {used_in}; pin_memory=True can speed up host-to-device transfer',
+                        line_numbers=[loader['lineno']],
+                        file_path=file_path,
+                        suggestion='Add pin_memory=True when training on GPU',
+                        rule_id='DO116'
+                    ))
+    
+    def _detect_imported_learning_rates(self):
+        """Learning rates passed by name, resolved to constants defined anywhere in the project."""
+        for file_path, info in self.index.modules.items():
+            for optimizer in info.optimizers:
+                if optimizer['lr'] is not None or not optimizer['lr_name']:
+                    continue
+                
+                lr = self.index.resolve_constant(optimizer['lr_name'], file_path)
+                if lr:
+                    issue = _check_learning_rate(
+                        optimizer['name'], lr, optimizer['lineno'], file_path
                     )
-                    
-                    if not has_init:
-                        self.issues.append(DetectedIssue(
-                            severity='info',
-                            category='best_practice',
-                            title=f'No explicit weight initialization in {node.name}',
-                            description='Custom models benefit from proper weight initialization',
-                            line_numbers=[node.lineno],
-                            file_path=self.file_path,
-                            suggestion='Consider using kaiming_uniform_ or xavier_uniform_ initialization'
-                        ))
+                    if issue and issue.rule_id in self.enabled:
+                        issue.description += f" (from {optimizer['lr_name']})"
+                        self._add(file_path, issue)
+
 
+def _layer_counts(unit: SourceUnit) -> Tuple[int, int]:
+    """Count convolutional and linear layers mentioned in the code."""
+    conv_count = len(re.findall(r'Conv2d', unit.code))
+    linear_count = len(re.findall(r'Linear\(|nn\.Linear', unit.code))
+    return conv_count, linear_count
 
-class AntiPatternDetector:
+
+class AntiPatternDetector(RuleSet):
     """Detects ML anti-patterns and suboptimal implementations."""
     
-    def detect_architecture_issues(self, model_code: str) -> List[Dict[str, Any]]:
+    def detect_architecture_issues(self, model_code: Union[str, SourceUnit]) -> List[DetectedIssue]:
         """Detect architecture-specific anti-patterns."""
-        issues = []
-        
-        # Deep network without skip connections
-        conv_count = len(re.findall(r'Conv2d', model_code))
-        linear_count = len(re.findall(r'Linear\(|nn\.Linear', model_code))
-        total_layers = conv_count + linear_count
+        unit = as_source_unit(model_code)
+        return list(self._run_rules(unit))
+    
+    @rule('DO201', 'deep-network-without-skip', 'warning')
+    def _detect_missing_skip_connections(self, unit: SourceUnit):
+        """Detect deep networks without skip connections."""
+        total_layers = sum(_layer_counts(unit))
         
         if total_layers > 10:
             # Check for residual connections
-            has_residual = any(pattern in model_code for pattern in 
+            has_residual = any(pattern in unit.code for pattern in
                               ['x +', '+ x', 'residual =', 'skip', 'identity'])
             
             if not has_residual:
-                issues.append({
-                    'severity': 'warning',
-                    'category': 'anti-pattern',
-                    'title': 'Deep network without skip connections',
-                    'description': f'Network has {total_layers} layers but no apparent residual connections',
-                    'suggestion': 'Consider adding skip connections for better gradient flow in deep networks'
-                })
-        
-        # Sigmoid/tanh in deep networks
-        if total_layers > 5 and ('sigmoid' in model_code.lower() or 'tanh' in model_code.lower()):
-            issues.append({
-                'severity': 'warning',
-                'category': 'anti-pattern',
-                'title': 'Sigmoid/Tanh activation in deep network',
-                'description': 'Sigmoid/Tanh can cause vanishing gradients in deep networks',
-                'suggestion': 'Use ReLU, LeakyReLU, or GELU for better gradient flow'
-            })
-        
-        # No normalization in deep networks
-        if conv_count > 3 and not any(norm in model_code for norm in ['BatchNorm', 'LayerNorm', 'GroupNorm']):
-            issues.append({
-                'severity': 'warning',
-                'category': 'anti-pattern',
-                'title': 'No normalization layers in deep network',
-                'description': 'Deep networks typically benefit from normalization layers',
-                'suggestion': 'Add BatchNorm2d after convolutional layers for training stability'
-            })
-        
-        return issues
\ No newline at end of file
+                self._report(
+                    category='anti-pattern',
+                    title='Deep network without skip connections',
+                    description=f'Network has {total_layers} layers but no apparent residual connections',
+                    suggestion='Consider adding skip connections for better gradient flow in deep networks'
+                )
+    
+    @rule('DO202', 'saturating-activation', 'warning')
+    def _detect_saturating_activations(self, unit: SourceUnit):
+        """Detect sigmoid/tanh activations in deep networks."""
+        if sum(_layer_counts(unit)) > 5 and ('sigmoid' in unit.lower or 'tanh' in unit.lower):
+            self._report(
+                category='anti-pattern',
+                title='Sigmoid/Tanh activation in deep network',
+                description='Sigmoid/Tanh can cause vanishing gradients in deep networks',
+                suggestion='Use ReLU, LeakyReLU, or GELU for better gradient flow'
+            )
+    
+    @rule('DO203', 'missing-normalization', 'warning')
+    def _detect_missing_normalization(self, unit: SourceUnit):
+        """Detect deep convolutional networks without normalization layers."""
+        conv_count, _ = _layer_counts(unit)
+        if conv_count > 3 and not any(norm in unit.code for norm in ['BatchNorm', 'LayerNorm', 'GroupNorm']):
+            self._report(
+                category='anti-pattern',
+                title='No normalization layers in deep network',
+                description='Deep networks typically benefit from normalization layers',
+                suggestion='Add BatchNorm2d after convolutional layers for training stability'
+            )
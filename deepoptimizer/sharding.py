@@ -0,0 +1,126 @@
+"""
+Deterministic partitioning of a project's files across machines.
+
+``analyze --shard K/N`` analyzes only the files of shard K out of N, so a
+large tree can be scanned by N CI runners at once and the reports combined
+with ``deepoptimizer merge``. Every runner computes the same partition on
+its own: by default a file's shard is a stable hash of its path relative to
+the project root, so files stay on their shard as the tree grows. With
+timings from an earlier report, files are instead assigned greedily
+(longest first, to the least loaded shard) so shards take about equally
+long; files without a timing are estimated from their size.
+"""
+import hashlib
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard spec such as '2/8'.
+
+    Returns:
+        Tuple of (index, count), index counted from 1
+
+    Raises:
+        ValueError: If the spec is malformed or the index is out of range
+    """
+    index, sep, count = spec.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}' (expected K/N, e.g. 2/8)") from None
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}' (expected K/N with 1 <= K <= N)")
+    return index, count
+
+
+def relative_key(file_path: Union[str, Path], root: Union[str, Path]) -> str:
+    """A file's '/'-separated path relative to the project root (the same on every machine)."""
+    try:
+        return Path(file_path).relative_to(root).as_posix()
+    except ValueError:
+        return Path(file_path).as_posix()
+
+
+def shard_of(key: str, count: int) -> int:
+    """Shard (from 1) of a file, by a stable hash of its relative path."""
+    digest = hashlib.sha1(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def balance(sizes: Dict[str, int], count: int, timings: Dict[str, float]) -> Dict[str, int]:
+    """
+    Assign files to shards so their expected durations are about equal.
+
+    Args:
+        sizes: File size in bytes by relative path
+        count: Number of shards
+        timings: Seconds per file from an earlier run, by relative path
+
+    Returns:
+        Shard (from 1) by relative path
+    """
+    # Files without a timing cost what their size predicts at the known rate
+    known = [key for key in sizes if key in timings]
+    known_bytes = sum(sizes[key] for key in known)
+    rate = sum(timings[key] for key in known) / known_bytes if known_bytes else 1.0
+    costs = {key: timings[key] if key in timings else sizes[key] * rate for key in sizes}
+
+    loads = [(0.0, shard) for shard in range(1, count + 1)]
+    assignment = {}
+    for key in sorted(costs, key=lambda key: (-costs[key], key)):
+        load, shard = heapq.heappop(loads)
+        assignment[key] = shard
+        heapq.heappush(loads, (load + costs[key], shard))
+    return assignment
+
+
+def select_files(files: Iterable[Path], root: Union[str, Path], shard: Tuple[int, int],
+                 timings: Optional[Dict[str, float]] = None) -> Set[Path]:
+    """
+    The files of one shard, balanced by timings when given (see balance()).
+
+    Args:
+        files: All files of the project (every shard must see the same list)
+        root: Project root
+        shard: (index, count), index counted from 1
+        timings: Seconds per file by relative path (see load_timings)
+    """
+    index, count = shard
+    keys = {relative_key(file_path, root): file_path for file_path in files}
+    if timings is None:
+        return {file_path for key, file_path in keys.items() if shard_of(key, count) == index}
+
+    sizes = {}
+    for key, file_path in keys.items():
+        try:
+            sizes[key] = file_path.stat().st_size
+        except OSError:
+            sizes[key] = 0
+    assignment = balance(sizes, count, timings)
+    return {keys[key] for key, assigned in assignment.items() if assigned == index}
+
+
+def load_timings(report_path: Union[str, Path]) -> Dict[str, float]:
+    """
+    Per-file seconds from a JSON project report (of 'analyze' or 'merge').
+
+    Returns:
+        Seconds by path relative to the report's project root
+
+    Raises:
+        ValueError: If the file is not a JSON project report
+    """
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Cannot read timings from {report_path}: {e}") from None
+    if not isinstance(report, dict) or not isinstance(report.get('file_timings'), dict):
+        raise ValueError(f"{report_path} is not a JSON project report with file timings")
+    root = report.get('project_path', '')
+    return {relative_key(file_path, root): float(seconds)
+            for file_path, seconds in report['file_timings'].items()}
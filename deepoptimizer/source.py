@@ -0,0 +1,113 @@
+"""
+Parse-once view of a source file shared by every analysis stage.
+"""
+import ast
+import bisect
+import re
+from functools import cached_property
+from typing import List, Optional, Set, Union
+
+
+class SourceUnit:
+    """
+    Source code plus derived artifacts, each computed at most once.
+
+    Rule detection, anti-pattern detection, prompt building, knowledge base
+    lookup and caching all consume the same unit, so large files are parsed
+    and lowercased once per analysis instead of once per stage.
+    """
+
+    def __init__(self, code: str, file_path: Optional[str] = None):
+        """
+        Initialize a source unit.
+
+        Args:
+            code: Python source code
+            file_path: Optional file path for context
+        """
+        self.code = code
+        self.file_path = file_path
+        self.syntax_error: Optional[SyntaxError] = None
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    @cached_property
+    def lower(self) -> str:
+        """Lowercased source, for case-insensitive substring checks."""
+        return self.code.lower()
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """Source split into lines."""
+        return self.code.split('\n')
+
+    @cached_property
+    def line_offsets(self) -> List[int]:
+        """Character offset at which each line starts."""
+        offsets = [0]
+        for match in re.finditer('\n', self.code):
+            offsets.append(match.end())
+        return offsets
+
+    @cached_property
+    def tree(self) -> Optional[ast.Module]:
+        """Parsed AST, or None if the code has a syntax error."""
+        try:
+            return ast.parse(self.code)
+        except SyntaxError as e:
+            self.syntax_error = e
+            return None
+
+    @cached_property
+    def nodes(self) -> List[ast.AST]:
+        """All AST nodes in walk order (empty if the code does not parse)."""
+        if self.tree is None:
+            return []
+        return list(ast.walk(self.tree))
+
+    @cached_property
+    def identifiers(self) -> Set[str]:
+        """Every name, attribute, function, class and argument name used in the code."""
+        names = set()
+        for node in self.nodes:
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+            elif isinstance(node, ast.Attribute):
+                names.add(node.attr)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(node.name)
+            elif isinstance(node, ast.arg):
+                names.add(node.arg)
+        return names
+
+    @cached_property
+    def imports(self) -> Set[str]:
+        """Top-level names of imported modules (e.g. 'torch' for 'import torch.nn')."""
+        modules = set()
+
+        if self.tree is not None:
+            for node in self.nodes:
+                if isinstance(node, ast.Import):
+                    for alias in node.names:
+                        modules.add(alias.name.split('.')[0])
+                elif isinstance(node, ast.ImportFrom):
+                    if node.module and not node.level:
+                        modules.add(node.module.split('.')[0])
+        else:
+            # Fallback to regex if AST parsing fails
+            for pattern in (r'^\s*import\s+(\w+)', r'^\s*from\s+(\w+)'):
+                modules.update(re.findall(pattern, self.code, re.MULTILINE))
+
+        return modules
+
+    def line_for_offset(self, offset: int) -> int:
+        """Convert a character offset (e.g. from a regex match) into a 1-based line number."""
+        return bisect.bisect_right(self.line_offsets, offset)
+
+
+def as_source_unit(code: Union[str, SourceUnit], file_path: Optional[str] = None) -> SourceUnit:
+    """Wrap raw code in a SourceUnit (units are passed through unchanged)."""
+    if isinstance(code, SourceUnit):
+        return code
+    return SourceUnit(code, file_path)
@@ -0,0 +1,246 @@
+"""
+Deadlines and cooperative cancellation for analysis work.
+
+A Deadline is shared between the coordinator and a worker. Workers check it
+between steps and wait on it instead of sleeping, so cancelling a run (or
+reaching its time limit) stops retries and pending LLM requests promptly.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# How often blocked waits re-check cancellation (seconds)
+POLL_INTERVAL = 0.25
+
+# Default gap between streamed chunks after which a stream counts as stalled (seconds).
+# The wait for the first chunk (a model may think for minutes) is not a stall
+STREAM_STALL_TIMEOUT = 120.0
+
+_END = object()
+_IDLE = object()
+
+
+class AnalysisTimeout(Exception):
+    """Raised when a deadline passes or its run is cancelled."""
+
+
+class Deadline:
+    """A time limit plus a cancel flag, optionally nested in a parent (e.g. file within run)."""
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional['Deadline'] = None):
+        """
+        Start a deadline.
+
+        Args:
+            seconds: Time limit from now (None for no limit of its own)
+            parent: Enclosing deadline; this one expires no later than it
+        """
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Cancel this deadline and every deadline nested in it."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (None if unbounded), never negative."""
+        remaining = None
+        if self.expires is not None:
+            remaining = max(0.0, self.expires - time.monotonic())
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return self.cancelled or (remaining is not None and remaining <= 0)
+
+    def overdue(self, grace: float = 0.0) -> bool:
+        """Whether this deadline's own time limit passed more than ``grace`` seconds ago."""
+        return self.expires is not None and time.monotonic() > self.expires + grace
+
+    def check(self):
+        """Raise AnalysisTimeout if the deadline passed or was cancelled."""
+        if self.cancelled:
+            raise AnalysisTimeout('Analysis cancelled')
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise AnalysisTimeout('Analysis deadline exceeded')
+
+    def sleep(self, seconds: float) -> bool:
+        """
+        Sleep, waking early if the deadline expires.
+
+        Returns:
+            False if the deadline expired before the full sleep finished
+        """
+        end = time.monotonic() + seconds
+        while True:
+            if self.expired():
+                return False
+            left = end - time.monotonic()
+            if left <= 0:
+                return True
+            self._cancelled.wait(min(left, POLL_INTERVAL))
+
+
+def call_with_timeout(func: Callable[[], Any], timeout: Optional[float] = None,
+                      deadline: Optional[Deadline] = None) -> Any:
+    """
+    Run a blocking call, giving up after a timeout or when a deadline expires.
+
+    The call runs in a daemon thread; a call that is given up on keeps running
+    in the background but no longer blocks the caller.
+
+    Raises:
+        TimeoutError: If the call itself took longer than ``timeout``
+        AnalysisTimeout: If the deadline expired first
+    """
+    if timeout is None and deadline is None:
+        return func()
+
+    outcome = {}
+    done = threading.Event()
+
+    def target():
+        try:
+            outcome['value'] = func()
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=target, daemon=True).start()
+
+    limit = time.monotonic() + timeout if timeout is not None else None
+    while not done.wait(POLL_INTERVAL):
+        if deadline is not None:
+            deadline.check()
+        if limit is not None and time.monotonic() >= limit:
+            raise TimeoutError(f'Request timeout after {timeout}s')
+
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+def iter_with_timeout(make_iterable: Callable[[], Iterable[Any]], timeout: Optional[float] = None,
+                      stall_timeout: Optional[float] = None,
+                      deadline: Optional[Deadline] = None,
+                      hedge_after: Optional[float] = None,
+                      may_hedge: Optional[Callable[[], bool]] = None,
+                      on_first_item: Optional[Callable[[bool, float], None]] = None) -> Iterator[Any]:
+    """
+    Iterate a blocking stream, giving up when it takes too long or stalls.
+
+    The stream is consumed in a daemon thread and handed over through a
+    queue, so the caller can give up between items. Closing the returned
+    generator early stops the reader after the item it is waiting for.
+
+    With ``hedge_after``, a second copy of the stream is opened if the first
+    has produced nothing after that many seconds (and ``may_hedge`` agrees).
+    The first copy to produce an item is iterated and the other is dropped;
+    if one copy fails before producing anything, the other carries on.
+
+    Args:
+        make_iterable: Opens the stream (called in the reader thread)
+        timeout: Limit for the whole stream
+        stall_timeout: Limit for the gap between two items; the wait for
+            the first item is left to ``timeout`` and the deadline
+        deadline: Enclosing deadline
+        hedge_after: Seconds without a first item before opening a duplicate
+        may_hedge: Asked once before the duplicate is opened (default: yes)
+        on_first_item: Called with (whether the duplicate won, seconds from
+            the winner's start to its first item)
+
+    Raises:
+        TimeoutError: If the stream took longer than ``timeout`` or stalled
+        AnalysisTimeout: If the deadline expired first
+    """
+    items: queue.Queue = queue.Queue()
+    stops: List[threading.Event] = []
+    starts: List[float] = []
+    failed: Dict[int, BaseException] = {}
+
+    def open_stream():
+        index = len(stops)
+        stop = threading.Event()
+        stops.append(stop)
+        starts.append(time.monotonic())
+
+        def reader():
+            try:
+                for item in make_iterable():
+                    if stop.is_set():
+                        return
+                    items.put((index, True, item))
+            except BaseException as e:
+                items.put((index, False, e))
+            finally:
+                items.put((index, True, _END))
+
+        threading.Thread(target=reader, daemon=True).start()
+
+    open_stream()
+    winner = None
+    started = time.monotonic()
+    last_item = None
+    try:
+        while True:
+            try:
+                index, ok, item = items.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                item = _IDLE
+            else:
+                if winner is None:
+                    if not ok:
+                        # A copy failed before producing anything; raise once none is left
+                        failed[index] = item
+                        if len(failed) == len(stops):
+                            raise item
+                        item = _IDLE
+                    elif index in failed:
+                        item = _IDLE
+                    else:
+                        winner = index
+                        for other, stop in enumerate(stops):
+                            if other != winner:
+                                stop.set()
+                        if on_first_item is not None:
+                            on_first_item(winner > 0, time.monotonic() - starts[winner])
+                elif index != winner:
+                    item = _IDLE
+                elif not ok:
+                    raise item
+
+                if item is _END:
+                    return
+                if item is not _IDLE:
+                    last_item = time.monotonic()
+
+            if deadline is not None:
+                deadline.check()
+            now = time.monotonic()
+            if timeout is not None and now - started >= timeout:
+                raise TimeoutError(f'Request timeout after {timeout}s')
+            if stall_timeout is not None and last_item is not None and now - last_item >= stall_timeout:
+                raise TimeoutError(f'Stream timeout: no data for {stall_timeout}s')
+            if winner is None and hedge_after is not None and now - started >= hedge_after:
+                hedge_after = None
+                if not failed and (may_hedge is None or may_hedge()):
+                    open_stream()
+
+            if item is not _IDLE:
+                yield item
+    finally:
+        for stop in stops:
+            stop.set()
@@ -11,48 +11,25 @@ from typing import List, Optional, Set
 
 def find_python_files(directory: Path, 
                      include_patterns: List[str] = None,
-                     exclude_patterns: List[str] = None) -> List[Path]:
+                     exclude_patterns: List[str] = None,
+                     respect_gitignore: bool = True) -> List[Path]:
     """
     Find Python files in a directory based on patterns.
     
+    Excluded directories are pruned before they are descended into.
+    
     Args:
         directory: Root directory to search
-        include_patterns: Glob patterns to include (default: ['**/*.py'])
+        include_patterns: Glob patterns to include (default: ['**/*.py', '**/*.ipynb'])
         exclude_patterns: Glob patterns to exclude
+        respect_gitignore: Whether to skip files ignored by .gitignore
         
     Returns:
         List of Python file paths
     """
-    if include_patterns is None:
-        include_patterns = ['**/*.py']
-    
-    if exclude_patterns is None:
-        exclude_patterns = [
-            '**/venv/**', '**/env/**', '**/.venv/**',
-            '**/__pycache__/**', '**/site-packages/**',
-            '**/node_modules/**', '**/.git/**',
-            '**/build/**', '**/dist/**'
-        ]
-    
-    files = set()
+    from .discovery import discover_files
     
-    # Find files matching include patterns
-    for pattern in include_patterns:
-        files.update(directory.glob(pattern))
-    
-    # Filter out excluded patterns
-    filtered_files = []
-    for file_path in files:
-        excluded = False
-        for exclude_pattern in exclude_patterns:
-            if file_path.match(exclude_pattern):
-                excluded = True
-                break
-        
-        if not excluded and file_path.is_file():
-            filtered_files.append(file_path)
-    
-    return sorted(filtered_files)
+    return discover_files(directory, include_patterns, exclude_patterns, respect_gitignore)
 
 
 def extract_imports(code: str) -> List[str]:
@@ -211,55 +188,20 @@ def extract_code_snippet(code: str, line_number: int, context_lines: int = 3) ->
 
 
 def parse_config_file(config_path: Path) -> dict:
-    """Parse .deepoptimizer configuration file."""
-    config = {
-        'api_key': None,
-        'analysis': {
-            'use_llm': True,
-            'output_format': 'rich',
-            'include_patterns': ['**/*.py'],
-            'exclude_patterns': ['**/venv/**', '**/__pycache__/**'],
-            'severity_filter': 'all'
-        },
-        'performance': {
-            'max_workers': 4,
-            'llm_timeout': None
-        }
-    }
+    """
+    Parse .deepoptimizer configuration file.
     
-    if not config_path.exists():
-        return config
+    Settings missing from the file keep their defaults. See config.load_config
+    for the full layering with environment variables and CLI flags.
     
-    try:
-        import configparser
-        parser = configparser.ConfigParser()
-        parser.read(config_path)
-        
-        # Update config with parsed values
-        if 'DEFAULT' in parser and 'api_key' in parser['DEFAULT']:
-            config['api_key'] = parser['DEFAULT']['api_key']
-        
-        if 'analysis' in parser:
-            for key, value in parser['analysis'].items():
-                if key in ['include_patterns', 'exclude_patterns']:
-                    # Parse list values
-                    config['analysis'][key] = [
-                        v.strip() for v in value.split(',')
-                    ]
-                elif key == 'use_llm':
-                    config['analysis'][key] = parser.getboolean('analysis', key)
-                else:
-                    config['analysis'][key] = value
-        
-        if 'performance' in parser:
-            for key, value in parser['performance'].items():
-                if key in ['max_workers', 'llm_timeout']:
-                    config['performance'][key] = int(value)
-                    
-    except Exception as e:
-        # Error parsing config file
-        pass
+    Raises:
+        ValueError: If the file holds an invalid value
+    """
+    from .config import default_config, merge_config, read_config_file
     
+    config = default_config()
+    if Path(config_path).exists():
+        merge_config(config, read_config_file(config_path))
     return config
 
 
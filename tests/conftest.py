@@ -0,0 +1,29 @@
+"""Shared fixtures: a small ML project and an isolated CLI environment."""
+import shutil
+from pathlib import Path
+
+import pytest
+
+EXAMPLE = Path(__file__).resolve().parent.parent / 'examples' / 'demo_model' / 'simple_mnist_model.py'
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project directory with a few files that trigger rule-based issues."""
+    root = tmp_path / 'proj'
+    (root / 'pkg').mkdir(parents=True)
+    shutil.copy(EXAMPLE, root / 'train.py')
+    shutil.copy(EXAMPLE, root / 'model.py')
+    shutil.copy(EXAMPLE, root / 'pkg' / 'data.py')
+    return root
+
+
+@pytest.fixture
+def cli_env(tmp_path, monkeypatch):
+    """Run from tmp_path with a private cache and an empty config file; returns the config path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DEEPOPTIMIZER_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    config = tmp_path / 'empty.deepoptimizer'
+    config.write_text('')
+    return config
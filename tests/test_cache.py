@@ -0,0 +1,75 @@
+"""Tests for the per-definition LLM result cache."""
+from pathlib import Path
+
+import pytest
+
+from deepoptimizer.cache import AnalysisCache, split_segments
+from deepoptimizer.issues import DetectedIssue
+from deepoptimizer.llm_analyzer import GeminiAnalyzer
+
+FILE_X = '''import torch
+
+
+def train(model):
+    return model(1)
+'''
+
+FILE_Y = '''import torch
+
+
+def evaluate(model):
+    return model(2)
+'''
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    """A Gemini analyzer whose requests are answered by a stub that records them."""
+    analyzer = GeminiAnalyzer(api_key='test-key', cache=AnalysisCache(tmp_path / 'cache'), triage=False)
+    analyzer.requests = []
+
+    def run_analysis(code, file_path=None, project_context=None, source=None, deadline=None, on_issue=None):
+        analyzer.requests.append(file_path)
+        name = Path(file_path).name
+        return [
+            DetectedIssue(severity='info', category='performance', title=f'whole-file note for {name}',
+                          description='No line numbers'),
+            DetectedIssue(severity='warning', category='performance', title=f'function note for {name}',
+                          description='In the function', line_numbers=[4])
+        ], True
+
+    monkeypatch.setattr(analyzer, '_run_analysis', run_analysis)
+    return analyzer
+
+
+def titles(issues):
+    return sorted(issue['title'] for issue in issues)
+
+
+def test_split_segments_one_per_definition():
+    segments = split_segments(FILE_X)
+    assert [segment.kind for segment in segments] == ['function', 'module']
+    assert segments[0].name == 'train'
+
+
+def test_unchanged_file_is_served_from_cache(analyzer):
+    first = analyzer.analyze(FILE_X, 'x.py')
+    second = analyzer.analyze(FILE_X, 'x.py')
+    assert analyzer.requests == ['x.py']
+    assert titles(second) == titles(first)
+    assert [issue['line_numbers'] for issue in second if issue['title'].startswith('function')] == [[4]]
+
+
+def test_whole_file_issues_are_not_shared_between_files_with_the_same_imports(analyzer):
+    analyzer.analyze(FILE_X, 'x.py')
+    analyzer.analyze(FILE_Y, 'y.py')
+    again = analyzer.analyze(FILE_X, 'x.py')
+    assert titles(again) == ['function note for x.py', 'whole-file note for x.py']
+
+
+def test_whole_file_issues_are_redone_when_the_file_changes(analyzer):
+    analyzer.analyze(FILE_X, 'x.py')
+    changed = FILE_X + '\n\ndef evaluate(model):\n    return model(3)\n'
+    issues = analyzer.analyze(changed, 'x.py')
+    assert analyzer.requests == ['x.py', 'x.py']
+    assert titles(issues).count('whole-file note for x.py') == 1
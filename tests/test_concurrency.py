@@ -0,0 +1,91 @@
+"""Tests for the adaptive (AIMD) LLM concurrency limit."""
+import pytest
+
+from deepoptimizer.concurrency import ConcurrencyLimiter
+from deepoptimizer.timeouts import AnalysisTimeout, Deadline
+
+
+def fill(limiter):
+    """Take every free slot; returns the tickets."""
+    return [limiter.acquire() for _ in range(limiter.limit - limiter.in_flight)]
+
+
+def run_backlog(limiter, responses, **outcome):
+    """Keep every slot busy, as a backlog of files does, for `responses` healthy or failed requests."""
+    tickets = fill(limiter)
+    for _ in range(responses):
+        limiter.release(tickets.pop(0), **outcome)
+        tickets.extend(fill(limiter))
+    for ticket in tickets:
+        limiter.release(ticket)
+
+
+def test_slow_start_then_additive_increase():
+    limiter = ConcurrencyLimiter(initial=2, maximum=32)
+    run_backlog(limiter, 6, latency=1.0)
+    # One more slot per healthy response while slow starting
+    assert limiter.limit == 8
+
+    limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 4
+    run_backlog(limiter, 8, latency=1.0)
+    # Then about one more slot per `limit` healthy responses
+    assert limiter.limit == 5
+
+
+def test_limit_only_grows_when_saturated():
+    limiter = ConcurrencyLimiter(initial=4)
+    for _ in range(10):
+        limiter.release(limiter.acquire(), latency=1.0)
+
+    assert limiter.limit == 4
+
+
+def test_burst_of_overloads_is_one_cut():
+    limiter = ConcurrencyLimiter(initial=8, maximum=8)
+    tickets = fill(limiter)
+    for ticket in tickets:
+        limiter.release(ticket, overloaded=True)
+
+    stats = limiter.stats()
+    assert (stats['limit'], stats['overloads'], stats['decreases']) == (4, 8, 1)
+    # A request started after the cut can cut again, down to the minimum
+    for _ in range(5):
+        limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_slow_response_cuts_by_the_latency_factor():
+    limiter = ConcurrencyLimiter(initial=10, maximum=10)
+    limiter.release(limiter.acquire(), latency=1.0)
+    limiter.release(limiter.acquire(), latency=1.5)
+    limiter.release(limiter.acquire(), latency=5.0)
+
+    assert (limiter.limit, limiter.slow_responses) == (9, 1)
+
+
+def test_fixed_limit():
+    limiter = ConcurrencyLimiter(initial=3, adaptive=False)
+    for ticket in fill(limiter):
+        limiter.release(ticket, overloaded=True)
+    for ticket in fill(limiter):
+        limiter.release(ticket, latency=1.0)
+
+    assert (limiter.limit, limiter.decreases) == (3, 0)
+
+
+def test_full_limiter():
+    limiter = ConcurrencyLimiter(initial=1, maximum=1)
+    ticket = limiter.acquire()
+
+    assert limiter.try_acquire() is None
+    with pytest.raises(AnalysisTimeout):
+        limiter.acquire(Deadline(0.05))
+    limiter.release(ticket)
+    assert limiter.try_acquire() == ticket
+    assert limiter.stats()['peak_in_flight'] == 1
+
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(minimum=4, maximum=2)
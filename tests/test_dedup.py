@@ -0,0 +1,72 @@
+"""Tests for linear-time issue merging and deduplication."""
+import copy
+import random
+
+from deepoptimizer.dedup import DUPLICATE_PATTERNS, IssueIndex, merge_issues
+
+TERMS = [term for pair in DUPLICATE_PATTERNS for term in pair] + ['dataloader', 'cuda sync']
+
+
+def similar(a, b):
+    """The pairwise check merge_issues replaced (title match or a DUPLICATE_PATTERNS pair)."""
+    title1, title2 = a.get('title', '').lower(), b.get('title', '').lower()
+    text1 = title1 + ' ' + a.get('description', '').lower()
+    text2 = title2 + ' ' + b.get('description', '').lower()
+    if title1 == title2:
+        return True
+    return any((first in text1 and second in text2) or (second in text1 and first in text2)
+               for first, second in DUPLICATE_PATTERNS)
+
+
+def quadratic_merge(primary, secondary):
+    merged = list(primary)
+    for issue in secondary:
+        duplicate = next((p for p in primary if similar(p, issue)), None)
+        if duplicate is None:
+            merged.append(issue)
+        elif issue.get('references') and not duplicate.get('references'):
+            duplicate['references'] = issue['references']
+    merged.sort(key=lambda x: ({'error': 0, 'warning': 1, 'info': 2}.get(x.get('severity', 'info'), 3),
+                               -x.get('confidence', 0)))
+    return merged
+
+
+def random_issue(rng, number):
+    return {
+        'title': rng.choice(['Slow loop', 'Missing eval', 'Use AMP', f'Issue {number}']),
+        'description': ' and '.join(rng.sample(TERMS, rng.randint(0, 2))),
+        'severity': rng.choice(['error', 'warning', 'info']),
+        'confidence': rng.choice([0.5, 0.8, 0.9]),
+        'references': rng.choice([[], [f'ref{number}']]),
+        'number': number
+    }
+
+
+def test_matches_the_pairwise_check():
+    rng = random.Random(7)
+    for _ in range(200):
+        primary = [random_issue(rng, n) for n in range(rng.randint(0, 6))]
+        secondary = [random_issue(rng, n) for n in range(100, 100 + rng.randint(0, 6))]
+        expected_primary = copy.deepcopy(primary)
+        expected = quadratic_merge(expected_primary, copy.deepcopy(secondary))
+
+        assert merge_issues(primary, secondary) == expected
+        # References are copied onto the same primary issues
+        assert primary == expected_primary
+
+
+def test_same_rule_on_nearby_lines_is_a_duplicate():
+    rule = {'title': 'Rule title', 'rule_id': 'DO101', 'line_numbers': [10], 'severity': 'warning'}
+    index = IssueIndex([rule])
+
+    assert index.find_duplicate({'title': 'Other', 'rule_id': 'DO101', 'line_numbers': [12]}) is rule
+    assert index.find_duplicate({'title': 'Other', 'rule_id': 'DO101', 'line_numbers': [20]}) is None
+    assert index.find_duplicate({'title': 'Other', 'rule_id': 'DO102', 'line_numbers': [10]}) is None
+
+
+def test_first_matching_primary_issue_wins():
+    first = {'title': 'Call model.eval() before inference'}
+    second = {'title': 'missing eval'}
+    index = IssueIndex([first, second])
+
+    assert index.find_duplicate({'title': 'MISSING EVAL', 'description': 'eval() is never called'}) is first
@@ -0,0 +1,82 @@
+"""Tests for file discovery: glob patterns, directory pruning and .gitignore."""
+import os
+
+import pytest
+
+from deepoptimizer import discovery
+from deepoptimizer.discovery import PathMatcher, discover_files
+
+
+def touch(root, *paths):
+    for path in paths:
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+
+
+def relative(root, files):
+    return sorted(path.relative_to(root).as_posix() for path in files)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    touch(tmp_path, 'train.py', 'model.gen.py', 'keep.gen.py', 'notes.txt', 'nb.ipynb',
+          'out/result.py', 'out/deep/more.py',
+          'src/a.py', 'src/local.py', 'src/tmp/b.py',
+          'other/local.py',
+          'venv/lib/site.py', 'pkg/__pycache__/c.py')
+    (tmp_path / '.gitignore').write_text('# build output\nout/\n*.gen.py\n!keep.gen.py\n')
+    (tmp_path / 'src' / '.gitignore').write_text('local.py\n/tmp\n')
+    return tmp_path
+
+
+@pytest.mark.parametrize('pattern, path, expected', [
+    ('**/*.py', 'a.py', True),
+    ('**/*.py', 'x/y/a.py', True),
+    ('*.py', 'x/a.py', False),
+    ('**/build/**', 'build', True),
+    ('**/build/**', 'src/build/x.py', True),
+    ('**/build/**', 'src/builder/x.py', False),
+    ('src/?.py', 'src/a.py', True),
+    ('src/?.py', 'src/ab.py', False),
+])
+def test_glob_patterns(pattern, path, expected):
+    assert PathMatcher([pattern]).matches(path) is expected
+
+
+def test_gitignore_rules(tree):
+    assert relative(tree, discover_files(tree)) == [
+        'keep.gen.py', 'nb.ipynb', 'other/local.py', 'src/a.py', 'train.py'
+    ]
+
+
+def test_gitignore_can_be_turned_off(tree):
+    assert relative(tree, discover_files(tree, respect_gitignore=False)) == [
+        'keep.gen.py', 'model.gen.py', 'nb.ipynb', 'other/local.py', 'out/deep/more.py',
+        'out/result.py', 'src/a.py', 'src/local.py', 'src/tmp/b.py', 'train.py'
+    ]
+
+
+def test_ignored_and_excluded_directories_are_not_walked(tree, monkeypatch):
+    scanned = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(os.path.relpath(path, tree))
+        return scandir(path)
+
+    monkeypatch.setattr(discovery.os, 'scandir', recording_scandir)
+
+    discover_files(tree)
+
+    assert sorted(scanned) == ['.', 'other', 'pkg', 'src']
+
+
+def test_custom_patterns(tree):
+    files = discover_files(tree, include_patterns=['src/**/*.py'], exclude_patterns=['**/a.py'],
+                           respect_gitignore=False)
+    assert relative(tree, files) == ['src/local.py', 'src/tmp/b.py']
+
+
+def test_single_file_is_returned_as_is(tree):
+    assert discover_files(tree / 'notes.txt') == [tree / 'notes.txt']
@@ -0,0 +1,140 @@
+"""Tests for coordinator/worker runs over a shared broker."""
+import json
+import threading
+
+import pytest
+
+from deepoptimizer.analyzer import DeepOptimizer
+from deepoptimizer.broker import SQLiteBroker
+from deepoptimizer.distributed import Coordinator, result_queue, run_worker, task_queue
+
+QUEUE = 'test'
+
+
+class StubAnalyzer:
+    """Analyzes a file instantly; fails on the files listed in `failing`."""
+
+    file_timeout = None
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+
+    def analyze_file(self, file_path, include_llm=True, project_context=None, deadline=None):
+        if file_path.name in self.failing:
+            raise ValueError(f'cannot analyze {file_path.name}')
+        return {'file': str(file_path), 'issues': []}
+
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = SQLiteBroker(tmp_path / 'broker.sqlite3')
+    yield broker
+    broker.close()
+
+
+@pytest.fixture
+def start_worker(broker):
+    """Starts worker threads on the broker; they are stopped after the test."""
+    stop = threading.Event()
+    threads = []
+
+    def start(make_analyzer, name='worker'):
+        thread = threading.Thread(target=run_worker, args=(broker, make_analyzer),
+                                  kwargs={'queue': QUEUE, 'stop': stop, 'name': name})
+        thread.start()
+        threads.append(thread)
+
+    yield start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+
+def coordinator(broker, project_path, **options):
+    """A started coordinator for a rules-only run (use it as a context manager to close it)."""
+    run = Coordinator(broker, project_path, {'use_llm': False}, queue=QUEUE, **options)
+    run.start()
+    return run
+
+
+def test_tasks_are_analyzed_by_workers(broker, tmp_path, start_worker):
+    with coordinator(broker, tmp_path) as run:
+        futures = {name: run.submit(tmp_path / name) for name in ('a.py', 'b.py', 'c.py')}
+        start_worker(lambda settings: StubAnalyzer())
+
+        for name, future in futures.items():
+            result, seconds = future.result(timeout=10)
+            assert result['file'] == str(tmp_path / name)
+        stats = run.stats()
+
+    assert (stats['tasks'], stats['workers'], stats['retries'], stats['failed']) == (3, 1, 0, 0)
+
+
+def test_task_popped_by_a_lost_worker_is_queued_again(broker, tmp_path, start_worker):
+    with coordinator(broker, tmp_path, task_timeout=0.5) as run:
+        futures = [run.submit(tmp_path / name) for name in ('a.py', 'b.py')]
+        # A worker takes the first task and dies before announcing it
+        assert broker.pop(task_queue(QUEUE), 1)['task'] == 'a.py'
+        start_worker(lambda settings: StubAnalyzer())
+
+        assert [future.result(timeout=10)[0]['file'] for future in futures] == [
+            str(tmp_path / 'a.py'), str(tmp_path / 'b.py')]
+        assert run.stats()['retries'] == 1
+
+
+def test_task_started_by_a_lost_worker_is_queued_again(broker, tmp_path, start_worker):
+    with coordinator(broker, tmp_path, task_timeout=0.5) as run:
+        future = run.submit(tmp_path / 'a.py')
+        # A worker announces the task, then dies without a result
+        message = broker.pop(task_queue(QUEUE), 1)
+        broker.push(result_queue(QUEUE, run.run_id),
+                    {'task': message['task'], 'attempt': message['attempt'], 'worker': 'lost', 'type': 'started'})
+        start_worker(lambda settings: StubAnalyzer())
+
+        assert future.result(timeout=10)[0]['file'] == str(tmp_path / 'a.py')
+        stats = run.stats()
+
+    assert (stats['retries'], stats['workers']) == (1, 2)
+
+
+def test_failing_task_is_retried_then_reported(broker, tmp_path, start_worker):
+    with coordinator(broker, tmp_path, max_attempts=2) as run:
+        good, bad = run.submit(tmp_path / 'a.py'), run.submit(tmp_path / 'bad.py')
+        start_worker(lambda settings: StubAnalyzer(failing={'bad.py'}))
+
+        assert good.result(timeout=10)[0]['issues'] == []
+        with pytest.raises(RuntimeError, match='2 worker attempt.*cannot analyze bad.py'):
+            bad.result(timeout=10)
+        stats = run.stats()
+
+    assert (stats['retries'], stats['failed']) == (1, 1)
+
+
+def test_worker_that_cannot_start_the_run_fails_its_tasks(broker, tmp_path, start_worker):
+    def make_analyzer(settings):
+        raise ValueError('unsupported settings')
+
+    with coordinator(broker, tmp_path, max_attempts=1) as run:
+        future = run.submit(tmp_path / 'a.py')
+        start_worker(make_analyzer)
+
+        with pytest.raises(RuntimeError, match='unsupported settings'):
+            future.result(timeout=10)
+
+
+def test_distributed_project_run_matches_a_local_run(project, broker, start_worker):
+    optimizer = DeepOptimizer(use_llm=False, use_cache=False)
+    local = optimizer.analyze_project(project, include_llm=False)
+    start_worker(lambda settings: DeepOptimizer(use_llm=False, use_cache=False))
+
+    with coordinator(broker, project) as run:
+        distributed = optimizer.analyze_project(project, include_llm=False, coordinator=run)
+
+    assert distributed['distributed']['workers'] == 1
+    for results in (local, distributed):
+        for key in ('duration', 'file_timings', 'distributed'):
+            results.pop(key, None)
+        # The example is the first issue seen, which depends on the order files finished in
+        for entry in results['top_issues']:
+            entry.pop('example')
+    assert json.loads(json.dumps(distributed, default=str)) == json.loads(json.dumps(local, default=str))
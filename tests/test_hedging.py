@@ -0,0 +1,84 @@
+"""Tests for hedged Gemini requests and the concurrency slots they take."""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from deepoptimizer import llm_analyzer
+from deepoptimizer.concurrency import ConcurrencyLimiter
+from deepoptimizer.llm_analyzer import GeminiAnalyzer
+
+
+def chunk(text):
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]), finish_reason=None)
+    return SimpleNamespace(prompt_feedback=None, candidates=[candidate])
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """An analyzer with a fixed limit whose first request is slow enough to be hedged."""
+    calls = []
+    lock = threading.Lock()
+
+    class FakeModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+
+        def generate_content(self, prompt, generation_config=None, stream=False):
+            with lock:
+                calls.append(analyzer.limiter().in_flight)
+                first = len(calls) == 1
+            if first:
+                time.sleep(0.5)
+            yield chunk('[]')
+
+    monkeypatch.setattr(llm_analyzer.genai, 'GenerativeModel', FakeModel)
+    analyzer = GeminiAnalyzer(api_key='test-key', triage=False, adaptive_concurrency=False,
+                              max_concurrency=2, hedge_percentile=50, hedge_budget=1.0)
+    for _ in range(analyzer.hedger.min_samples):
+        analyzer.hedger.record(analyzer.model_name, 0.02)
+    analyzer.calls = calls
+    return analyzer
+
+
+def test_try_acquire_does_not_wait_for_a_full_limit():
+    limiter = ConcurrencyLimiter(1, maximum=1, adaptive=False)
+    ticket = limiter.acquire()
+    assert limiter.try_acquire() is None
+    limiter.release(ticket)
+    assert limiter.try_acquire() is not None
+    assert limiter.in_flight == 1
+
+
+def test_hedge_takes_a_free_slot_and_frees_it(analyzer):
+    response, issues, status = analyzer._generate_analysis('prompt')
+
+    assert (response, issues, status) == ('[]', [], 'complete')
+    # The duplicate was opened while both copies held a slot
+    assert analyzer.calls == [1, 2]
+    assert analyzer.hedger.stats()['hedge_wins'] == 1
+    assert analyzer.limiter().in_flight == 0
+
+
+def test_hedge_skipped_when_no_slot_is_free(analyzer):
+    analyzer.limiter()._limit = 1.0
+
+    response, issues, status = analyzer._generate_analysis('prompt')
+
+    assert status == 'complete'
+    assert analyzer.calls == [1]
+    stats = analyzer.hedger.stats()
+    assert (stats['hedges'], stats['hedges_skipped']) == (0, 1)
+    assert analyzer.limiter().in_flight == 0
+
+
+def test_hedge_slot_returned_when_budget_is_spent(analyzer):
+    analyzer.hedger.budget = 0
+
+    analyzer._generate_analysis('prompt')
+
+    assert analyzer.calls == [1]
+    assert analyzer.hedger.stats()['hedges'] == 0
+    assert analyzer.limiter().in_flight == 0
@@ -0,0 +1,87 @@
+"""Tests for run journals and resuming interrupted project runs."""
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from deepoptimizer.cli import cli
+from deepoptimizer.journal import RunJournal
+
+
+def analyze(*args):
+    result = CliRunner().invoke(cli, ['analyze', *args], catch_exceptions=False)
+    assert result.exit_code in (0, 1), result.output
+    return result
+
+
+def report(path, project):
+    """A JSON report without timings or run IDs, with paths relative to the project's parent."""
+    text = path.read_text().replace(str(project.parent) + '/', '')
+    data = json.loads(text)
+    for key in ('duration', 'file_timings', 'run_id', 'resumed_files'):
+        data.pop(key, None)
+    # The example is the first issue seen, and replayed files come first
+    for entry in data.get('top_issues', []):
+        entry.pop('example', None)
+    return data
+
+
+def interrupt(cache_dir, keep):
+    """Cut the only run journal down to its header and the first `keep` files."""
+    journal_path, = (cache_dir / 'runs').glob('*.jsonl')
+    lines = journal_path.read_text().splitlines()
+    journal_path.write_text('\n'.join(lines[:1 + keep]) + '\n')
+    return journal_path.stem
+
+
+def test_record_and_replay(project, tmp_path):
+    journal = RunJournal.create(tmp_path / 'runs', project, {'use_llm': False})
+    journal.record(project / 'train.py', {'issues': [], 'file': str(project / 'train.py')}, 0.5)
+    journal.close()
+
+    resumed = RunJournal.resume(tmp_path / 'runs', journal.run_id)
+    result, seconds = resumed.completed_result(project / 'train.py')
+    assert seconds == 0.5 and result['issues'] == []
+    assert resumed.completed_result(project / 'model.py') is None
+    resumed.close()
+
+
+def test_changed_file_is_analyzed_again(project, tmp_path):
+    journal = RunJournal.create(tmp_path / 'runs', project, {})
+    journal.record(project / 'train.py', {'issues': []}, 0.1)
+    journal.close()
+    (project / 'train.py').write_text('x = 1\n')
+
+    assert RunJournal.resume(tmp_path / 'runs', journal.run_id).completed_result(project / 'train.py') is None
+
+
+def test_failed_llm_results_are_not_recorded(project, tmp_path):
+    journal = RunJournal.create(tmp_path / 'runs', project, {})
+    journal.record(project / 'train.py', {'issues': [{'category': 'analysis_error', 'title': 'LLM Analysis Failed'}]}, 1.0)
+    journal.close()
+
+    assert RunJournal.resume(tmp_path / 'runs', journal.run_id).completed_result(project / 'train.py') is None
+
+
+@pytest.mark.parametrize('resume_args', [
+    pytest.param(['--resume'], id='run-id-only'),
+    pytest.param(['proj', '--resume'], id='with-path'),
+])
+def test_resume_interrupted_run(project, cli_env, tmp_path, resume_args):
+    analyze('proj', '--no-llm', '--config', str(cli_env), '-o', 'json', '--export', 'full.json')
+    run_id = interrupt(tmp_path / 'cache', keep=2)
+
+    analyze(*resume_args, run_id, '--config', str(cli_env), '-o', 'json', '--export', 'resumed.json')
+
+    resumed = json.loads((tmp_path / 'resumed.json').read_text())
+    assert resumed['resumed_files'] == 2
+    assert report(tmp_path / 'resumed.json', project) == report(tmp_path / 'full.json', project)
+
+
+def test_resume_rejects_conflicting_options(project, cli_env, tmp_path):
+    analyze('proj', '--no-llm', '--select', 'DO1', '--config', str(cli_env), '-o', 'json', '--export', 'full.json')
+    run_id = interrupt(tmp_path / 'cache', keep=1)
+
+    result = CliRunner().invoke(cli, ['analyze', '--resume', run_id, '--select', 'DO2', '--config', str(cli_env)])
+    assert result.exit_code == 1
+    assert 'select' in result.output
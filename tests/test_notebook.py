@@ -0,0 +1,111 @@
+"""Tests for notebook cell extraction and mapping issues back to cells."""
+import json
+from pathlib import Path
+
+import pytest
+
+from deepoptimizer.analyzer import DeepOptimizer
+from deepoptimizer.notebook import (NotebookCell, build_program, cell_summary, cells_from_summary, iter_cells,
+                                    locate_issues, neutralize_magics)
+from deepoptimizer.reader import FileLimits, read_source
+
+EXAMPLE = Path(__file__).resolve().parent.parent / 'examples' / 'demo_model' / 'simple_mnist_model.py'
+
+
+def notebook(*cells):
+    """nbformat 4 JSON bytes; a cell is (type, source) with source a string or list of lines."""
+    return json.dumps({
+        'metadata': {'kernelspec': {'name': 'python3', 'cells': 'not these'}},
+        'cells': [
+            {'cell_type': kind, 'metadata': {}, 'source': source,
+             'outputs': [{'data': {'image/png': 'iVBORw0KGgo' * 1000, 'text/plain': ['[1, {"2": 3}]']}}]}
+            for kind, source in cells
+        ],
+        'nbformat': 4
+    }).encode()
+
+
+CELLS = (
+    ('markdown', '# Title "quoted" \\ text'),
+    ('code', ['import torch\n', 'x = torch.zeros(3)\n']),
+    ('code', ''),
+    ('code', '%pip install torch\nfor i in range(3):\n    !nvidia-smi\n'),
+    ('code', '%%bash\nls -l'),
+)
+
+
+def test_iter_cells_matches_json():
+    data = notebook(*CELLS)
+
+    expected = [(cell['cell_type'], ''.join(cell['source'])) for cell in json.loads(data)['cells']]
+    assert list(iter_cells(data)) == expected
+
+
+@pytest.mark.parametrize('data', [b'{"cells": [', b'{"cells": [{"source": }]}', b'[]', b'{"metadata": {}}'])
+def test_iter_cells_rejects_malformed_notebooks(data):
+    with pytest.raises(ValueError):
+        list(iter_cells(data))
+
+
+def test_neutralize_magics():
+    assert neutralize_magics('%matplotlib inline\n  !ls\nx = 1') == 'pass  # %matplotlib inline\n  pass  # !ls\nx = 1'
+    assert neutralize_magics('%%bash\nls\npwd') == '# %%bash\n# ls\n# pwd'
+    assert neutralize_magics('%%time\nx = 1\n%env A=1') == '# %%time\nx = 1\npass  # %env A=1'
+
+
+def test_build_program_line_ranges():
+    code, cells = build_program(iter_cells(notebook(*CELLS)))
+    lines = code.split('\n')
+
+    assert [cell.index for cell in cells] == [2, 3, 4, 5]
+    assert [(cell.start_line, cell.end_line) for cell in cells] == [(2, 3), (5, 4), (6, 8), (10, 11)]
+    for cell in cells:
+        assert lines[cell.start_line - 2] == f'# %% [cell {cell.index}]'
+        assert '\n'.join(lines[cell.start_line - 1:cell.end_line]) == cell.source
+    compile(code, 'notebook', 'exec')
+
+
+def test_locate_issues():
+    _, cells = build_program(iter_cells(notebook(*CELLS)))
+    issues = [
+        {'line_numbers': [3]},
+        {'line_numbers': [7, 8, 10]},       # Lines in another cell are dropped
+        {'line_numbers': [5]},              # The marker of cell 4, after the empty cell 3
+        {'line_numbers': [1]},
+        {'line_numbers': [99]},
+        {'line_numbers': [6], 'cell': 9},   # Already located
+        {'title': 'no lines'}
+    ]
+
+    locate_issues(cells, issues)
+
+    assert [(issue.get('cell'), issue.get('line_numbers')) for issue in issues] == [
+        (2, [2]), (4, [2, 3]), (4, [1]), (2, [1]), (5, [2]), (9, [6]), (None, None)]
+    summary = cell_summary(cells, issues)
+    assert [entry['issues'] for entry in summary] == [2, 0, 2, 1]
+    assert cells_from_summary(summary) == [NotebookCell(c.index, '', c.start_line, c.end_line) for c in cells]
+
+
+def test_limits_apply_to_the_program_not_the_outputs(tmp_path):
+    path = tmp_path / 'train.ipynb'
+    path.write_bytes(notebook(*CELLS))
+
+    source = read_source(path, FileLimits(max_bytes=1024, max_llm_bytes=1024))
+    mapped = read_source(path, FileLimits(max_bytes=1024, max_llm_bytes=1024, mmap_threshold=1))
+
+    assert path.stat().st_size > 10 * 1024
+    assert (source.mode, [cell.index for cell in source.cells]) == ('full', [2, 3, 4, 5])
+    assert mapped == source
+
+
+def test_notebook_issues_are_cell_relative(tmp_path):
+    lines = EXAMPLE.read_text().splitlines(keepends=True)
+    path = tmp_path / 'train.ipynb'
+    path.write_bytes(notebook(('code', lines[:100]), ('markdown', 'Training'), ('code', lines[100:])))
+
+    result = DeepOptimizer(use_llm=False, use_cache=False).analyze_file(path, include_llm=False)
+
+    assert [entry['cell'] for entry in result['cells']] == [1, 3]
+    located = [issue for issue in result['issues'] if issue.get('line_numbers')]
+    # The optimizer is created on line 130 of the script, line 30 of the second cell
+    assert [(issue['cell'], issue['line_numbers']) for issue in located] == [(3, [30])]
@@ -0,0 +1,61 @@
+"""Tests for the staged project pipeline."""
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+from deepoptimizer.pipeline import Pipeline, StagedFile
+from deepoptimizer.timeouts import Deadline
+
+
+def done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_llm_stage_does_not_wait_for_the_index():
+    index = Future()
+    llm_calls = []
+    collected = []
+
+    def llm_stage(staged):
+        llm_calls.append((staged.path, index.done()))
+        if len(llm_calls) == 3:
+            threading.Timer(0.1, index.set_result, [None]).start()
+        return done(({'issues': []}, 0.0))
+
+    pipeline = Pipeline(
+        cpu_stage=lambda path: done(StagedFile(str(path), {}, rule_issues=[], llm=True)),
+        llm_stage=llm_stage,
+        build_index=lambda: index,
+        collect=lambda path, outcome, ready: collected.append((str(path), ready)),
+        cpu_workers=1, llm_workers=1,
+        run_deadline=Deadline(10), file_deadlines={}
+    )
+    paths = [Path(f'f{i}.py') for i in range(3)]
+
+    assert pipeline.run(paths) == []
+    # Every file reached the LLM before the index was ready...
+    assert sorted(llm_calls) == [(str(path), False) for path in paths]
+    # ...and was still collected with it, for project-level rules
+    assert sorted(collected) == [(str(path), True) for path in paths]
+
+
+def test_files_outside_the_shard_are_not_analyzed():
+    staged = []
+    collected = []
+    pipeline = Pipeline(
+        cpu_stage=lambda path: staged.append(str(path)) or done(({'issues': []}, 0.0)),
+        llm_stage=None,
+        build_index=lambda: done(None),
+        collect=lambda path, outcome, ready: collected.append(str(path)),
+        cpu_workers=2, llm_workers=0,
+        run_deadline=Deadline(10), file_deadlines={},
+        selected=lambda path: path.name != 'skip.py'
+    )
+
+    pipeline.run([Path('a.py'), Path('skip.py'), Path('b.py')])
+
+    assert staged == ['a.py', 'b.py']
+    assert sorted(collected) == ['a.py', 'b.py']
+    assert pipeline.queued == 2
@@ -0,0 +1,35 @@
+"""Tests for the project symbol index and its on-disk cache."""
+import os
+
+from deepoptimizer.project_index import ProjectIndex
+
+
+def build(project, cache_dir):
+    return ProjectIndex(project, cache_dir=cache_dir).build(sorted(project.rglob('*.py')))
+
+
+def test_cross_file_context(tmp_path):
+    (tmp_path / 'models.py').write_text('class Net:\n    """A network."""\n\n    def forward(self, x):\n        return x\n')
+    (tmp_path / 'train.py').write_text('from models import Net\n\nnet = Net()\n')
+
+    index = build(tmp_path, None)
+
+    context = index.format_context(str(tmp_path / 'train.py'))
+    assert 'models.Net' in context and 'A network.' in context
+    assert index.format_context(str(tmp_path / 'models.py')) == ''
+
+
+def test_cache_reused_and_only_rewritten_on_change(project, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = build(project, cache_dir)
+    cache_file, = (cache_dir / 'index').iterdir()
+    os.utime(cache_file, ns=(0, 0))
+
+    second = build(project, cache_dir)
+    assert second.modules == first.modules
+    assert cache_file.stat().st_mtime_ns == 0
+
+    (project / 'model.py').write_text('LIMIT = 3\n')
+    third = build(project, cache_dir)
+    assert third.modules[str(project / 'model.py')].constants == {'LIMIT': 3}
+    assert cache_file.stat().st_mtime_ns != 0
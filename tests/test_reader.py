@@ -0,0 +1,78 @@
+"""Tests for size-aware reading and generated-file detection."""
+import pytest
+
+from deepoptimizer.reader import FileLimits, detect_generated, parse_size, read_source
+
+CODE = 'import torch\n\n\ndef train(model):\n    return model(1)\n'
+
+
+@pytest.mark.parametrize('value, expected', [
+    (4096, 4096), ('4096', 4096), ('512K', 512 * 1024), ('2MB', 2 * 1024 ** 2), ('1MiB', 1024 ** 2),
+    ('1.5k', 1536), (' 3 g ', 3 * 1024 ** 3)
+])
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize('value', ['', 'lots', '5T', '-1K'])
+def test_parse_size_rejects(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+
+@pytest.mark.parametrize('name, content, reason', [
+    ('msg_pb2.py', CODE, 'generated protobuf module'),
+    ('gen.py', '# @generated by a tool\n' + CODE, 'generated file (header marker)'),
+    ('gen.py', '# Code generated by protoc. DO NOT EDIT.\n' + CODE, 'generated file (header marker)'),
+    ('min.py', 'x = 1; ' * 400 + '\n', 'minified code (lines over 2000 characters)'),
+    ('data.py', 'WEIGHTS = [' + ', '.join(['0.5'] * 300) + ']\n', 'embedded numeric data'),
+    ('plain.py', CODE, None),
+])
+def test_detect_generated(name, content, reason):
+    assert detect_generated(content.encode(), name) == reason
+
+
+def test_blob_within_the_line_limit():
+    blob = ('BLOB = "' + 'QUJD' * 1100 + '"\n').encode()
+
+    assert detect_generated(blob, 'blob.py', max_line_length=10000) == 'embedded binary blob'
+    assert detect_generated(blob[:2000] + b'"\n', 'blob.py', max_line_length=10000) is None
+
+
+def test_modes_by_size(tmp_path):
+    path = tmp_path / 'model.py'
+    path.write_text(CODE * 20)
+    size = path.stat().st_size
+
+    assert read_source(path).mode == 'full'
+    rules = read_source(path, FileLimits(max_llm_bytes=size - 1))
+    assert (rules.mode, rules.code) == ('rules', CODE * 20)
+    skipped = read_source(path, FileLimits(max_bytes=size - 1))
+    assert (skipped.mode, skipped.code) == ('skip', None)
+    assert 'file too large' in skipped.reason
+
+
+@pytest.mark.parametrize('policy, mode', [('rules', 'rules'), ('skip', 'skip'), ('analyze', 'full')])
+def test_generated_policy(tmp_path, policy, mode):
+    path = tmp_path / 'gen.py'
+    path.write_text('# @generated\n' + CODE)
+
+    assert read_source(path, FileLimits(generated=policy)).mode == mode
+
+
+def test_memory_mapped_read_matches_a_plain_read(tmp_path):
+    path = tmp_path / 'model.py'
+    path.write_bytes(('# café\r\n' + CODE.replace('\n', '\r\n')).encode('utf-8'))
+
+    plain = read_source(path)
+    mapped = read_source(path, FileLimits(mmap_threshold=1))
+
+    assert plain == mapped
+    assert plain.code == '# café\n' + CODE
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.py'
+    path.write_text('')
+
+    assert (read_source(path).mode, read_source(path).code) == ('full', '')
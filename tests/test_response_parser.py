@@ -0,0 +1,118 @@
+"""Tests for incremental parsing of streamed Gemini responses and issue validation."""
+import json
+import random
+
+import pytest
+
+from deepoptimizer.response_parser import IssueStreamParser, parse_issue_array, validate_area, validate_issue
+
+ISSUES = [
+    {'severity': 'warning', 'title': 'Slow {loop}', 'description': 'Uses "[brackets]" and \\ escapes',
+     'line_numbers': [3, 4]},
+    {'severity': 'info', 'title': 'Nested', 'description': 'ok', 'extra': {'a': [1, {'b': ']'}]}},
+    {'severity': 'error', 'title': 'Unicode é ✓', 'description': 'end'}
+]
+RESPONSE = 'Here is my analysis [1]:\n<json>\n' + json.dumps(ISSUES, indent=2) + '\n</json>\nHope this helps {'
+
+
+def feed_all(chunks):
+    parser = IssueStreamParser()
+    seen = []
+    for chunk in chunks:
+        seen.extend(parser.feed(chunk))
+    return parser, seen
+
+
+def test_whole_response():
+    assert parse_issue_array(RESPONSE) == ISSUES
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_any_chunking_gives_the_same_issues(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(RESPONSE)), rng.randint(1, 40)))
+    chunks = [RESPONSE[start:end] for start, end in zip([0] + cuts, cuts + [len(RESPONSE)])]
+
+    parser, seen = feed_all(chunks)
+
+    assert seen == parser.issues == ISSUES
+    assert parser.done and parser.errors == 0
+    assert parser.text == RESPONSE
+
+
+def test_one_character_at_a_time():
+    parser, seen = feed_all(RESPONSE)
+    assert seen == ISSUES and parser.done
+
+
+def test_issues_are_handed_out_as_soon_as_they_close():
+    text = json.dumps(ISSUES)
+    end_of_first = text.index('}, {') + 1
+    parser = IssueStreamParser()
+
+    assert parser.feed(text[:end_of_first - 1]) == []
+    assert parser.feed(text[end_of_first - 1:end_of_first + 2]) == ISSUES[:1]
+    assert parser.feed(text[end_of_first + 2:]) == ISSUES[1:]
+
+
+def test_truncated_response_keeps_complete_issues():
+    text = json.dumps(ISSUES)
+    cut = text.index('Unicode')
+
+    parser, seen = feed_all([text[:cut // 2], text[cut // 2:cut]])
+
+    assert seen == ISSUES[:2]
+    assert parser.started and not parser.done
+    assert parse_issue_array(text[:cut]) is None
+
+
+def test_malformed_element_is_skipped():
+    parser, seen = feed_all(['[{"title": "a", bad}, ', '{"title": "b"}]'])
+
+    assert seen == [{'title': 'b'}]
+    assert parser.errors == 1 and parser.done
+
+
+def test_text_after_the_array_is_ignored():
+    parser = IssueStreamParser()
+    assert parser.feed('[]') == []
+    assert parser.done
+    assert parser.feed(' and also [{"title": "late"}]') == []
+    assert parser.issues == []
+
+
+def test_bracketed_prose_is_not_the_array():
+    assert parse_issue_array('See [1] and [note]. ') is None
+    assert parse_issue_array('See [1]: [{"title": "x"}]') == [{'title': 'x'}]
+
+
+def test_validate_issue_normalizes():
+    issue = validate_issue({'severity': 'WARNING', 'title': 't', 'description': 'd', 'category': 3,
+                            'confidence': 7, 'line_numbers': [0, 2, '3', True, 5], 'references': ['r', 1],
+                            'suggestion': ['not text'], 'extra': 'kept'})
+
+    assert issue == {'severity': 'warning', 'title': 't', 'description': 'd', 'category': 'general',
+                     'confidence': 1.0, 'line_numbers': [2, 5], 'references': ['r'], 'extra': 'kept'}
+
+
+@pytest.mark.parametrize('issue', [
+    ['not', 'an', 'object'],
+    {'title': 't', 'description': 'd'},
+    {'severity': 'info', 'title': None, 'description': 'd'},
+    {'severity': 'info', 'title': 't', 'description': 4},
+])
+def test_validate_issue_rejects(issue):
+    assert validate_issue(issue) is None
+
+
+def test_validate_issue_defaults():
+    issue = validate_issue({'severity': 'critical', 'title': 't', 'description': 'd', 'confidence': False})
+    assert (issue['severity'], issue['confidence'], issue['line_numbers']) == ('info', 0.8, [])
+
+
+def test_validate_area():
+    assert validate_area({'start_line': 9, 'end_line': 4, 'reason': 'loop'}) == \
+        {'start_line': 4, 'end_line': 9, 'reason': 'loop'}
+    assert validate_area({'start_line': 3}) == {'start_line': 3, 'end_line': 3, 'reason': ''}
+    assert validate_area({'start_line': 0, 'end_line': 2}) is None
+    assert validate_area({'start_line': '1', 'end_line': 2}) is None
@@ -0,0 +1,80 @@
+"""Tests for sharded project runs and merging their reports."""
+import json
+import shutil
+
+import pytest
+from click.testing import CliRunner
+
+from deepoptimizer.cli import cli
+from deepoptimizer.sharding import parse_shard, relative_key, select_files, shard_of
+
+
+def run(*args):
+    result = CliRunner().invoke(cli, list(args), catch_exceptions=False)
+    assert result.exit_code in (0, 1), result.output
+    return result
+
+
+def report(path):
+    """A JSON report without timings and shard bookkeeping, paths relative to its project."""
+    data = json.loads(path.read_text())
+    root = data.pop('project_path') + '/'
+    for key in ('duration', 'file_timings', 'shard', 'shards', 'run_id', 'resumed_files'):
+        data.pop(key, None)
+    # The example is the first issue seen, which depends on the order files finished in
+    for entry in data.get('top_issues', []):
+        entry.pop('example', None)
+    return json.loads(json.dumps(data).replace(root, ''))
+
+
+@pytest.fixture
+def big_project(project):
+    for index in range(5):
+        shutil.copy(project / 'train.py', project / 'pkg' / f'extra{index}.py')
+    return project
+
+
+def test_parse_shard():
+    assert parse_shard('2/8') == (2, 8)
+    for spec in ('0/8', '9/8', '2', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_every_file_is_in_exactly_one_shard(big_project):
+    files = sorted(big_project.rglob('*.py'))
+    by_hash = [[f for f in files if shard_of(relative_key(f, big_project), 3) == k] for k in (1, 2, 3)]
+    # Balanced by size when there are no timings for the files
+    balanced = [select_files(files, big_project, (k, 3), {}) for k in (1, 2, 3)]
+
+    for shards in (by_hash, balanced):
+        assert sorted(f for shard in shards for f in shard) == files
+    assert all(balanced)
+
+
+def test_merged_shards_match_a_full_run(big_project, cli_env, tmp_path):
+    config = str(cli_env)
+    run('analyze', str(big_project), '--no-llm', '--config', config, '-o', 'json', '-e', str(tmp_path / 'full.json'))
+
+    # Shard 2 runs in another checkout of the same tree
+    checkout = tmp_path / 'elsewhere' / 'proj'
+    shutil.copytree(big_project, checkout)
+    shards = []
+    for index, root in ((1, big_project), (2, checkout), (3, big_project)):
+        shards.append(str(tmp_path / f'shard{index}.json'))
+        run('analyze', str(root), '--no-llm', '--config', config, '--shard', f'{index}/3',
+            '-o', 'json', '-e', shards[-1])
+    run('merge', *shards, '-o', 'json', '-e', str(tmp_path / 'merged.json'))
+
+    assert [json.loads(open(shard).read())['shard']['files'] for shard in shards] != [0, 0, 0]
+    assert report(tmp_path / 'merged.json') == report(tmp_path / 'full.json')
+
+
+def test_merge_reports_missing_shards(big_project, cli_env, tmp_path):
+    shard = str(tmp_path / 'shard1.json')
+    run('analyze', str(big_project), '--no-llm', '--config', str(cli_env), '--shard', '1/3', '-o', 'json', '-e', shard)
+
+    result = run('merge', shard, '-o', 'json', '-e', str(tmp_path / 'merged.json'))
+
+    assert json.loads((tmp_path / 'merged.json').read_text())['shards']['missing'] == [2, 3]
+    assert 'missing' in result.output
@@ -0,0 +1,49 @@
+"""Tests for deadlines and streams that time out or stall."""
+import time
+
+import pytest
+
+from deepoptimizer.timeouts import AnalysisTimeout, Deadline, iter_with_timeout
+
+
+def stream(first_delay, items, gap=0.0, stall_after=None):
+    def make():
+        time.sleep(first_delay)
+        for index, item in enumerate(items):
+            if index == stall_after:
+                time.sleep(10)
+            yield item
+            time.sleep(gap)
+    return make
+
+
+def test_slow_first_item_is_not_a_stall():
+    items = list(iter_with_timeout(stream(0.6, ['a', 'b', 'c']), stall_timeout=0.3))
+    assert items == ['a', 'b', 'c']
+
+
+def test_stall_after_first_item_times_out():
+    received = []
+    with pytest.raises(TimeoutError, match='no data'):
+        for item in iter_with_timeout(stream(0.0, ['a', 'b'], stall_after=1), stall_timeout=0.3):
+            received.append(item)
+    assert received == ['a']
+
+
+def test_request_timeout_bounds_the_wait_for_the_first_item():
+    with pytest.raises(TimeoutError, match='Request timeout'):
+        list(iter_with_timeout(stream(10, ['a']), timeout=0.3, stall_timeout=0.1))
+
+
+def test_deadline_stops_the_wait():
+    with pytest.raises(AnalysisTimeout):
+        list(iter_with_timeout(stream(10, ['a']), deadline=Deadline(0.3)))
+
+
+def test_stream_errors_are_raised():
+    def make():
+        yield 'a'
+        raise ValueError('broken stream')
+
+    with pytest.raises(ValueError, match='broken stream'):
+        list(iter_with_timeout(make))
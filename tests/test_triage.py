@@ -0,0 +1,63 @@
+"""Tests for the triage model cascade (off unless asked for)."""
+from deepoptimizer.config import load_config
+from deepoptimizer.formatter import OutputFormatter
+from deepoptimizer.llm_analyzer import GeminiAnalyzer
+
+CODE = 'import torch\n\n\ndef train(model):\n    return model(1)\n'
+
+
+def test_triage_is_off_by_default(tmp_path):
+    config = tmp_path / 'empty.deepoptimizer'
+    config.write_text('')
+
+    assert GeminiAnalyzer(api_key='test-key').triage_model is None
+    assert load_config(config, environ={})['analysis']['triage'] is False
+    assert load_config(config, environ={'DEEPOPTIMIZER_TRIAGE': 'true'})['analysis']['triage'] is True
+
+
+def test_cleared_files_are_counted(monkeypatch):
+    analyzer = GeminiAnalyzer(api_key='test-key', triage=True)
+    models = []
+
+    def generate(prompt, deadline=None, on_issue=None, *, model_name=None, **options):
+        models.append(model_name or analyzer.model_name)
+        return '[]', [], 'complete'
+
+    monkeypatch.setattr(analyzer, '_generate_analysis', generate)
+
+    issues, parsed_ok = analyzer._run_analysis(CODE, 'train.py')
+
+    assert (issues, parsed_ok) == ([], True)
+    # Cleared by the fast model: the deep model never saw the file
+    assert models == [analyzer.triage_model]
+    assert analyzer.triage_stats() == {'model': analyzer.triage_model, 'screened': 1, 'cleared': 1,
+                                       'flagged': 0, 'failed': 0}
+
+
+def test_failed_screening_falls_back_to_the_deep_model(monkeypatch):
+    analyzer = GeminiAnalyzer(api_key='test-key', triage=True)
+    models = []
+
+    def generate(prompt, deadline=None, on_issue=None, *, model_name=None, **options):
+        models.append(model_name or analyzer.model_name)
+        if model_name == analyzer.triage_model:
+            raise Exception('503 Service Unavailable')
+        return '[]', [], 'complete'
+
+    monkeypatch.setattr(analyzer, '_generate_analysis', generate)
+
+    analyzer._run_analysis(CODE, 'train.py')
+
+    assert models == [analyzer.triage_model, analyzer.model_name]
+    assert analyzer.triage_stats()['failed'] == 1
+
+
+def test_project_report_shows_cleared_files():
+    results = {'files_analyzed': 0, 'total_issues': 0,
+               'llm_triage': {'model': 'gemini-2.5-flash', 'screened': 5, 'cleared': 3, 'flagged': 2, 'failed': 0}}
+
+    text = OutputFormatter('simple', no_color=True).format_project_results(results)
+    markdown = OutputFormatter('markdown').format_project_results(results)
+
+    assert '3 of 5 file(s) cleared by gemini-2.5-flash' in text
+    assert '3 of 5 file(s) cleared by `gemini-2.5-flash`' in markdown